@@ -1,4 +1,4 @@
 from aioitd.exceptions import *
 from aioitd.models import *
-from aioitd.client import AsyncITDClient
+from aioitd.client import AsyncITDClient, SkippedRequest
 from aioitd.api import Reason, ReportTargetType
\ No newline at end of file
@@ -1,11 +1,363 @@
-from uuid import UUID
-from typing import IO
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+from uuid import UUID, uuid4
+from typing import IO, AsyncIterable, AsyncIterator, Iterable, Callable, Literal
+import asyncio
+import hashlib
+import mimetypes
+import os
+import time
 import warnings
 
 import httpx
 
-from aioitd.fetch import delete, get, post, add_bearer
+from aioitd.exceptions import NotFoundError, DownloadError
+from aioitd.fetch import delete, get, post, add_bearer, request, decode_jwt_payload
 from aioitd.models.files import GetFile, File
+from aioitd.preflight import SNIFF_SIZE
+from aioitd.upload_cache import UploadCache
+
+CHUNK_SIZE = 256 * 1024
+
+
+class FileSource:
+    def __init__(
+            self,
+            source: bytes | IO[bytes] | str | PathLike | AsyncIterable[bytes],
+            filename: str | None = None,
+            content_type: str | None = None,
+            size: int | None = None,
+            chunk_size: int = CHUNK_SIZE
+    ):
+        """Источник файла для загрузки, который читается кусками и не блокирует event loop.
+
+        Файлы (путь или открытый `IO[bytes]`) читаются кусками по `chunk_size` байт в отдельном потоке
+        (`asyncio.to_thread`), поэтому целиком в память не загружаются. Источник можно прочитать повторно:
+        путь открывается заново, а файловый объект перематывается на исходную позицию, поэтому запрос
+        с таким телом можно отправить ещё раз. Асинхронный итератор байт читается только один раз.
+
+        Args:
+            source: байты, путь к файлу, файловый объект, открытый в режиме `rb`, или асинхронный итератор байт
+            filename: имя файла, по умолчанию берётся из пути или `source.name`
+            content_type: MIME тип, по умолчанию угадывается по имени файла
+            size: размер в байтах. Для асинхронного итератора без размера тело отправляется chunked
+            chunk_size: размер куска в байтах
+
+        Examples:
+            ```python
+            video = await upload_file(client, access_token, FileSource("video.mp4"))
+
+            async def chunks():
+                async for chunk in s3_object.iter_chunks():
+                    yield chunk
+
+            await upload_file(client, access_token, FileSource(chunks(), "video.mp4", size=s3_object.size))
+            ```
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size должен быть >= 1, передано {chunk_size}")
+        self.source = source
+        self.chunk_size = chunk_size
+        if filename is None:
+            if isinstance(source, (str, PathLike)):
+                filename = os.path.basename(os.fspath(source))
+            elif isinstance(getattr(source, "name", None), str):
+                filename = os.path.basename(source.name)
+            else:
+                filename = "upload"
+        self.filename = filename
+        self.content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        self._size = size
+        self._start = None
+        if not isinstance(source, (bytes, str, PathLike, AsyncIterable)) and source.seekable():
+            self._start = source.tell()
+        self._consumed = False
+        self._peeked: list[bytes] = []
+        self._iterator: AsyncIterator[bytes] | None = None
+
+    async def size(self) -> int | None:
+        """Размер в байтах, None, если его нельзя узнать заранее."""
+        if self._size is not None:
+            return self._size
+        if isinstance(self.source, bytes):
+            return len(self.source)
+        if isinstance(self.source, (str, PathLike)):
+            return (await asyncio.to_thread(os.stat, self.source)).st_size
+        if self._start is not None:
+            end = self.source.seek(0, os.SEEK_END)
+            self.source.seek(self._start)
+            return end - self._start
+        return None
+
+    @property
+    def replayable(self) -> bool:
+        """Можно ли прочитать источник ещё раз."""
+        if isinstance(self.source, AsyncIterable):
+            return False
+        return isinstance(self.source, (bytes, str, PathLike)) or self._start is not None
+
+    async def sha256(self) -> str | None:
+        """hex SHA-256 содержимого. Читает источник целиком, поэтому для источников, которые нельзя прочитать
+        повторно, возвращает None."""
+        if isinstance(self.source, bytes):
+            return hashlib.sha256(self.source).hexdigest()
+        if not self.replayable:
+            return None
+        digest = hashlib.sha256()
+        async for chunk in self:
+            await asyncio.to_thread(digest.update, chunk)
+        return digest.hexdigest()
+
+    async def head(self, size: int = SNIFF_SIZE) -> bytes:
+        """Первые `size` байт без потери их для последующего чтения (например, чтобы определить тип файла)."""
+        if isinstance(self.source, bytes):
+            return self.source[:size]
+        if isinstance(self.source, (str, PathLike)):
+            def read() -> bytes:
+                with open(self.source, "rb") as file:
+                    return file.read(size)
+
+            return await asyncio.to_thread(read)
+        if self._start is not None:
+            def read() -> bytes:
+                data = self.source.read(size)
+                self.source.seek(self._start)
+                return data
+
+            return await asyncio.to_thread(read)
+        if self._consumed:
+            raise RuntimeError("Источник уже прочитан")
+        while (peeked := sum(map(len, self._peeked))) < size:
+            if isinstance(self.source, AsyncIterable):
+                if self._iterator is None:
+                    self._iterator = aiter(self.source)
+                chunk = await anext(self._iterator, b"")
+            else:
+                chunk = await asyncio.to_thread(self.source.read, size - peeked)
+            if not chunk:
+                break
+            self._peeked.append(chunk)
+        return b"".join(self._peeked)[:size]
+
+    async def _read_file(self, file: IO[bytes]) -> AsyncIterator[bytes]:
+        while chunk := await asyncio.to_thread(file.read, self.chunk_size):
+            yield chunk
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if isinstance(self.source, bytes):
+            for i in range(0, len(self.source), self.chunk_size):
+                yield self.source[i:i + self.chunk_size]
+        elif isinstance(self.source, (str, PathLike)):
+            file = await asyncio.to_thread(open, self.source, "rb")
+            try:
+                async for chunk in self._read_file(file):
+                    yield chunk
+            finally:
+                await asyncio.to_thread(file.close)
+        elif isinstance(self.source, AsyncIterable):
+            if self._consumed:
+                raise RuntimeError("Асинхронный итератор уже прочитан, его нельзя отправить повторно")
+            self._consumed = True
+            for chunk in self._peeked:
+                yield chunk
+            async for chunk in self._iterator if self._iterator is not None else self.source:
+                yield chunk
+        else:
+            if self._start is not None:
+                await asyncio.to_thread(self.source.seek, self._start)
+            elif self._consumed:
+                raise RuntimeError("Файловый объект не поддерживает seek, его нельзя отправить повторно")
+            else:
+                for chunk in self._peeked:
+                    yield chunk
+            self._consumed = True
+            async for chunk in self._read_file(self.source):
+                yield chunk
+
+
+class BandwidthLimiter:
+    def __init__(self, rate: float, burst: int | None = None):
+        """Ограничение скорости отправки файлов (token bucket). Один лимитер можно передать нескольким
+        загрузкам, тогда ограничивается их суммарная скорость.
+
+        Args:
+            rate: скорость в байтах в секунду
+            burst: сколько байт можно отправить без ожидания, по умолчанию `max(rate, CHUNK_SIZE)`
+        """
+        if rate <= 0:
+            raise ValueError(f"rate должен быть > 0, передано {rate}")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(int(rate), CHUNK_SIZE)
+        self._tokens = float(self.burst)
+        self._last: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, size: int) -> None:
+        """Дождаться разрешения отправить `size` байт."""
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._last is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= size
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
+
+@dataclass
+class TransferStats:
+    """Метрики одной загрузки или одного скачивания файла. Времена — секунды от начала запроса."""
+    direction: Literal["upload", "download"]
+    """загрузка или скачивание"""
+    name: str
+    """имя загружаемого файла или url скачиваемого"""
+    size: int | None = None
+    """размер файла, если известен"""
+    transferred: int = 0
+    """байт файла отправлено или получено"""
+    bytes_sent: int = 0
+    """байт тела запроса отправлено (для загрузки — вместе с заголовками multipart)"""
+    bytes_received: int = 0
+    """байт тела ответа получено"""
+    request_sent: float | None = None
+    """когда запрос отправлен целиком"""
+    first_byte: float | None = None
+    """когда пришли заголовки ответа (time to first byte)"""
+    total: float | None = None
+    """когда запрос завершился, в том числе ошибкой"""
+    error: str | None = None
+    """имя исключения, если запрос завершился ошибкой"""
+
+    @property
+    def server_time(self) -> float | None:
+        """Сколько сервер обрабатывал запрос: от отправки запроса до первого байта ответа. Для загрузки это
+        в основном проверка файла модерацией."""
+        if self.request_sent is None or self.first_byte is None:
+            return None
+        return max(0.0, self.first_byte - self.request_sent)
+
+    @property
+    def throughput(self) -> float | None:
+        """Скорость передачи файла в байтах в секунду (без ожидания сервера)."""
+        if self.direction == "upload":
+            duration = self.request_sent
+        elif self.total is not None and self.first_byte is not None:
+            duration = self.total - self.first_byte
+        else:
+            duration = None
+        if not duration:
+            return None
+        return self.transferred / duration
+
+
+@dataclass
+class TransferTotals:
+    """Суммарные метрики передачи файлов, например всех загрузок и скачиваний одного клиента."""
+    uploads: int = 0
+    downloads: int = 0
+    failed: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    upload_time: float = 0.0
+    """суммарное время отправки файлов"""
+    download_time: float = 0.0
+    """суммарное время получения файлов"""
+    server_time: float = 0.0
+    """суммарное время обработки запросов сервером"""
+
+    def add(self, stats: TransferStats) -> None:
+        """Учесть метрики одной передачи."""
+        if stats.direction == "upload":
+            self.uploads += 1
+            self.upload_time += stats.request_sent or 0.0
+        else:
+            self.downloads += 1
+            if stats.total is not None and stats.first_byte is not None:
+                self.download_time += stats.total - stats.first_byte
+        if stats.error is not None:
+            self.failed += 1
+        self.bytes_sent += stats.bytes_sent
+        self.bytes_received += stats.bytes_received
+        self.server_time += stats.server_time or 0.0
+
+    @property
+    def upload_throughput(self) -> float | None:
+        """Средняя скорость отправки в байтах в секунду"""
+        return self.bytes_sent / self.upload_time if self.upload_time else None
+
+    @property
+    def download_throughput(self) -> float | None:
+        """Средняя скорость получения в байтах в секунду"""
+        return self.bytes_received / self.download_time if self.download_time else None
+
+
+class _Timer:
+    """Заполняет времена `TransferStats` из trace событий httpcore."""
+
+    def __init__(self, stats: TransferStats):
+        self.stats = stats
+        self.start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    async def trace(self, event: str, info: dict) -> None:
+        if event.endswith("send_request_body.complete"):
+            self.stats.request_sent = self.elapsed()
+        elif event.endswith("receive_response_headers.complete"):
+            self.stats.first_byte = self.elapsed()
+
+
+class _MultipartBody:
+    """Тело multipart/form-data с одним полем `file`. Можно итерировать повторно, если можно `FileSource`."""
+
+    def __init__(
+            self,
+            source: FileSource,
+            limiter: BandwidthLimiter | None = None,
+            timer: _Timer | None = None,
+            on_progress: Callable[[TransferStats], None] | None = None
+    ):
+        self.source = source
+        self.limiter = limiter
+        self.timer = timer
+        self.on_progress = on_progress
+        self.boundary = uuid4().hex
+        filename = source.filename.replace("\\", "\\\\").replace('"', "%22")
+        self._head = (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: {source.content_type}\r\n\r\n'
+        ).encode()
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode()
+
+    async def headers(self) -> dict[str, str]:
+        headers = {"content-type": f"multipart/form-data; boundary={self.boundary}"}
+        size = await self.source.size()
+        if size is not None:
+            headers["content-length"] = str(len(self._head) + size + len(self._tail))
+        return headers
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        stats = self.timer.stats if self.timer is not None else None
+        if stats is not None:
+            stats.transferred = 0
+            stats.bytes_sent = len(self._head)
+        yield self._head
+        async for chunk in self.source:
+            if self.limiter is not None:
+                await self.limiter.acquire(len(chunk))
+            yield chunk
+            if stats is not None:
+                stats.transferred += len(chunk)
+                stats.bytes_sent += len(chunk)
+                if self.on_progress is not None:
+                    self.on_progress(stats)
+        yield self._tail
+        if stats is not None:
+            stats.bytes_sent += len(self._tail)
+            stats.request_sent = self.timer.elapsed()
 
 
 async def get_file(
@@ -48,17 +400,33 @@ async def get_file(
 async def upload_file(
         client: httpx.AsyncClient,
         access_token: str,
-        file: IO[bytes],
+        file: IO[bytes] | FileSource | bytes | str | PathLike | AsyncIterable[bytes],
         domain: str = "xn--d1ah4a.com",
+        limiter: BandwidthLimiter | None = None,
+        cache: UploadCache | None = None,
+        on_progress: Callable[[TransferStats], None] | None = None,
+        on_stats: Callable[[TransferStats], None] | None = None,
         **kwargs
 ) -> File:
     """Загрузить файл.
 
+    Файл отправляется потоком: читается кусками в отдельном потоке и не держится в памяти целиком
+    (см. `FileSource`).
+
+    `on_progress` вызывается после отправки каждого куска, `on_stats` — один раз после запроса, в том числе
+    если сервер отклонил файл. По `TransferStats.server_time` видно, сколько сервер проверял файл после
+    получения. Если файл взят из кэша, запроса нет и колбэки не вызываются.
+
     Args:
         client: httpx.AsyncClient
         access_token: access токен
-        file: файл
+        file: файловый объект, открытый в режиме `rb`, путь к файлу, байты, асинхронный итератор байт
+            или `FileSource`
         domain: домен
+        limiter: ограничение скорости отправки
+        cache: кэш загрузок: файл с уже загруженным этим пользователем содержимым не отправляется повторно
+        on_progress: колбэк прогресса отправки
+        on_stats: колбэк с метриками запроса
 
     Returns:
         Файл
@@ -74,16 +442,247 @@ async def upload_file(
 
         with open('file.png', 'rb') as file:
             file = await upload_file(client, access_token, file)
+
+        file = await upload_file(client, access_token, 'video.mp4')
     """
-    response = await post(
-        client,
-        f"https://{domain}/api/files/upload",
-        files={'file': file},
-        headers={"authorization": add_bearer(access_token)},
+    if not isinstance(file, FileSource):
+        file = FileSource(file)
+    digest = owner = None
+    if cache is not None:
+        digest = await file.sha256()
+        owner = UUID(decode_jwt_payload(access_token)['sub'])
+        if digest is not None:
+            cached = await cache.lookup(client, owner, digest)
+            if cached is not None:
+                return cached
+    stats = TransferStats("upload", file.filename, await file.size())
+    timer = _Timer(stats)
+    body = _MultipartBody(file, limiter, timer, on_progress)
+
+    async def send(url: str, **params) -> httpx.Response:
+        response = await client.post(url, **params)
+        if stats.first_byte is None:
+            stats.first_byte = timer.elapsed()
+        stats.bytes_received = len(response.content)
+        return response
+
+    try:
+        response = await request(
+            send,
+            f"https://{domain}/api/files/upload",
+            content=body,
+            headers={"authorization": add_bearer(access_token)} | await body.headers(),
+            extensions={"trace": timer.trace},
+            **kwargs
+        )
+    except BaseException as ex:
+        stats.error = type(ex).__name__
+        raise
+    finally:
+        stats.total = timer.elapsed()
+        if on_stats is not None:
+            on_stats(stats)
+    data = response.json()
+    uploaded = File(**data)
+    if digest is not None:
+        await cache.put(owner, digest, uploaded)
+    return uploaded
+
+
+async def upload_files(
+        client: httpx.AsyncClient,
+        access_token: str,
+        files: Iterable[IO[bytes] | FileSource | bytes | str | PathLike | AsyncIterable[bytes]],
+        concurrency: int = 4,
+        domain: str = "xn--d1ah4a.com",
+        limiter: BandwidthLimiter | None = None,
+        cache: UploadCache | None = None,
+        on_progress: Callable[[TransferStats], None] | None = None,
+        on_stats: Callable[[TransferStats], None] | None = None,
         **kwargs
+) -> list[File]:
+    """Загрузить несколько файлов параллельно.
+
+    Одновременно загружается не больше `concurrency` файлов. Если какая-то загрузка упала, остальные
+    отменяются, уже загруженные файлы удаляются через `delete_file`, и ошибка пробрасывается дальше.
+    С кэшем загруженные файлы не удаляются: они остаются в кэше и пригодятся при следующей попытке.
+
+    Args:
+        client: httpx.AsyncClient
+        access_token: access токен
+        files: файлы, как в `upload_file`
+        concurrency: максимальное количество одновременных загрузок
+        domain: домен
+        limiter: ограничение суммарной скорости отправки
+        cache: кэш загрузок
+        on_progress: колбэк прогресса, вызывается для каждого файла (`TransferStats.name` — имя файла)
+        on_stats: колбэк с метриками, вызывается для каждого файла
+
+    Returns:
+        Загруженные файлы в том же порядке
+
+    Raises:
+        UnauthorizedError: ошибка авторизации
+        ValidationError: недопустимый тип файла
+        TooLargeError: размер запроса слишком большой
+        UploadError: ошибка загрузки файла
+        ContentModerationError: Не удалось проверить файл
+
+    Examples:
+
+        files = await upload_files(client, access_token, ['1.png', '2.png', 'video.mp4'])
+        await create_post(client, access_token, attachment_ids=[file.id for file in files])
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency должен быть >= 1, передано {concurrency}")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(file) -> File:
+        async with semaphore:
+            return await upload_file(
+                client, access_token, file, domain, limiter, cache, on_progress, on_stats, **kwargs
+            )
+
+    tasks = [asyncio.create_task(upload(file)) for file in files]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if cache is not None:
+            raise
+        uploaded = [task.result() for task in tasks if not task.cancelled() and task.exception() is None]
+        await delete_files(client, access_token, [file.id for file in uploaded], domain, **kwargs)
+        raise
+
+
+async def delete_files(
+        client: httpx.AsyncClient,
+        access_token: str,
+        file_ids: Iterable[UUID],
+        domain: str = "xn--d1ah4a.com",
+        **kwargs
+) -> None:
+    """Удалить несколько файлов параллельно, не выбрасывая ошибок. Используется для отката загрузок.
+
+    Args:
+        client: httpx.AsyncClient
+        access_token: access токен
+        file_ids: UUID файлов
+        domain: домен
+    """
+    await asyncio.gather(
+        *(delete_file(client, access_token, file_id, domain, **kwargs) for file_id in file_ids),
+        return_exceptions=True
     )
-    data = response.json()
-    return File(**data)
+
+
+def _file_size(path: Path) -> int | None:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+async def download_file(
+        client: httpx.AsyncClient,
+        url: str,
+        path: str | PathLike,
+        size: int | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        on_progress: Callable[[TransferStats], None] | None = None,
+        on_stats: Callable[[TransferStats], None] | None = None,
+        **kwargs
+) -> Path:
+    """Скачать файл на диск.
+
+    Файл скачивается кусками в `path` + `.part` и переименовывается в `path` только после проверки размера,
+    поэтому наличие `path` означает, что файл скачан целиком, и повторный вызов ничего не скачивает.
+    Если `.part` остался от прерванной загрузки, скачивание продолжается с места обрыва через заголовок Range
+    (если сервер его не поддерживает, файл скачивается заново). Запись на диск идёт в отдельном потоке.
+
+    Args:
+        client: httpx.AsyncClient
+        url: url файла, например `Attachment.url`
+        path: куда сохранить файл
+        size: ожидаемый размер в байтах, например `Attachment.size`
+        chunk_size: размер куска в байтах
+        on_progress: колбэк прогресса, вызывается после записи каждого куска. `TransferStats.transferred`
+            считает и байты, скачанные до обрыва
+        on_stats: колбэк с метриками запроса, вызывается, если был запрос, в том числе при ошибке
+
+    Returns:
+        Путь к скачанному файлу
+
+    Raises:
+        NotFoundError: файла нет
+        DownloadError: сервер вернул ошибку или размер файла не совпал с `size`
+
+    Examples:
+
+        path = await download_file(client, attachment.url, 'image.jpg', attachment.size)
+    """
+    path = Path(path)
+    existing = await asyncio.to_thread(_file_size, path)
+    if existing is not None and (size is None or existing == size):
+        return path
+    await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+    part = path.with_name(path.name + ".part")
+    offset = await asyncio.to_thread(_file_size, part) or 0
+    if size is not None and offset > size:
+        offset = 0
+    headers = {"accept-encoding": "identity"}
+    if offset:
+        headers["range"] = f"bytes={offset}-"
+
+    stats = TransferStats("download", url, size)
+    timer = _Timer(stats)
+    try:
+        async with client.stream(
+                "GET", url, headers=headers, extensions={"trace": timer.trace}, **kwargs
+        ) as response:
+            if stats.first_byte is None:
+                stats.first_byte = timer.elapsed()
+            if response.status_code == 404:
+                raise NotFoundError(NotFoundError.code, "File not found")
+            if response.status_code == 416 and offset:
+                stats.transferred = offset
+            elif response.status_code not in (200, 206):
+                raise DownloadError(DownloadError.code, f"HTTP {response.status_code} при скачивании {url}")
+            else:
+                append = (
+                    response.status_code == 206
+                    and response.headers.get("content-range", "").startswith(f"bytes {offset}-")
+                )
+                if response.status_code == 206 and not append:
+                    raise DownloadError(DownloadError.code, f"Неожиданный Content-Range при скачивании {url}")
+                stats.transferred = offset if append else 0
+                file = await asyncio.to_thread(open, part, "ab" if append else "wb")
+                try:
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        await asyncio.to_thread(file.write, chunk)
+                        stats.transferred += len(chunk)
+                        stats.bytes_received += len(chunk)
+                        if on_progress is not None:
+                            on_progress(stats)
+                finally:
+                    await asyncio.to_thread(file.close)
+    except BaseException as ex:
+        stats.error = type(ex).__name__
+        raise
+    finally:
+        stats.total = timer.elapsed()
+        if on_stats is not None:
+            on_stats(stats)
+
+    downloaded = await asyncio.to_thread(_file_size, part)
+    if size is not None and downloaded != size:
+        if downloaded > size:
+            await asyncio.to_thread(part.unlink)
+        raise DownloadError(DownloadError.code, f"Скачано {downloaded} байт вместо {size}: {url}")
+    await asyncio.to_thread(os.replace, part, path)
+    return path
 
 
 async def delete_file(
@@ -113,4 +712,7 @@ async def delete_file(
     )
 
 
-__all__ = ["get_file", "upload_file", "delete_file"]
+__all__ = [
+    "FileSource", "BandwidthLimiter", "TransferStats", "TransferTotals", "get_file", "upload_file", "upload_files",
+    "download_file", "delete_file", "delete_files"
+]
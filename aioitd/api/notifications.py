@@ -1,3 +1,4 @@
+from datetime import datetime
 from uuid import UUID
 
 import httpx
@@ -41,6 +42,51 @@ async def get_notifications(
     return data["hasMore"], list(map(Notification.model_validate, data["notifications"]))
 
 
+async def get_notifications_since(
+        client: httpx.AsyncClient,
+        access_token: str,
+        since_id: UUID | None = None,
+        since: datetime | None = None,
+        limit: int = 30,
+        max_pages: int = 10,
+        domain: str = "xn--d1ah4a.com",
+        **kwargs
+) -> list[Notification]:
+    """Получить уведомления новее `since_id` или `since`.
+
+    Листает `get_notifications`, пока не встретит уведомление `since_id` или уведомление старше `since`.
+
+    Args:
+        client: httpx.AsyncClient
+        access_token: access токен
+        since_id: UUID последнего известного уведомления
+        since: время последнего известного уведомления
+        limit: размер страницы
+        max_pages: максимальное количество запрошенных страниц
+        domain: домен
+
+    Returns:
+        Новые уведомления от старых к новым
+
+    Raises:
+        UnauthorizedError: ошибка авторизации
+    """
+    result = []
+    offset = 0
+    for _ in range(max_pages):
+        has_more, notifications = await get_notifications(client, access_token, offset, limit, domain, **kwargs)
+        for notification in notifications:
+            if notification.id == since_id or (since is not None and notification.created_at < since):
+                result.reverse()
+                return result
+            result.append(notification)
+        if not has_more or len(notifications) == 0:
+            break
+        offset += len(notifications)
+    result.reverse()
+    return result
+
+
 async def read_batch_notifications(
         client: httpx.AsyncClient,
         access_token: str,
@@ -249,6 +295,6 @@ async def update_notification_settings(
 
 
 __all__ = [
-    'get_notifications', 'read_batch_notifications', 'read_notification', 'read_all_notifications',
+    'get_notifications', 'get_notifications_since', 'read_batch_notifications', 'read_notification', 'read_all_notifications',
     'get_notifications_count', 'get_notification_settings', 'update_notification_settings'
 ]
@@ -1,27 +1,54 @@
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Callable, AsyncIterator
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncGenerator, Callable, AsyncIterator, Awaitable
+from uuid import UUID
+import asyncio
 import json
+import random
 
 import httpx
 import httpx_sse
 
+from aioitd.api.notifications import get_notifications_since
+from aioitd.exceptions import RateLimitError, ServerError, GatewayTimeOutError
 from aioitd.fetch import add_bearer
-from aioitd.models.stream import SSEEvent, ConnectedEvent, NotificationEvent
+from aioitd.models.notifications import Notification
+from aioitd.models.stream import SSEEvent, ConnectedEvent, NotificationEvent, ReconnectEvent, RawSSEEvent
 
 ITD_SSE_PING = 15
 
 
+def _decode_sse(
+        sse: httpx_sse.ServerSentEvent,
+        raw: bool = False
+) -> ConnectedEvent | NotificationEvent | SSEEvent | RawSSEEvent:
+    if raw:
+        return RawSSEEvent(sse.event, sse.data, sse.id or None)
+    if sse.event == "connected":
+        return ConnectedEvent(**json.loads(sse.data))
+    elif sse.event == "notification":
+        return NotificationEvent(**json.loads(sse.data))
+    else:
+        return SSEEvent(event=sse.event, data=sse.data)
+
+
 async def _sse_wrapper(
-        aiter_see: Callable[[], AsyncGenerator[httpx_sse.ServerSentEvent, None]]
-) -> AsyncGenerator[ConnectedEvent | NotificationEvent | SSEEvent, None]:
+        aiter_see: Callable[[], AsyncGenerator[httpx_sse.ServerSentEvent, None]],
+        raw: bool = False
+) -> AsyncGenerator[ConnectedEvent | NotificationEvent | SSEEvent | RawSSEEvent, None]:
     async for sse in aiter_see():
-        if sse.event == "connected":
-            event = ConnectedEvent(**json.loads(sse.data))
-        elif sse.event == "notification":
-            event = NotificationEvent(**json.loads(sse.data))
-        else:
-            event = SSEEvent(event=sse.event, data=sse.data)
-        yield event
+        yield _decode_sse(sse, raw)
+
+
+def _sse_timeout(kwargs: dict, missed_pings: int = 1) -> httpx.Timeout:
+    timeout = kwargs.pop('timeout', 30)
+    return httpx.Timeout(
+        connect=timeout,
+        read=ITD_SSE_PING * missed_pings + 1,
+        write=timeout,
+        pool=timeout
+    )
 
 
 @asynccontextmanager
@@ -29,14 +56,17 @@ async def connect_notifications(
         client: httpx.AsyncClient,
         access_token: str,
         domain: str = "xn--d1ah4a.com",
+        raw: bool = False,
         **kwargs
-) -> AsyncGenerator[AsyncIterator[ConnectedEvent | NotificationEvent | SSEEvent], None]:
+) -> AsyncGenerator[AsyncIterator[ConnectedEvent | NotificationEvent | SSEEvent | RawSSEEvent], None]:
     """Подключиться к SEE стриму уведомлений.
 
     Args:
         client: httpx.AsyncClient
         access_token: access токен
         domain: домен
+        raw: отдавать `RawSSEEvent` без валидации вместо моделей. Полезно, если большая часть событий
+            отбрасывается по `type` или `target_id`: модель строится только при вызове `RawSSEEvent.parse`
 
     Raises:
         SSEError: ошибка SSE
@@ -48,28 +78,177 @@ async def connect_notifications(
                 if isinstance(event, NotificationEvent):
                     print(event)
     """
-    if 'timeout' in kwargs:
-        timeout = httpx.Timeout(
-            connect=kwargs['timeout'],
-            read=ITD_SSE_PING + 1,
-            write=kwargs['timeout'],
-            pool=kwargs['timeout']
-        )
-        del kwargs['timeout']
-    else:
-        timeout = httpx.Timeout(
-            connect=30,
-            read=ITD_SSE_PING + 1,
-            write=30,
-            pool=30
-        )
+    timeout = _sse_timeout(kwargs)
     async with httpx_sse.aconnect_sse(
             client, "GET", f"https://{domain}/api/notifications/stream",
             headers={"authorization": add_bearer(access_token)},
             timeout=timeout,
             **kwargs
     ) as event_source:
-        yield _sse_wrapper(event_source.aiter_sse)
+        yield _sse_wrapper(event_source.aiter_sse, raw)
+
+
+class _Watermark:
+    """Последнее доставленное уведомление и id недавно доставленных уведомлений для дедупликации."""
+
+    def __init__(self, size: int = 1024):
+        self.id: UUID | None = None
+        self.created_at: datetime | None = None
+        self._seen: deque[UUID] = deque(maxlen=size)
+        self._seen_set: set[UUID] = set()
+
+    def deliver(self, notification_id: UUID, created_at: datetime) -> bool:
+        """Отметить уведомление доставленным. Возвращает False, если оно уже было доставлено."""
+        if notification_id in self._seen_set:
+            return False
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_set.discard(self._seen[0])
+        self._seen.append(notification_id)
+        self._seen_set.add(notification_id)
+        if self.created_at is None or created_at >= self.created_at:
+            self.id = notification_id
+            self.created_at = created_at
+        return True
+
+    def deliver_event(self, event: NotificationEvent | RawSSEEvent) -> bool:
+        if isinstance(event, RawSSEEvent):
+            return self.deliver(event.notification_id, event.created_at)
+        return self.deliver(event.id, event.created_at)
+
+
+async def _resilient_sse(
+        client: httpx.AsyncClient,
+        get_access_token: Callable[[], Awaitable[str]],
+        domain: str,
+        timeout: httpx.Timeout,
+        base_delay: float,
+        max_delay: float,
+        connect_gate: Callable[[], Awaitable[None]] | None,
+        backfill: bool,
+        backfill_pages: int,
+        raw: bool,
+        **kwargs
+) -> AsyncGenerator[
+    ConnectedEvent | NotificationEvent | Notification | SSEEvent | RawSSEEvent | ReconnectEvent, None
+]:
+    last_event_id = None
+    attempt = 0
+    watermark = _Watermark()
+    reconnected = False
+    while True:
+        if connect_gate is not None:
+            await connect_gate()
+        access_token = await get_access_token()
+        headers = {"authorization": add_bearer(access_token)}
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = last_event_id
+        try:
+            async with httpx_sse.aconnect_sse(
+                    client, "GET", f"https://{domain}/api/notifications/stream",
+                    headers=headers,
+                    timeout=timeout,
+                    **kwargs
+            ) as event_source:
+                status = event_source.response.status_code
+                if status == 429 or status >= 500:
+                    reason = f"HTTP {status}"
+                else:
+                    if backfill and reconnected and watermark.created_at is not None:
+                        missed = await get_notifications_since(
+                            client, access_token, watermark.id, watermark.created_at,
+                            max_pages=backfill_pages, domain=domain, timeout=timeout.connect
+                        )
+                        for notification in missed:
+                            if watermark.deliver(notification.id, notification.created_at):
+                                yield notification
+                    reason = "стрим закрыт сервером"
+                    async for sse in event_source.aiter_sse():
+                        if sse.id:
+                            last_event_id = sse.id
+                        attempt = 0
+                        event = _decode_sse(sse, raw)
+                        if sse.event == "notification":
+                            if not watermark.deliver_event(event):
+                                continue
+                        elif sse.event == "connected" and watermark.created_at is None:
+                            connected = event.parse() if raw else event
+                            timestamp = connected.timestamp
+                            timestamp = timestamp / 1000 if timestamp > 10 ** 11 else timestamp
+                            watermark.created_at = datetime.fromtimestamp(timestamp, timezone.utc)
+                        yield event
+        except (httpx.TransportError, RateLimitError, ServerError, GatewayTimeOutError) as ex:
+            reason = f"{type(ex).__name__}: {ex}"
+
+        reconnected = True
+        attempt += 1
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+        yield ReconnectEvent(attempt=attempt, delay=delay, reason=reason)
+        await asyncio.sleep(delay)
+
+
+@asynccontextmanager
+async def connect_notifications_resilient(
+        client: httpx.AsyncClient,
+        get_access_token: Callable[[], Awaitable[str]],
+        domain: str = "xn--d1ah4a.com",
+        missed_pings: int = 2,
+        base_delay: float = 1,
+        max_delay: float = 60,
+        connect_gate: Callable[[], Awaitable[None]] | None = None,
+        backfill: bool = True,
+        backfill_pages: int = 10,
+        raw: bool = False,
+        **kwargs
+) -> AsyncGenerator[
+    AsyncIterator[ConnectedEvent | NotificationEvent | Notification | SSEEvent | RawSSEEvent | ReconnectEvent], None
+]:
+    """Подключиться к SEE стриму уведомлений с автоматическим переподключением.
+
+    При обрыве соединения, ответе 429/5xx или пропуске `missed_pings` пингов подряд стрим переподключается
+    с экспоненциальной задержкой со случайным разбросом (full jitter) и отдаёт `ReconnectEvent` перед ожиданием.
+    Перед каждым подключением токен берётся заново из `get_access_token`. Если сервер присылал id событий,
+    при переподключении отправляется заголовок `Last-Event-ID`.
+
+    Уведомления, пришедшие во время разрыва, догружаются через `get_notifications` после переподключения
+    (до последнего доставленного уведомления, а если его нет — до момента первого подключения) и отдаются
+    как `Notification` от старых к новым. Повторы между догруженными уведомлениями и стримом отбрасываются.
+
+    Args:
+        client: httpx.AsyncClient
+        get_access_token: корутина, возвращающая действующий access токен (обновляет его при необходимости)
+        domain: домен
+        missed_pings: сколько пингов подряд можно пропустить, прежде чем считать стрим зависшим
+        base_delay: начальная задержка переподключения в секундах
+        max_delay: максимальная задержка переподключения в секундах
+        connect_gate: корутина, которую нужно дождаться перед каждым подключением (например, чтобы разнести
+            подключения многих аккаунтов по времени)
+        backfill: догружать уведомления, пропущенные во время разрыва
+        backfill_pages: максимальное количество страниц `get_notifications` при догрузке
+        raw: отдавать события стрима как `RawSSEEvent` без валидации. Догруженные уведомления всё равно
+            приходят как `Notification`
+
+    Raises:
+        SSEError: ошибка SSE (например, неверный токен)
+
+    Examples:
+
+        async def get_access_token():
+            return access_token
+
+        async with connect_notifications_resilient(client, get_access_token) as events:
+            async for event in events:
+                if isinstance(event, ReconnectEvent):
+                    print("переподключение", event.reason)
+    """
+    timeout = _sse_timeout(kwargs, missed_pings)
+    events = _resilient_sse(
+        client, get_access_token, domain, timeout, base_delay, max_delay, connect_gate, backfill, backfill_pages, raw,
+        **kwargs
+    )
+    try:
+        yield events
+    finally:
+        await events.aclose()
 
 
-__all__ = ['connect_notifications']
+__all__ = ['connect_notifications', 'connect_notifications_resilient']
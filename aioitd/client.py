@@ -1,17 +1,28 @@
+from collections import OrderedDict, deque
 from contextlib import asynccontextmanager
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from functools import wraps
+from os import PathLike
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlsplit
 from typing import IO, Any, TypeVar, ParamSpec, Callable, Awaitable, Literal, AsyncIterator, \
-    AsyncGenerator
+    AsyncGenerator, AsyncIterable, Iterable
 import asyncio
+import hashlib
 from uuid import UUID
 import re
+import time
 
-from httpx import AsyncClient
+from httpx import AsyncClient, HTTPError
 
 from aioitd.models import *
 from aioitd.api import *
-from aioitd.fetch import is_token_expired, decode_jwt_payload
+from aioitd.exceptions import ITDError, ConflictError
+from aioitd.fetch import is_token_expired, decode_jwt_payload, retry_rate_limited
+from aioitd.preflight import validate_post, validate_post_update, validate_comment, validate_upload, sniff_mime
+from aioitd.parser import normalize_spans
+from aioitd.upload_cache import UploadCache
 
 P = ParamSpec("P")
 T = TypeVar("T")
@@ -55,6 +66,24 @@ def validate_limit(min: int, max: int, limit: int) -> int:
     return limit
 
 
+def _formatting(spans: Iterable[Span]) -> list[Span]:
+    """Форматирование без упоминаний и хэштегов (их сервер расставляет сам) в однозначном порядке."""
+    spans = normalize_spans(span for span in spans if not isinstance(span, (Mention, HashTagSpan)))
+    return sorted(spans, key=lambda span: (span.offset, str(span.type), span.length))
+
+
+@dataclass
+class SkippedRequest:
+    """Запрос, не отправленный в режиме `skip_unchanged`, потому что он ничего бы не изменил."""
+    method: str
+    """метод клиента"""
+    target: UUID | None
+    """UUID поста или комментария, None для настроек и профиля"""
+    changes: dict[str, Any]
+    """запрошенные значения"""
+    at: datetime
+
+
 class AsyncITDClient:
     def __init__(
             self,
@@ -62,7 +91,16 @@ class AsyncITDClient:
             timeout: int = 10,
             file_upload_timeout: int = 60,
             client: AsyncClient = None,
-            domain: str = "xn--d1ah4a.com"
+            domain: str = "xn--d1ah4a.com",
+            preflight: bool = True,
+            upload_concurrency: int = 4,
+            upload_bandwidth: float | None = None,
+            upload_cache: UploadCache | None = None,
+            download_concurrency: int = 8,
+            upload_limits: dict[AttachmentType, int] | None = None,
+            post_cache_ttl: float = 60,
+            post_cache_size: int = 1024,
+            skip_unchanged: bool = False
     ):
         """Асинхронный клиент итд.com. Обновляет access токен.
 
@@ -72,6 +110,22 @@ class AsyncITDClient:
             file_upload_timeout: таймаут на загрузку файла
             client: Если нужно создать несколько `AsyncITDClient` с одним клиентом `httpx.AsyncClient`. Если указан: `AsyncITDClient.close()` не будет закрывать `httpx.AsyncClient`
             domain: Домен запросов
+            preflight: Проверять посты, комментарии и загружаемые файлы на ограничения сервера до отправки запроса.
+                Выбрасывает те же исключения, что и сервер, но без запроса
+            upload_concurrency: максимальное количество одновременных загрузок в `upload_files`
+            upload_bandwidth: ограничение суммарной скорости загрузки файлов в байтах в секунду, общее для всех
+                загрузок клиента
+            upload_cache: кэш загрузок по содержимому файла, см. `aioitd.upload_cache.UploadCache`. Записи
+                разделены по аккаунтам, поэтому один кэш можно передать нескольким клиентам. Клиент его не закрывает
+            download_concurrency: максимальное количество одновременных скачиваний файлов
+            upload_limits: ограничения размера загружаемых файлов по типу вложения для проверки перед загрузкой,
+                None — размер не проверяется
+            post_cache_ttl: сколько секунд `get_posts_by_ids` отдаёт пост из кэша, 0 — не кэшировать
+            post_cache_size: сколько постов хранить в кэше `get_posts_by_ids`
+            skip_unchanged: не отправлять `update_post`, `edit_comment`, `update_profile`, `update_privacy` и
+                `update_notification_settings`, если запрошенные значения совпадают с последним известным
+                состоянием (из ответов `get_*` и `update_*` этого клиента). Вместо ответа сервера возвращается
+                известное состояние, а пропущенный запрос записывается в `skipped`
 
         Examples:
             ```python
@@ -98,6 +152,22 @@ class AsyncITDClient:
         """
         self.timeout = timeout
         self.file_upload_timeout = file_upload_timeout
+        self.upload_concurrency = upload_concurrency
+        self.upload_limiter = BandwidthLimiter(upload_bandwidth) if upload_bandwidth is not None else None
+        self.upload_cache = upload_cache
+        self._download_semaphore = asyncio.Semaphore(download_concurrency)
+        self._downloads: dict[Path, asyncio.Future[Path]] = {}
+        self.upload_limits = upload_limits
+        self.transfer_stats = TransferTotals()
+        self._verified: bool | None = None
+        self.post_cache_ttl = post_cache_ttl
+        self.post_cache_size = post_cache_size
+        self._post_cache: OrderedDict[UUID, tuple[float, list[Comment] | None, Post]] = OrderedDict()
+        self._post_fetches: dict[UUID, asyncio.Future[tuple[list[Comment], Post]]] = {}
+        self.skip_unchanged = skip_unchanged
+        self._known: OrderedDict[tuple[str, UUID | None], Any] = OrderedDict()
+        self.skipped: deque[SkippedRequest] = deque(maxlen=1000)
+        """последние запросы, пропущенные в режиме `skip_unchanged`"""
         if client is not None:
             self.client = client
             self.__close_client = False
@@ -108,10 +178,41 @@ class AsyncITDClient:
         self._access_token = None
         self.__refresh_lock = asyncio.Lock()
         self.domain = domain
+        self.preflight = preflight
 
     async def __aenter__(self) -> AsyncITDClient:
         return self
 
+    def _remember(self, kind: str, target: UUID | None, state: T) -> T:
+        if self.skip_unchanged:
+            self._known[kind, target] = state
+            self._known.move_to_end((kind, target))
+            while len(self._known) > 4096:
+                self._known.popitem(last=False)
+        return state
+
+    def _remember_profile(self, user: FullMe | UserWithRoles) -> None:
+        if self.skip_unchanged:
+            self._remember("profile", None, Me.model_construct(
+                id=user.id, username=user.username, display_name=user.display_name, bio=user.bio, update_at=None
+            ))
+
+    def _unchanged(self, method: str, kind: str, target: UUID | None, changes: dict[str, Any]) -> Any | None:
+        """Известное состояние, если запрос ничего не изменит (запрос записывается в `skipped`), иначе None."""
+        if not self.skip_unchanged:
+            return None
+        known = self._known.get((kind, target))
+        if known is None:
+            return None
+        for name, value in changes.items():
+            current = getattr(known, name)
+            if name == "spans":
+                current, value = _formatting(current), _formatting(value)
+            if current != value:
+                return None
+        self.skipped.append(SkippedRequest(method, target, changes, datetime.now(timezone.utc)))
+        return known
+
     async def close(self) -> None:
         """Закрывает httpx сессию.
 
@@ -145,6 +246,11 @@ class AsyncITDClient:
             if self.is_token_expired():
                 await self.refresh()
 
+    async def _fresh_access_token(self) -> str:
+        if self.is_token_expired():
+            await self._refresh_with_lock()
+        return self._access_token
+
     def is_token_expired(self) -> bool:
         """Просрочен ли access токен"""
         return self._access_token is None or is_token_expired(self._access_token)
@@ -267,6 +373,36 @@ class AsyncITDClient:
             self.client, self._access_token, offset, limit, self.domain, timeout=self.timeout, **kwargs
         )
 
+    @auth_required
+    async def get_notifications_since(
+            self,
+            since_id: UUID | str | None = None,
+            since: datetime | None = None,
+            limit: int = 30,
+            max_pages: int = 10,
+            **kwargs
+    ) -> list[Notification]:
+        """Получить уведомления новее `since_id` или `since`.
+
+        Args:
+            since_id: UUID последнего известного уведомления (можно передавать как UUID, так и строку)
+            since: время последнего известного уведомления
+            limit: размер страницы
+            max_pages: максимальное количество запрошенных страниц
+
+        Returns:
+            Новые уведомления от старых к новым
+
+        Raises:
+            UnauthorizedError: ошибка авторизации
+        """
+        if since_id is not None:
+            since_id = validate_uuid(since_id)
+        return await get_notifications_since(
+            self.client, self._access_token, since_id, since, limit, max_pages, self.domain, timeout=self.timeout,
+            **kwargs
+        )
+
     @auth_required
     async def read_batch_notifications(self, notifications_ids: list[UUID | str], **kwargs) -> int:
         """Пометить прочитанными несколько уведомлений.
@@ -343,8 +479,9 @@ class AsyncITDClient:
         Returns:
             Настройки уведомлений
         """
-        return await get_notification_settings(self.client, self._access_token, self.domain, timeout=self.timeout,
-                                               **kwargs)
+        return self._remember("notification_settings", None, await get_notification_settings(
+            self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs
+        ))
 
     @auth_required
     async def update_notification_settings(
@@ -375,8 +512,20 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: ошибка авторизации
         """
-        return await update_notification_settings(self.client, self._access_token, comments, enabled, follows, mentions,
-                                                  sound, likes, wall_posts, self.domain, timeout=self.timeout, **kwargs)
+        changes = {
+            "comments": comments, "enabled": enabled, "follows": follows, "mentions": mentions, "sound": sound,
+            "likes": likes, "wall_posts": wall_posts
+        }
+        known = self._unchanged(
+            "update_notification_settings", "notification_settings", None,
+            {name: value for name, value in changes.items() if value is not None}
+        )
+        if known is not None:
+            return known
+        return self._remember("notification_settings", None, await update_notification_settings(
+            self.client, self._access_token, comments, enabled, follows, mentions, sound, likes, wall_posts,
+            self.domain, timeout=self.timeout, **kwargs
+        ))
 
     @auth_required
     async def get_file(self, file_id: UUID | str, **kwargs) -> GetFile:
@@ -395,12 +544,55 @@ class AsyncITDClient:
         file_id = validate_uuid(file_id)
         return await get_file(self.client, self._access_token, file_id, self.domain, timeout=self.timeout, **kwargs)
 
+    def _collect_stats(
+            self,
+            on_stats: Callable[[TransferStats], None] | None
+    ) -> Callable[[TransferStats], None]:
+        def collect(stats: TransferStats) -> None:
+            self.transfer_stats.add(stats)
+            if on_stats is not None:
+                on_stats(stats)
+
+        return collect
+
+    async def _is_verified(self) -> bool:
+        if self._verified is None:
+            me = await self.get_me()
+            self._verified = getattr(me, "verified", False)
+        return self._verified
+
+    async def _check_upload(
+            self,
+            file: IO[bytes] | FileSource | bytes | str | PathLike | AsyncIterable[bytes]
+    ) -> FileSource:
+        source = file if isinstance(file, FileSource) else FileSource(file)
+        if self.preflight:
+            head = await source.head()
+            verified = None
+            if (sniff_mime(head) or "").startswith("video/"):
+                verified = await self._is_verified()
+            validate_upload(head, await source.size(), self.upload_limits, verified)
+        return source
+
     @auth_required
-    async def upload_file(self, file: IO[bytes], **kwargs) -> File:
-        """Загрузить файл.
+    async def upload_file(
+            self,
+            file: IO[bytes] | FileSource | bytes | str | PathLike | AsyncIterable[bytes],
+            on_progress: Callable[[TransferStats], None] | None = None,
+            on_stats: Callable[[TransferStats], None] | None = None,
+            **kwargs
+    ) -> File:
+        """Загрузить файл. Файл отправляется потоком и не блокирует event loop (см. `FileSource`).
+
+        С `preflight=True` тип файла (по сигнатуре), размер и, для видео, верификация пользователя проверяются до
+        отправки (см. `aioitd.preflight.validate_upload`). Верификация берётся из `get_me` и кэшируется.
 
         Args:
-            file: файл
+            file: файловый объект, открытый в режиме `rb`, путь к файлу, байты, асинхронный итератор байт
+                или `FileSource`
+            on_progress: колбэк прогресса отправки
+            on_stats: колбэк с метриками запроса (см. `aioitd.api.TransferStats`), метрики также суммируются
+                в `transfer_stats`
 
         Returns:
             Файл
@@ -411,15 +603,128 @@ class AsyncITDClient:
             TooLargeError: размер запроса слишком большой
             UploadError: ошибка загрузки файла
             ContentModerationError: Не удалось проверить файл
+            VideoRequiresVerificationError: загрузка видео доступна только верифицированным пользователям
 
         """
+        file = await self._check_upload(file)
         return await upload_file(
-            self.client, self._access_token, file, self.domain, timeout=self.file_upload_timeout, **kwargs
+            self.client, self._access_token, file, self.domain, self.upload_limiter, self.upload_cache,
+            on_progress, self._collect_stats(on_stats), timeout=self.file_upload_timeout, **kwargs
         )
 
+    @auth_required
+    async def upload_files(
+            self,
+            files: Iterable[IO[bytes] | FileSource | bytes | str | PathLike | AsyncIterable[bytes]],
+            on_progress: Callable[[TransferStats], None] | None = None,
+            on_stats: Callable[[TransferStats], None] | None = None,
+            **kwargs
+    ) -> list[File]:
+        """Загрузить несколько файлов параллельно (не больше `upload_concurrency` одновременно).
+
+        Если какая-то загрузка упала, уже загруженные файлы удаляются (если у клиента нет `upload_cache`),
+        и ошибка пробрасывается дальше.
+
+        Args:
+            files: файлы, как в `upload_file`
+            on_progress: колбэк прогресса, вызывается для каждого файла (`TransferStats.name` — имя файла)
+            on_stats: колбэк с метриками, вызывается для каждого файла
+
+        Returns:
+            Загруженные файлы в том же порядке
+
+        Raises:
+            UnauthorizedError: ошибка авторизации
+            ValidationError: недопустимый тип файла
+            TooLargeError: размер запроса слишком большой
+            UploadError: ошибка загрузки файла
+            ContentModerationError: Не удалось проверить файл
+            VideoRequiresVerificationError: загрузка видео доступна только верифицированным пользователям
+        """
+        files = [await self._check_upload(file) for file in files]
+        return await upload_files(
+            self.client, self._access_token, files, self.upload_concurrency, self.domain, self.upload_limiter,
+            self.upload_cache, on_progress, self._collect_stats(on_stats), timeout=self.file_upload_timeout, **kwargs
+        )
+
+    async def _download(self, url: str, path: Path, size: int | None, on_progress, on_stats, **kwargs) -> Path:
+        async with self._download_semaphore:
+            return await download_file(
+                self.client, url, path, size, on_progress=on_progress, on_stats=self._collect_stats(on_stats),
+                timeout=self.timeout, **kwargs
+            )
+
+    async def download_file(
+            self,
+            file: File | str,
+            directory: str | PathLike = "itd_files",
+            on_progress: Callable[[TransferStats], None] | None = None,
+            on_stats: Callable[[TransferStats], None] | None = None,
+            **kwargs
+    ) -> Path:
+        """Скачать файл в кэш на диске.
+
+        Имя файла в `directory` — SHA-256 от url с расширением из url, поэтому повторное скачивание того же url
+        ничего не стоит: файл уже лежит на диске. Одновременные запросы одного url скачивают его один раз.
+        Одновременно скачивается не больше `download_concurrency` файлов клиента, прерванные скачивания
+        продолжаются с места обрыва (см. `aioitd.api.download_file`).
+
+        Args:
+            file: файл или вложение (размер скачанного файла сверяется с `size`) или url
+            directory: папка кэша
+            on_progress: колбэк прогресса скачивания
+            on_stats: колбэк с метриками запроса, метрики также суммируются в `transfer_stats`. Если файл уже
+                скачивается другим вызовом, колбэки этого вызова не используются
+
+        Returns:
+            Путь к скачанному файлу
+
+        Raises:
+            NotFoundError: файла нет
+            DownloadError: сервер вернул ошибку или размер файла не совпал с `size`
+
+        Examples:
+            ```python
+            post = await client.get_post(post_id)
+            paths = await client.download_files(post.attachments, "media")
+            ```
+        """
+        url, size = (file, None) if isinstance(file, str) else (file.url, file.size)
+        suffix = PurePosixPath(urlsplit(url).path).suffix
+        path = Path(directory) / (hashlib.sha256(url.encode()).hexdigest() + suffix)
+        task = self._downloads.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url, path, size, on_progress, on_stats, **kwargs))
+            self._downloads[path] = task
+            task.add_done_callback(lambda _: self._downloads.pop(path, None))
+        return await asyncio.shield(task)
+
+    async def download_files(
+            self,
+            files: Iterable[File | str],
+            directory: str | PathLike = "itd_files",
+            on_progress: Callable[[TransferStats], None] | None = None,
+            on_stats: Callable[[TransferStats], None] | None = None,
+            **kwargs
+    ) -> list[Path]:
+        """Скачать несколько файлов параллельно, см. `download_file`.
+
+        Args:
+            files: файлы, вложения или url
+            directory: папка кэша
+            on_progress: колбэк прогресса, вызывается для каждого файла
+            on_stats: колбэк с метриками, вызывается для каждого файла
+
+        Returns:
+            Пути к скачанным файлам в том же порядке
+        """
+        return list(await asyncio.gather(
+            *(self.download_file(file, directory, on_progress, on_stats, **kwargs) for file in files)
+        ))
+
     @auth_required
     async def delete_file(self, file_id: UUID | str, **kwargs) -> None:
-        """Удалить файл.
+        """Удалить файл. Если у клиента есть `upload_cache`, файл удаляется и из него.
 
         Args:
             file_id: UUID файла (можно передавать как UUID, так и строку)
@@ -429,7 +734,9 @@ class AsyncITDClient:
             NotFoundError: Файл не найден, или нет прав доступа к нему
         """
         file_id = validate_uuid(file_id)
-        return await delete_file(self.client, self._access_token, file_id, self.domain, timeout=self.timeout, **kwargs)
+        await delete_file(self.client, self._access_token, file_id, self.domain, timeout=self.timeout, **kwargs)
+        if self.upload_cache is not None:
+            await self.upload_cache.forget(file_id)
 
     @auth_required
     async def report(
@@ -552,9 +859,12 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: ошибка авторизации
         """
-        return await get_me(
+        me = await get_me(
             self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs
         )
+        if isinstance(me, FullMe):
+            self._remember_profile(me)
+        return me
 
     @auth_required
     async def follow(
@@ -625,7 +935,7 @@ class AsyncITDClient:
             NotFoundError: Пользователь не найден
             UserBlockedError: пользователь заблокирован
         """
-        if page <= 1:
+        if page < 1:
             raise ValueError(f"Минимальная страница 1, передано {page}")
         username_or_id = validate_username_or_uuid(username_or_id)
         limit = validate_limit(1, 100, limit)
@@ -653,7 +963,7 @@ class AsyncITDClient:
             NotFoundError: Пользователь не найден
             UserBlockedError: пользователь заблокирован
         """
-        if page <= 1:
+        if page < 1:
             raise ValueError(f"Минимальная страница 1, передано {page}")
         username_or_id = validate_username_or_uuid(username_or_id)
         limit = validate_limit(1, 100, limit)
@@ -755,9 +1065,9 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: неверный access токен
         """
-        return await get_privacy(
+        return self._remember("privacy", None, await get_privacy(
             self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs
-        )
+        ))
 
     @auth_required
     async def update_privacy(
@@ -779,10 +1089,19 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: неверный access токен
         """
-        return await update_privacy(
+        changes = {
+            "is_private": is_private, "likes_visibility": likes_visibility, "wall_access": wall_access,
+            "show_last_seen": show_last_seen
+        }
+        known = self._unchanged(
+            "update_privacy", "privacy", None, {name: value for name, value in changes.items() if value is not None}
+        )
+        if known is not None:
+            return known
+        return self._remember("privacy", None, await update_privacy(
             self.client, self._access_token, is_private, likes_visibility, wall_access, show_last_seen,
             self.domain, timeout=self.timeout, **kwargs
-        )
+        ))
 
     @auth_required
     async def get_profile(self, **kwargs) -> Profile:
@@ -791,9 +1110,12 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: неверный access токен
         """
-        return await get_profile(
+        profile = await get_profile(
             self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs
         )
+        if profile.user is not None:
+            self._remember_profile(profile.user)
+        return profile
 
     @auth_required
     async def update_profile(
@@ -823,10 +1145,17 @@ class AsyncITDClient:
         """
         if banner_id is not None:
             banner_id = validate_uuid(banner_id)
-        return await update_profile(
+        else:
+            changes = {"bio": bio, "display_name": display_name, "username": username}
+            known = self._unchanged(
+                "update_profile", "profile", None, {name: value for name, value in changes.items() if value is not None}
+            )
+            if known is not None:
+                return known
+        return self._remember("profile", None, await update_profile(
             self.client, self._access_token, bio, display_name, username, banner_id,
             self.domain, timeout=self.timeout, **kwargs
-        )
+        ))
 
     @auth_required
     async def delete_banner(self, **kwargs) -> Me:
@@ -835,7 +1164,9 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: неверный access токен
         """
-        return await delete_banner(self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs)
+        return self._remember("profile", None, await delete_banner(
+            self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs
+        ))
 
     @auth_required
     async def block(
@@ -896,7 +1227,7 @@ class AsyncITDClient:
         Raises:
             UnauthorizedError: неверный access токен
         """
-        if page <= 1:
+        if page < 1:
             raise ValueError(f"Минимальная страница 1, передано {page}")
         limit = validate_limit(1, 100, limit)
         return await get_blocked(
@@ -974,9 +1305,14 @@ class AsyncITDClient:
                 на которого вы не подписаны
         """
         post_id = validate_uuid(post_id)
-        return await get_post(
+        comments, post = await get_post(
             self.client, self._access_token, post_id, self.domain, timeout=self.timeout, **kwargs
         )
+        if self.skip_unchanged:
+            self._remember("post", post_id, UpdatePostResponse.model_construct(
+                id=post.id, content=post.content, spans=post.spans, updated_at=post.edited_at
+            ))
+        return comments, post
 
     @auth_required
     async def delete_post(
@@ -995,6 +1331,8 @@ class AsyncITDClient:
             NotFoundError: Пост не найден
         """
         post_id = validate_uuid(post_id)
+        self._post_cache.pop(post_id, None)
+        self._known.pop(("post", post_id), None)
         await delete_post(
             self.client, self._access_token, post_id, self.domain, timeout=self.timeout, **kwargs
         )
@@ -1039,9 +1377,11 @@ class AsyncITDClient:
             NotFoundError: Пост не найден
         """
         post_id = validate_uuid(post_id)
-        return await like_post(
+        likes_count = await like_post(
             self.client, self._access_token, post_id, self.domain, timeout=self.timeout, **kwargs
         )
+        self._post_cache.pop(post_id, None)
+        return likes_count
 
     @auth_required
     async def unlike_post(
@@ -1062,9 +1402,11 @@ class AsyncITDClient:
             NotFoundError: Пост не найден
         """
         post_id = validate_uuid(post_id)
-        return await unlike_post(
+        likes_count = await unlike_post(
             self.client, self._access_token, post_id, self.domain, timeout=self.timeout, **kwargs
         )
+        self._post_cache.pop(post_id, None)
+        return likes_count
 
     @auth_required
     async def view_post(
@@ -1084,6 +1426,197 @@ class AsyncITDClient:
         await view_post(
             self.client, self._access_token, post_id, self.domain, timeout=self.timeout, **kwargs
         )
+        self._post_cache.pop(post_id, None)
+
+    async def _bulk(
+            self,
+            posts: Iterable[Post | UUID | str],
+            skip: Callable[[Post], bool],
+            call: Callable[[UUID], Awaitable[T]],
+            concurrency: int,
+            retries: int
+    ) -> tuple[dict[UUID, T | None | Exception], dict[UUID, list[Post]]]:
+        models: dict[UUID, list[Post]] = {}
+        ids: dict[UUID, None] = {}
+        for post in posts:
+            if isinstance(post, Post):
+                models.setdefault(post.id, []).append(post)
+                ids[post.id] = None
+            else:
+                ids[validate_uuid(post)] = None
+        results: dict[UUID, T | None | Exception] = {}
+        todo = []
+        for post_id in ids:
+            if any(skip(post) for post in models.get(post_id, ())):
+                results[post_id] = None
+            else:
+                todo.append(post_id)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(post_id: UUID) -> None:
+            async with semaphore:
+                try:
+                    results[post_id] = await retry_rate_limited(lambda: call(post_id), retries)
+                except (ITDError, HTTPError) as ex:
+                    results[post_id] = ex
+
+        await asyncio.gather(*(run(post_id) for post_id in todo))
+        return {post_id: results[post_id] for post_id in ids}, models
+
+    def _cached_post(self, post_id: UUID, comments: bool) -> tuple[list[Comment] | None, Post] | None:
+        entry = self._post_cache.get(post_id)
+        if entry is None:
+            return None
+        expires, cached_comments, post = entry
+        if expires <= time.monotonic():
+            del self._post_cache[post_id]
+            return None
+        if comments and cached_comments is None:
+            return None
+        self._post_cache.move_to_end(post_id)
+        return cached_comments, post
+
+    def _cache_post(self, post_id: UUID, comments: list[Comment] | None, post: Post) -> None:
+        if self.post_cache_ttl <= 0:
+            return
+        self._post_cache[post_id] = (time.monotonic() + self.post_cache_ttl, comments, post)
+        self._post_cache.move_to_end(post_id)
+        while len(self._post_cache) > self.post_cache_size:
+            self._post_cache.popitem(last=False)
+
+    async def get_posts_by_ids(
+            self,
+            post_ids: Iterable[UUID | str],
+            comments: bool = False,
+            concurrency: int = 4,
+            retries: int = 3,
+            use_cache: bool = True
+    ) -> dict[UUID, Post | tuple[list[Comment], Post] | Exception]:
+        """Получить несколько постов по id.
+
+        Повторяющиеся id запрашиваются один раз. Посты, полученные не раньше `post_cache_ttl` секунд назад,
+        отдаются из кэша клиента, а если тот же пост уже запрашивается другим вызовом, результат этого
+        запроса переиспользуется. Остальные посты запрашиваются через `get_post` параллельно, при
+        `RateLimitError` запрос повторяется после `retry_after`.
+
+        `get_post` всегда возвращает пост вместе с комментариями. При `comments=False` комментарии
+        отбрасываются и не хранятся в кэше. Изменения поста через этот клиент (лайк, просмотр, редактирование,
+        голос в опросе, репост, удаление) удаляют его из кэша.
+
+        Args:
+            post_ids: UUID постов (можно передавать строки)
+            comments: возвращать комментарии вместе с постом
+            concurrency: сколько запросов выполнять одновременно
+            retries: сколько раз повторять запрос при `RateLimitError`
+            use_cache: брать посты из кэша. При False посты запрашиваются заново, а кэш обновляется
+
+        Returns:
+            Для каждого id: пост (или кортеж (список комментариев, пост) при `comments=True`),
+            исключение — ошибка этого поста (например `NotFoundError` или сетевая ошибка `httpx.HTTPError`)
+
+        Examples:
+            ```python
+            _, notifications = await client.get_notifications()
+            posts = await client.get_posts_by_ids(n.target_id for n in notifications if n.target_type == "post")
+            ```
+        """
+        ids = list(dict.fromkeys(validate_uuid(post_id) for post_id in post_ids))
+        results: dict[UUID, Post | tuple[list[Comment], Post] | Exception] = {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(post_id: UUID) -> tuple[list[Comment], Post]:
+            async with semaphore:
+                fetched_comments, post = await retry_rate_limited(lambda: self.get_post(post_id), retries)
+            self._cache_post(post_id, fetched_comments if comments else None, post)
+            return fetched_comments, post
+
+        async def run(post_id: UUID) -> None:
+            cached = self._cached_post(post_id, comments) if use_cache else None
+            if cached is not None:
+                cached_comments, post = cached
+            else:
+                task = self._post_fetches.get(post_id)
+                if task is None:
+                    task = asyncio.ensure_future(fetch(post_id))
+                    self._post_fetches[post_id] = task
+                    task.add_done_callback(lambda _: self._post_fetches.pop(post_id, None))
+                try:
+                    cached_comments, post = await asyncio.shield(task)
+                except (ITDError, HTTPError) as ex:
+                    results[post_id] = ex
+                    return
+            results[post_id] = (cached_comments, post) if comments else post
+
+        await asyncio.gather(*(run(post_id) for post_id in ids))
+        return {post_id: results[post_id] for post_id in ids}
+
+    async def view_posts(
+            self,
+            posts: Iterable[Post | UUID | str],
+            concurrency: int = 4,
+            retries: int = 3
+    ) -> dict[UUID, bool | Exception]:
+        """Зафиксировать просмотр нескольких постов.
+
+        Повторяющиеся посты отправляются один раз, посты с `is_viewed=True` пропускаются. После успешного
+        запроса у переданных моделей выставляется `is_viewed=True`. При `RateLimitError` запрос повторяется
+        после `retry_after`.
+
+        Args:
+            posts: посты или их UUID (можно передавать строки)
+            concurrency: сколько запросов выполнять одновременно
+            retries: сколько раз повторять запрос при `RateLimitError`
+
+        Returns:
+            Для каждого поста: True — просмотр отправлен, False — пропущен, исключение — ошибка этого поста
+        """
+        async def view(post_id: UUID) -> bool:
+            await self.view_post(post_id)
+            return True
+
+        results, models = await self._bulk(posts, lambda post: post.is_viewed, view, concurrency, retries)
+        for post_id, result in results.items():
+            if result is True:
+                for post in models.get(post_id, ()):
+                    post.is_viewed = True
+        return {post_id: False if result is None else result for post_id, result in results.items()}
+
+    async def like_posts(
+            self,
+            posts: Iterable[Post | UUID | str],
+            concurrency: int = 4,
+            retries: int = 3
+    ) -> dict[UUID, int | None | Exception]:
+        """Лайкнуть несколько постов.
+
+        Повторяющиеся посты отправляются один раз, посты с `is_liked=True` пропускаются. После успешного
+        запроса у переданных моделей выставляются `is_liked=True` и новое `likes_count`. При `RateLimitError`
+        запрос повторяется после `retry_after`.
+
+        Args:
+            posts: посты или их UUID (можно передавать строки)
+            concurrency: сколько запросов выполнять одновременно
+            retries: сколько раз повторять запрос при `RateLimitError`
+
+        Returns:
+            Для каждого поста: новое количество лайков, None — пропущен (в том числе если сервер ответил, что пост
+            уже лайкнут), исключение — ошибка этого поста
+        """
+        async def like(post_id: UUID) -> int | None:
+            try:
+                return await self.like_post(post_id)
+            except ConflictError:
+                return None
+
+        results, models = await self._bulk(posts, lambda post: post.is_liked, like, concurrency, retries)
+        for post_id, result in results.items():
+            if result is None or isinstance(result, int):
+                for post in models.get(post_id, ()):
+                    post.is_liked = True
+                    if result is not None:
+                        post.likes_count = result
+        return results
 
     @auth_required
     async def pin_post(
@@ -1281,10 +1814,19 @@ class AsyncITDClient:
         """
         post_id = validate_uuid(post_id)
         limit = validate_limit(1, 500, limit)
-        return await get_post_comments(
+        pagination, comments = await get_post_comments(
             self.client, self._access_token, post_id, cursor, limit, sort,
             self.domain, timeout=self.timeout, **kwargs
         )
+        if self.skip_unchanged:
+            stack = list(comments)
+            while stack:
+                comment = stack.pop()
+                self._remember("comment", comment.id, UpdateCommentResponse.model_construct(
+                    id=comment.id, content=comment.content, edited_at=None
+                ))
+                stack.extend(comment.replies)
+        return pagination, comments
 
     @auth_required
     async def vote_poll(
@@ -1311,10 +1853,12 @@ class AsyncITDClient:
         """
         post_id = validate_uuid(post_id)
         option_ids = [validate_uuid(oid) for oid in option_ids]
-        return await vote(
+        poll = await vote(
             self.client, self._access_token, post_id, option_ids,
             self.domain, timeout=self.timeout, **kwargs
         )
+        self._post_cache.pop(post_id, None)
+        return poll
 
     @auth_required
     async def create_post(
@@ -1326,6 +1870,7 @@ class AsyncITDClient:
             question: str | None = None,
             options: list[str] | None = None,
             spans: list[Monospace | Strike | Underline | Bold | Italic | Spoiler | Link] | None = None,
+            files: list[IO[bytes] | FileSource | bytes | str | PathLike | AsyncIterable[bytes]] | None = None,
             **kwargs
     ) -> Post:
         """Создать пост.
@@ -1337,7 +1882,10 @@ class AsyncITDClient:
             multiple_choice: Возможен ли множественный выбор в опросе
             question: Заголовок опроса
             options: Варианты ответов (список строк)
-            spans: Форматирование текста (список объектов форматирования)
+            spans: Форматирование текста (список объектов форматирования), перед отправкой нормализуется
+                `aioitd.parser.normalize_spans`
+            files: Файлы, которые нужно загрузить и прикрепить после `attachment_ids`. Загружаются параллельно
+                через `upload_files`; если пост создать не удалось, загруженные файлы удаляются
 
         Returns:
             Созданный пост
@@ -1358,17 +1906,38 @@ class AsyncITDClient:
             attachment_ids = [validate_uuid(aid) for aid in attachment_ids]
         if wall_recipient_id is not None:
             wall_recipient_id = validate_uuid(wall_recipient_id)
-        return await create_post(
-            self.client, self._access_token, content, attachment_ids, wall_recipient_id,
-            multiple_choice, question, options, spans,
-            self.domain, timeout=self.timeout, **kwargs
-        )
+        if spans is not None:
+            spans = normalize_spans(spans)
+        if self.preflight:
+            validate_post(content, (attachment_ids or []) + (files or []), question, options, spans)
+        if not files:
+            return await create_post(
+                self.client, self._access_token, content, attachment_ids, wall_recipient_id,
+                multiple_choice, question, options, spans,
+                self.domain, timeout=self.timeout, **kwargs
+            )
+
+        uploaded = await self.upload_files(files)
+        try:
+            return await create_post(
+                self.client, self._access_token, content, (attachment_ids or []) + [file.id for file in uploaded],
+                wall_recipient_id, multiple_choice, question, options, spans,
+                self.domain, timeout=self.timeout, **kwargs
+            )
+        except BaseException:
+            if self.upload_cache is not None:
+                raise
+            await delete_files(
+                self.client, self._access_token, [file.id for file in uploaded], self.domain, timeout=self.timeout
+            )
+            raise
 
     @auth_required
     async def update_post(
             self,
             post_id: UUID | str,
             content: str,
+            spans: list[Monospace | Strike | Underline | Bold | Italic | Spoiler | Link] | None = None,
             **kwargs
     ) -> UpdatePostResponse:
         """Изменить текст поста.
@@ -1376,6 +1945,7 @@ class AsyncITDClient:
         Args:
             post_id: UUID поста (можно передавать как UUID, так и строку)
             content: Новый текст поста
+            spans: Форматирование текста, перед отправкой нормализуется `aioitd.parser.normalize_spans`
 
         Returns:
             Обновлённый пост (содержит дату редактирования)
@@ -1388,10 +1958,19 @@ class AsyncITDClient:
             EditWindowExpiredError: пост нельзя изменять спустя несколько дней
         """
         post_id = validate_uuid(post_id)
-        return await update_post(
-            self.client, self._access_token, post_id, content,
+        if spans is not None:
+            spans = normalize_spans(spans)
+        if self.preflight:
+            validate_post_update(content, spans)
+        known = self._unchanged("update_post", "post", post_id, {"content": content, "spans": spans or []})
+        if known is not None:
+            return known
+        updated = await update_post(
+            self.client, self._access_token, post_id, content, spans,
             self.domain, timeout=self.timeout, **kwargs
         )
+        self._post_cache.pop(post_id, None)
+        return self._remember("post", post_id, updated)
 
     @auth_required
     async def repost(
@@ -1417,10 +1996,12 @@ class AsyncITDClient:
             ValidationError: len(content) <= 1_000
         """
         post_id = validate_uuid(post_id)
-        return await repost(
+        created = await repost(
             self.client, self._access_token, post_id, content,
             self.domain, timeout=self.timeout, **kwargs
         )
+        self._post_cache.pop(post_id, None)
+        return created
 
     @auth_required
     async def comment(
@@ -1451,6 +2032,8 @@ class AsyncITDClient:
         post_id = validate_uuid(post_id)
         if attachment_ids is not None:
             attachment_ids = [validate_uuid(aid) for aid in attachment_ids]
+        if self.preflight:
+            validate_comment(content, attachment_ids)
         return await comment(
             self.client, self._access_token, post_id, content, attachment_ids,
             self.domain, timeout=self.timeout, **kwargs
@@ -1489,6 +2072,8 @@ class AsyncITDClient:
             replay_to_user_id = validate_uuid(replay_to_user_id)
         if attachment_ids is not None:
             attachment_ids = [validate_uuid(aid) for aid in attachment_ids]
+        if self.preflight:
+            validate_comment(content, attachment_ids)
         return await replies(
             self.client, self._access_token, comment_id, content, replay_to_user_id, attachment_ids,
             self.domain, timeout=self.timeout, **kwargs
@@ -1517,10 +2102,13 @@ class AsyncITDClient:
             ParamsValidationError: 1 <= len(content) <= 1_000
         """
         comment_id = validate_uuid(comment_id)
-        return await edit_comment(
+        known = self._unchanged("edit_comment", "comment", comment_id, {"content": content})
+        if known is not None:
+            return known
+        return self._remember("comment", comment_id, await edit_comment(
             self.client, self._access_token, comment_id, content,
             self.domain, timeout=self.timeout, **kwargs
-        )
+        ))
 
     @auth_required
     async def delete_comment(
@@ -1617,10 +2205,22 @@ class AsyncITDClient:
     @asynccontextmanager
     async def connect_notifications(
             self,
+            reconnect: bool = False,
+            raw: bool = False,
             **kwargs
-    ) -> AsyncGenerator[AsyncIterator[ConnectedEvent | NotificationEvent | SSEEvent], None]:
+    ) -> AsyncGenerator[
+        AsyncIterator[ConnectedEvent | NotificationEvent | Notification | SSEEvent | RawSSEEvent | ReconnectEvent],
+        None
+    ]:
         """Подключиться к SEE стриму уведомлений.
 
+        Args:
+            reconnect: Переподключаться при обрывах. Перед переподключением токен обновляется, в стрим приходит
+                `ReconnectEvent`, а пропущенные за время разрыва уведомления догружаются как `Notification`.
+                Дополнительные параметры (`missed_pings`, `base_delay`, `max_delay`, `backfill`) передаются в
+                `aioitd.api.connect_notifications_resilient`
+            raw: Отдавать `RawSSEEvent` без валидации, модель строится только при вызове `RawSSEEvent.parse`
+
         Raises:
             SSEError: ошибка SSE
 
@@ -1633,11 +2233,27 @@ class AsyncITDClient:
                         print(event)
                         break
             ```
+
+            С переподключением:
+
+            ```python
+            async with client.connect_notifications(reconnect=True) as events:
+                async for event in events:
+                    if isinstance(event, ReconnectEvent):
+                        print(f"переподключение через {event.delay:.1f} с: {event.reason}")
+            ```
         """
+        if reconnect:
+            async with connect_notifications_resilient(
+                    self.client, self._fresh_access_token, self.domain, raw=raw, timeout=self.timeout, **kwargs
+            ) as events:
+                yield events
+            return
+
         if self.is_token_expired():
             await self._refresh_with_lock()
         async with connect_notifications(
-                self.client, self._access_token, self.domain, timeout=self.timeout, **kwargs
+                self.client, self._access_token, self.domain, raw, timeout=self.timeout, **kwargs
         ) as events:
             yield events
 
@@ -1649,4 +2265,4 @@ class AsyncITDClient:
         return await get_changelog(self.client, self.domain, timeout=self.timeout, **kwargs)
 
 
-__all__ = ['AsyncITDClient']
+__all__ = ['AsyncITDClient', 'SkippedRequest']
@@ -0,0 +1,297 @@
+from dataclasses import dataclass
+from os import PathLike
+from typing import Iterable, Literal, Protocol
+from uuid import UUID
+import asyncio
+import sqlite3
+
+from aioitd.client import AsyncITDClient, validate_username_or_uuid
+from aioitd.exceptions import ITDError, RateLimitError
+from aioitd.fetch import retry_rate_limited
+
+type Direction = Literal["followers", "following"]
+
+
+class EdgeSink(Protocol):
+    """Получатель рёбер графа. Ребро — пара (подписчик, на кого он подписан)."""
+
+    async def write(self, edges: list[tuple[UUID, UUID]]) -> None: ...
+
+
+class CSVEdgeSink:
+    def __init__(self, path: str | PathLike):
+        """Дописывает рёбра в CSV файл строками `follower,following`.
+
+        Args:
+            path: путь к файлу
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    async def write(self, edges: list[tuple[UUID, UUID]]) -> None:
+        def write() -> None:
+            self._file.writelines(f"{follower},{following}\n" for follower, following in edges)
+            self._file.flush()
+
+        await asyncio.to_thread(write)
+
+    def close(self) -> None:
+        """Закрыть файл."""
+        self._file.close()
+
+
+@dataclass
+class CrawlStats:
+    """Статистика обхода за один запуск `run`."""
+    expanded: int = 0
+    """сколько пользователей обработано"""
+    discovered: int = 0
+    """сколько новых пользователей найдено"""
+    edges: int = 0
+    """сколько рёбер передано в sink"""
+    pages: int = 0
+    """сколько страниц запрошено"""
+    errors: int = 0
+    """сколько раз не удалось получить подписчиков или подписки пользователя"""
+    deferred: int = 0
+    """сколько пользователей отложено до следующего запуска из-за `RateLimitError`"""
+
+
+class GraphCrawler:
+    def __init__(
+            self,
+            client: AsyncITDClient,
+            sink: EdgeSink,
+            path: str | PathLike = ":memory:",
+            max_depth: int = 2,
+            directions: Iterable[Direction] = ("followers", "following"),
+            concurrency: int = 4,
+            limit: int = 100,
+            retries: int = 3
+    ):
+        """Обход графа подписок в ширину от начальных пользователей.
+
+        Посещённые пользователи и прогресс (следующая страница каждого пользователя в обработке) хранятся
+        в SQLite, а не в памяти, поэтому обход большого графа не растёт по памяти. Если запуск прервался,
+        повторный `run` с тем же `path` продолжит с сохранённого места. Рёбра сразу отправляются в `sink`;
+        при продолжении после падения страница, обработанная перед самым падением, может прийти в `sink` повторно.
+
+        Пользователи на глубине `max_depth` попадают в граф как концы рёбер, но их подписки не запрашиваются.
+        Если подписчиков или подписки пользователя получить нельзя (приватный профиль, блокировка, удалён),
+        ошибка сохраняется, и обход продолжается со следующего направления. Если `RateLimitError` не прошла
+        за `retries` повторов, прогресс пользователя не меняется: он откладывается до следующего `run`.
+
+        Args:
+            client: клиент
+            sink: получатель рёбер, например `CSVEdgeSink`
+            path: путь к базе SQLite с прогрессом, по умолчанию в памяти (без продолжения после падения)
+            max_depth: максимальная глубина от начальных пользователей
+            directions: что обходить: "followers" — подписчиков, "following" — подписки
+            concurrency: сколько пользователей обрабатывать одновременно
+            limit: размер страницы (1 <= limit <= 100)
+            retries: сколько раз повторять запрос при `RateLimitError`
+
+        Examples:
+            ```python
+            sink = CSVEdgeSink("edges.csv")
+            async with AsyncITDClient(refresh_token) as client:
+                crawler = GraphCrawler(client, sink, "crawl.sqlite", max_depth=2)
+                stats = await crawler.run(["user1", "user2"])
+            sink.close()
+            crawler.close()
+            ```
+        """
+        self.client = client
+        self.sink = sink
+        self.path = path
+        self.max_depth = max_depth
+        self.directions: tuple[Direction, ...] = tuple(directions)
+        self.concurrency = concurrency
+        self.limit = limit
+        self.retries = retries
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # direction — индекс текущего направления в directions, page — следующая страница;
+        # direction == len(directions) — пользователь обработан; deferred — отложен до следующего run
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS nodes (id BLOB PRIMARY KEY, depth INTEGER NOT NULL, "
+            "direction INTEGER NOT NULL DEFAULT 0, page INTEGER NOT NULL DEFAULT 1, error TEXT, "
+            "deferred INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS nodes_frontier ON nodes (direction, depth)")
+        self._db.commit()
+        self._lock = asyncio.Lock()
+        self._active: set[bytes] = set()
+        self._changed = asyncio.Condition()
+
+    async def _execute(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        def execute() -> list[tuple]:
+            with self._db:
+                return self._db.execute(sql, parameters).fetchall()
+
+        async with self._lock:
+            return await asyncio.to_thread(execute)
+
+    async def _execute_many(self, sql: str, parameters: list[tuple]) -> None:
+        def execute() -> None:
+            with self._db:
+                self._db.executemany(sql, parameters)
+
+        async with self._lock:
+            await asyncio.to_thread(execute)
+
+    async def _discover(
+            self,
+            node: bytes,
+            depth: int,
+            direction: int,
+            page: int,
+            users: list[bytes]
+    ) -> tuple[int, bool]:
+        """Добавить найденных пользователей и сохранить прогресс одной транзакцией.
+
+        Пользователь, уже найденный глубже (через более медленную ветку), переносится на меньшую глубину,
+        и его обработка начинается заново.
+
+        Returns:
+            Сколько пользователей найдено впервые и False, если глубина самого `node` за это время уменьшилась
+            (тогда его прогресс сброшен, и обрабатывать его дальше на старой глубине нельзя)
+        """
+        done = len(self.directions) if depth + 1 >= self.max_depth else 0
+        users = list(dict.fromkeys(users))
+
+        def execute() -> tuple[int, bool]:
+            with self._db:
+                known = self._db.execute(
+                    f"SELECT COUNT(*) FROM nodes WHERE id IN ({', '.join('?' * len(users))})", users
+                ).fetchone()[0] if users else 0
+                self._db.executemany(
+                    "INSERT INTO nodes (id, depth, direction) VALUES (?, ?, ?) ON CONFLICT (id) DO UPDATE "
+                    "SET depth = excluded.depth, direction = excluded.direction, page = 1 "
+                    "WHERE excluded.depth < nodes.depth",
+                    [(user, depth + 1, done) for user in users]
+                )
+                current = self._db.execute(
+                    "UPDATE nodes SET direction = ?, page = ? WHERE id = ? AND depth = ?",
+                    (direction, page, node, depth)
+                ).rowcount
+                return len(users) - known, bool(current)
+
+        async with self._lock:
+            return await asyncio.to_thread(execute)
+
+    async def _fetch(self, direction: Direction, user_id: UUID, page: int):
+        method = self.client.get_followers if direction == "followers" else self.client.get_following
+        return await retry_rate_limited(lambda: method(user_id, page, self.limit), self.retries)
+
+    async def _expand(self, node: bytes, depth: int, direction: int, page: int, stats: CrawlStats) -> None:
+        user_id = UUID(bytes=node)
+        while direction < len(self.directions):
+            name = self.directions[direction]
+            try:
+                pagination, users = await self._fetch(name, user_id, page)
+            except RateLimitError:
+                # прогресс не меняется, пользователь обработается в следующем запуске
+                stats.deferred += 1
+                await self._execute("UPDATE nodes SET deferred = 1 WHERE id = ?", (node,))
+                return
+            except ITDError as ex:
+                stats.errors += 1
+                direction, page = direction + 1, 1
+                rows = await self._execute(
+                    "UPDATE nodes SET direction = ?, page = ?, error = ? WHERE id = ? AND depth = ? RETURNING id",
+                    (direction, page, f"{name}: {type(ex).__name__}: {ex}", node, depth)
+                )
+                if not rows:
+                    return
+                continue
+            stats.pages += 1
+            edges = [(user.id, user_id) if name == "followers" else (user_id, user.id) for user in users]
+            if edges:
+                await self.sink.write(edges)
+                stats.edges += len(edges)
+            if pagination.has_more and users:
+                page += 1
+            else:
+                direction, page = direction + 1, 1
+            discovered, current = await self._discover(
+                node, depth, direction, page, [user.id.bytes for user in users]
+            )
+            stats.discovered += discovered
+            if not current:
+                # пользователь найден ближе к начальным, его обработает следующий claim
+                return
+        stats.expanded += 1
+
+    async def add_seeds(self, users: Iterable[str | UUID]) -> None:
+        """Добавить начальных пользователей. Уже известные пользователи пропускаются.
+
+        Args:
+            users: имена пользователей или их UUID
+        """
+        ids = []
+        for user in users:
+            user = validate_username_or_uuid(user)
+            if not isinstance(user, UUID):
+                user = (await self.client.get_user(user)).id
+            ids.append((user.bytes, 0, len(self.directions) if self.max_depth <= 0 else 0))
+        await self._execute_many("INSERT OR IGNORE INTO nodes (id, depth, direction) VALUES (?, ?, ?)", ids)
+
+    async def _claim(self) -> tuple[bytes, int, int, int] | None:
+        """Следующий пользователь из фронта (ближайший к начальным), None — если фронт пуст."""
+        async with self._changed:
+            while True:
+                placeholders = ", ".join("?" * len(self._active))
+                rows = await self._execute(
+                    "SELECT id, depth, direction, page FROM nodes WHERE direction < ? AND deferred = 0 "
+                    f"AND id NOT IN ({placeholders}) ORDER BY depth, rowid LIMIT 1",
+                    (len(self.directions), *self._active)
+                )
+                if rows:
+                    self._active.add(rows[0][0])
+                    return rows[0]
+                if not self._active:
+                    return None
+                await self._changed.wait()
+
+    async def run(self, seeds: Iterable[str | UUID] = ()) -> CrawlStats:
+        """Обходить граф, пока фронт не опустеет.
+
+        Args:
+            seeds: начальные пользователи (имена или UUID). При продолжении прерванного обхода можно не передавать
+
+        Returns:
+            Статистика этого запуска
+        """
+        await self._execute("UPDATE nodes SET deferred = 0 WHERE deferred = 1")
+        await self.add_seeds(seeds)
+        stats = CrawlStats()
+
+        async def worker() -> None:
+            while (claimed := await self._claim()) is not None:
+                node = claimed[0]
+                try:
+                    await self._expand(*claimed, stats)
+                finally:
+                    async with self._changed:
+                        self._active.discard(node)
+                        self._changed.notify_all()
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return stats
+
+    def visited(self) -> int:
+        """Сколько пользователей найдено за всё время обхода."""
+        return self._db.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def pending(self) -> int:
+        """Сколько пользователей ещё нужно обработать."""
+        return self._db.execute(
+            "SELECT COUNT(*) FROM nodes WHERE direction < ?", (len(self.directions),)
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        """Закрыть базу."""
+        self._db.close()
+
+
+__all__ = ['Direction', 'EdgeSink', 'CSVEdgeSink', 'CrawlStats', 'GraphCrawler']
@@ -0,0 +1,5 @@
+from .broadcast import *
+from .multiplex import *
+from .dispatcher import *
+from .coalesce import *
+from .polling import *
@@ -0,0 +1,229 @@
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Iterable
+import asyncio
+
+from aioitd.client import AsyncITDClient
+from aioitd.models.notifications import NotificationType
+
+
+class Overflow(str, Enum):
+    """Что делать, если очередь подписчика заполнена."""
+    BLOCK = 'block'
+    """ждать, пока подписчик освободит место (медленный подписчик тормозит всех)"""
+    DROP_OLDEST = 'drop_oldest'
+    """выкинуть самое старое событие из очереди"""
+    DROP_NEWEST = 'drop_newest'
+    """не класть новое событие в очередь"""
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass
+class SubscriptionStats:
+    received: int = 0
+    """событий прошло фильтр"""
+    delivered: int = 0
+    """событий получено подписчиком"""
+    dropped: int = 0
+    """событий выброшено из-за переполнения"""
+    lag: int = 0
+    """событий ждёт в очереди сейчас"""
+    max_lag: int = 0
+    """максимальная длина очереди"""
+
+
+class Subscription:
+    """Подписка на `NotificationBroadcaster`. Асинхронный итератор по событиям со своей очередью.
+
+    Создаётся через `NotificationBroadcaster.subscribe`.
+    """
+
+    def __init__(
+            self,
+            broadcaster: NotificationBroadcaster,
+            types: Iterable[NotificationType | str] | None,
+            maxsize: int,
+            overflow: Overflow
+    ):
+        if maxsize < 1:
+            raise ValueError(f"Размер очереди должен быть >= 1, передано {maxsize}")
+        self._broadcaster = broadcaster
+        self.types = None if types is None else frozenset(NotificationType(t) for t in types)
+        self.maxsize = maxsize
+        self.overflow = Overflow(overflow)
+        self.stats = SubscriptionStats()
+        self._buffer: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._closed = False
+        self._error: BaseException | None = None
+
+    def accepts(self, event: Any) -> bool:
+        """Проходит ли событие фильтр подписки. События без `type` (например, `ConnectedEvent`) получают только
+        подписчики без фильтра."""
+        if self.types is None:
+            return True
+        return getattr(event, "type", None) in self.types
+
+    async def _put(self, event: Any) -> None:
+        if self._closed or not self.accepts(event):
+            return
+        self.stats.received += 1
+        while len(self._buffer) >= self.maxsize:
+            if self.overflow == Overflow.DROP_NEWEST:
+                self.stats.dropped += 1
+                return
+            if self.overflow == Overflow.DROP_OLDEST:
+                self._buffer.popleft()
+                self.stats.dropped += 1
+                continue
+            self._not_full.clear()
+            await self._not_full.wait()
+            if self._closed:
+                return
+        self._buffer.append(event)
+        self.stats.lag = len(self._buffer)
+        self.stats.max_lag = max(self.stats.max_lag, self.stats.lag)
+        self._not_empty.set()
+
+    def _finish(self, error: BaseException | None = None) -> None:
+        self._closed = True
+        self._error = error
+        self._not_empty.set()
+        self._not_full.set()
+
+    def close(self) -> None:
+        """Отписаться. События, уже лежащие в очереди, ещё можно дочитать."""
+        self._broadcaster._subscriptions.discard(self)
+        self._finish()
+
+    def __aiter__(self) -> Subscription:
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self._buffer:
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        event = self._buffer.popleft()
+        self.stats.delivered += 1
+        self.stats.lag = len(self._buffer)
+        self._not_full.set()
+        return event
+
+    async def __aenter__(self) -> Subscription:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class NotificationBroadcaster:
+    def __init__(self, client: AsyncITDClient, **kwargs):
+        """Раздаёт один SSE стрим уведомлений нескольким подписчикам.
+
+        Держит одно подключение `AsyncITDClient.connect_notifications`, у каждого подписчика своя ограниченная
+        очередь, фильтр по `NotificationType` и политика переполнения. Если стрим завершился ошибкой,
+        подписчики получат её после того, как дочитают свои очереди. Подписки, созданные после завершения стрима,
+        сразу завершаются с той же ошибкой; `start` открывает стрим заново.
+
+        Args:
+            client: клиент, через который открывается стрим
+            **kwargs: параметры `AsyncITDClient.connect_notifications`, например `reconnect=True`
+
+        Examples:
+            ```python
+            async with AsyncITDClient(refresh_token) as client:
+                broadcaster = NotificationBroadcaster(client, reconnect=True)
+                likes = broadcaster.subscribe([NotificationType.LIKE], overflow=Overflow.DROP_OLDEST)
+                everything = broadcaster.subscribe(maxsize=1000, overflow=Overflow.BLOCK)
+                async with broadcaster:
+                    async for event in likes:
+                        print(event.actor.username, likes.stats.lag)
+            ```
+        """
+        self.client = client
+        self._kwargs = kwargs
+        self._subscriptions: set[Subscription] = set()
+        self._task: asyncio.Task | None = None
+        self._finished = False
+        self._error: BaseException | None = None
+
+    def subscribe(
+            self,
+            types: Iterable[NotificationType | str] | None = None,
+            maxsize: int = 100,
+            overflow: Overflow | str = Overflow.DROP_OLDEST
+    ) -> Subscription:
+        """Подписаться на стрим.
+
+        Args:
+            types: типы уведомлений, None — все события, включая `ConnectedEvent` и `ReconnectEvent`
+            maxsize: размер очереди подписчика
+            overflow: что делать при переполнении очереди
+
+        Returns:
+            Подписка, по которой можно итерироваться
+        """
+        subscription = Subscription(self, types, maxsize, overflow)
+        if self._finished:
+            subscription._finish(self._error)
+        else:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    @property
+    def subscriptions(self) -> list[Subscription]:
+        """Активные подписки"""
+        return list(self._subscriptions)
+
+    async def _pump(self) -> None:
+        error = None
+        try:
+            async with self.client.connect_notifications(**self._kwargs) as events:
+                async for event in events:
+                    for subscription in list(self._subscriptions):
+                        await subscription._put(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            error = ex
+        finally:
+            self._finished = True
+            self._error = error
+            for subscription in list(self._subscriptions):
+                subscription._finish(error)
+            self._subscriptions.clear()
+
+    async def start(self) -> None:
+        """Открыть стрим и начать раздавать события. Если стрим уже завершился, он открывается заново."""
+        if self._task is None or self._task.done():
+            self._finished = False
+            self._error = None
+            self._task = asyncio.create_task(self._pump())
+
+    async def close(self) -> None:
+        """Закрыть стрим и завершить все подписки."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self) -> NotificationBroadcaster:
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+
+__all__ = ['Overflow', 'SubscriptionStats', 'Subscription', 'NotificationBroadcaster']
@@ -0,0 +1,113 @@
+from typing import Any, AsyncGenerator, AsyncIterable, Iterable
+from uuid import UUID
+import asyncio
+
+from aioitd.models.notifications import Notification, NotificationType
+from aioitd.models.stream import NotificationBatch, RawSSEEvent
+
+DEFAULT_INDIVIDUAL = (NotificationType.REPLY, NotificationType.MENTION, NotificationType.COMMENT,
+                      NotificationType.WALL_POST)
+
+
+def _batch(notifications: list[Notification]) -> NotificationBatch:
+    actors = {}
+    for notification in notifications:
+        actors.setdefault(notification.actor.id, notification.actor)
+    return NotificationBatch(
+        type=notifications[0].type,
+        target_id=notifications[0].target_id,
+        count=len(notifications),
+        actors=list(actors.values()),
+        notifications=notifications,
+        first_at=min(n.created_at for n in notifications),
+        last_at=max(n.created_at for n in notifications),
+    )
+
+
+async def coalesce(
+        events: AsyncIterable[Any],
+        window: float | None = 2.0,
+        max_size: int = 100,
+        individual: Iterable[NotificationType | str] = DEFAULT_INDIVIDUAL,
+) -> AsyncGenerator[Any, None]:
+    """Собирает уведомления одного типа об одной цели в `NotificationBatch`.
+
+    Уведомления группируются по `(type, target_id)`. Группа отдаётся, когда с её первого уведомления прошло
+    `window` секунд или в ней набралось `max_size` уведомлений. Типы из `individual` и остальные события
+    (`ConnectedEvent`, `ReconnectEvent`, ...) проходят без изменений и без задержки.
+    `RawSSEEvent` группируемых типов разбираются через `RawSSEEvent.parse`.
+
+    Когда стрим заканчивается или падает, накопленные группы отдаются сразу.
+
+    Args:
+        events: стрим событий
+        window: окно группировки в секундах, None — группировать только по размеру
+        max_size: максимальный размер группы
+        individual: типы уведомлений, которые не группируются
+
+    Examples:
+        ```python
+        async with client.connect_notifications(reconnect=True) as events:
+            async for item in coalesce(events, window=5):
+                if isinstance(item, NotificationBatch):
+                    print(f"{item.count} x {item.type} на {item.target_id}")
+        ```
+    """
+    if max_size < 1:
+        raise ValueError(f"max_size должен быть >= 1, передано {max_size}")
+    individual = frozenset(NotificationType(t) for t in individual)
+    loop = asyncio.get_running_loop()
+    groups: dict[tuple[NotificationType, UUID | None], list[Notification]] = {}
+    deadlines: dict[tuple[NotificationType, UUID | None], float] = {}
+    iterator = aiter(events)
+    pending: asyncio.Future | None = None
+    error: Exception | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+            timeout = None
+            if window is not None and deadlines:
+                timeout = max(0.0, next(iter(deadlines.values())) - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if done:
+                future, pending = pending, None
+                try:
+                    event = future.result()
+                except StopAsyncIteration:
+                    break
+                except Exception as ex:
+                    error = ex
+                    break
+                event_type = getattr(event, "type", None)
+                if not isinstance(event_type, NotificationType) or event_type in individual:
+                    yield event
+                else:
+                    if isinstance(event, RawSSEEvent):
+                        event = event.parse()
+                    key = (event.type, event.target_id)
+                    if key not in groups:
+                        groups[key] = []
+                        deadlines[key] = loop.time() + (window or 0)
+                    groups[key].append(event)
+                    if len(groups[key]) >= max_size:
+                        del deadlines[key]
+                        yield _batch(groups.pop(key))
+
+            if window is not None:
+                now = loop.time()
+                for key in [key for key, deadline in deadlines.items() if deadline <= now]:
+                    del deadlines[key]
+                    yield _batch(groups.pop(key))
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+    for group in groups.values():
+        yield _batch(group)
+    if error is not None:
+        raise error
+
+
+__all__ = ['coalesce']
@@ -0,0 +1,151 @@
+from inspect import isawaitable
+from itertools import count
+from typing import Any, AsyncIterable, Awaitable, Callable
+import asyncio
+
+from aioitd.models.notifications import NotificationType
+
+Handler = Callable[[Any], Awaitable[None] | None]
+ErrorHandler = Callable[[Any, Exception], Awaitable[None] | None]
+
+
+class NotificationDispatcher:
+    def __init__(self, workers: int = 8, queue_size: int = 100, on_error: ErrorHandler | None = None):
+        """Раздаёт события стрима обработчикам, зарегистрированным по типу уведомления или классу события.
+
+        Обработчики выполняются на `workers` воркерах. События с одинаковым `target_id` всегда попадают на один
+        воркер и обрабатываются строго по порядку, остальные распределяются по кругу. У каждого воркера очередь
+        на `queue_size` событий: если обработчики не успевают, `dispatch` перестаёт читать стрим.
+
+        Args:
+            workers: количество воркеров
+            queue_size: размер очереди воркера
+            on_error: вызывается с `(event, exception)`, если обработчик упал. Если не указан, первая ошибка
+                останавливает `dispatch` и пробрасывается из него
+
+        Examples:
+            ```python
+            dispatcher = NotificationDispatcher(workers=16)
+
+            @dispatcher.on(NotificationType.LIKE, NotificationType.REPOST)
+            async def on_like(event):
+                print(event.actor.username)
+
+            @dispatcher.on(ConnectedEvent)
+            async def on_connected(event):
+                print("подключено")
+
+            async with client.connect_notifications(reconnect=True) as events:
+                await dispatcher.dispatch(events)
+            ```
+        """
+        if workers < 1:
+            raise ValueError(f"Количество воркеров должно быть >= 1, передано {workers}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self._handlers: dict[NotificationType | type, list[Handler]] = {}
+        self._round_robin = count()
+        self._error: Exception | None = None
+        self._failed: asyncio.Future | None = None
+
+    def on(self, *keys: NotificationType | str | type) -> Callable[[Handler], Handler]:
+        """Декоратор: зарегистрировать обработчик.
+
+        Args:
+            *keys: типы уведомлений (`NotificationType` или строка) и/или классы событий
+                (`ConnectedEvent`, `ReconnectEvent`, `Notification`, ...)
+        """
+        if not keys:
+            raise ValueError("Нужно указать хотя бы один тип события")
+
+        def decorator(handler: Handler) -> Handler:
+            for key in keys:
+                self.add_handler(key, handler)
+            return handler
+
+        return decorator
+
+    def add_handler(self, key: NotificationType | str | type, handler: Handler) -> None:
+        """Зарегистрировать обработчик без декоратора."""
+        if not isinstance(key, type):
+            key = NotificationType(key)
+        self._handlers.setdefault(key, []).append(handler)
+
+    def handlers_for(self, event: Any) -> list[Handler]:
+        """Обработчики события: сначала по `event.type`, затем по классу события и его родителям.
+        Обработчик, подходящий по нескольким ключам, вызывается один раз."""
+        handlers = []
+        event_type = getattr(event, "type", None)
+        if isinstance(event_type, NotificationType):
+            handlers.extend(self._handlers.get(event_type, ()))
+        for cls in type(event).__mro__:
+            handlers.extend(self._handlers.get(cls, ()))
+        return list(dict.fromkeys(handlers))
+
+    def _shard(self, event: Any) -> int:
+        target_id = getattr(event, "target_id", None)
+        if target_id is not None:
+            return hash(target_id) % self.workers
+        return next(self._round_robin) % self.workers
+
+    async def _handle(self, event: Any, handlers: list[Handler]) -> None:
+        for handler in handlers:
+            try:
+                result = handler(event)
+                if isawaitable(result):
+                    await result
+            except Exception as ex:
+                if self.on_error is None:
+                    if self._error is None:
+                        self._error = ex
+                        self._failed.set_result(None)
+                    return
+                result = self.on_error(event, ex)
+                if isawaitable(result):
+                    await result
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                await self._handle(*item)
+
+    async def _read(self, events: AsyncIterable[Any], queues: list[asyncio.Queue], workers: list[asyncio.Task]) -> None:
+        async for event in events:
+            handlers = self.handlers_for(event)
+            if handlers:
+                await queues[self._shard(event)].put((event, handlers))
+        for queue in queues:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    async def dispatch(self, events: AsyncIterable[Any]) -> None:
+        """Читать события и раздавать их обработчикам, пока стрим не закончится.
+
+        После конца стрима дожидается обработки всех принятых событий.
+
+        Args:
+            events: стрим событий, например из `AsyncITDClient.connect_notifications`
+        """
+        self._error = None
+        self._failed = asyncio.get_running_loop().create_future()
+        queues = [asyncio.Queue(self.queue_size) for _ in range(self.workers)]
+        workers = [asyncio.create_task(self._worker(queue)) for queue in queues]
+        reader = asyncio.create_task(self._read(events, queues, workers))
+        try:
+            # ошибка обработчика прерывает чтение стрима сразу, не дожидаясь следующего события
+            await asyncio.wait((reader, self._failed), return_when=asyncio.FIRST_COMPLETED)
+            if reader.done():
+                reader.result()
+        finally:
+            for task in (reader, *workers):
+                task.cancel()
+            await asyncio.gather(reader, *workers, return_exceptions=True)
+        if self._error is not None:
+            raise self._error
+
+
+__all__ = ['NotificationDispatcher']
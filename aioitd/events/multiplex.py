@@ -0,0 +1,196 @@
+from typing import Any, Hashable
+import asyncio
+
+import httpx
+
+from aioitd.client import AsyncITDClient
+
+
+class _Stagger:
+    """Пропускает подключения не чаще, чем раз в `interval` секунд."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def __call__(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            wait = self._next - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next = loop.time() + self.interval
+
+
+_CLOSED = object()
+
+
+class NotificationMultiplexer:
+    def __init__(
+            self,
+            max_streams: int = 100,
+            stagger: float = 0.1,
+            queue_size: int = 1000,
+            client: httpx.AsyncClient | None = None,
+            domain: str = "xn--d1ah4a.com",
+            **kwargs
+    ):
+        """Стримы уведомлений многих аккаунтов, объединённые в один асинхронный итератор `(account_id, event)`.
+
+        Все аккаунты используют один `httpx.AsyncClient` (общий пул соединений), стримы переподключаются сами
+        (`connect_notifications(reconnect=True)`). Подключения, в том числе повторные, разносятся по времени
+        не меньше чем на `stagger` секунд, чтобы массовый разрыв не превращался в лавину переподключений.
+        Стрим каждого аккаунта открыт всё время, поэтому аккаунтов может быть не больше `max_streams`.
+
+        Если стрим аккаунта завершился ошибкой (например, токен отозван), вместо события придёт
+        `(account_id, exception)`, и этот аккаунт больше не переподключается.
+
+        Args:
+            max_streams: максимальное количество аккаунтов (и одновременно открытых стримов)
+            stagger: минимальный интервал между подключениями в секундах
+            queue_size: размер общей очереди событий, при переполнении стримы ждут потребителя
+            client: общий httpx.AsyncClient, если не указан, создаётся и закрывается мультиплексором
+            domain: домен
+            **kwargs: параметры `aioitd.api.connect_notifications_resilient`, например `backfill=False`
+
+        Examples:
+            ```python
+            async with NotificationMultiplexer(max_streams=500) as multiplexer:
+                for account_id, refresh_token in tokens.items():
+                    multiplexer.add(account_id, refresh_token)
+                async for account_id, event in multiplexer:
+                    print(account_id, event)
+            ```
+        """
+        if max_streams < 1:
+            raise ValueError(f"max_streams должен быть >= 1, передано {max_streams}")
+        if client is not None:
+            self.client = client
+            self.__close_client = False
+        else:
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_streams + 20, max_keepalive_connections=20)
+            )
+            self.__close_client = True
+        self.domain = domain
+        self.max_streams = max_streams
+        self._kwargs = kwargs
+        self._gate = _Stagger(stagger)
+        self._queue: asyncio.Queue[tuple[Hashable, Any]] = asyncio.Queue(queue_size)
+        self._accounts: dict[Hashable, AsyncITDClient] = {}
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self._started = False
+        self._closed = False
+        self._active = 0
+
+    @property
+    def accounts(self) -> list[Hashable]:
+        """Добавленные аккаунты"""
+        return list(self._accounts)
+
+    @property
+    def active_streams(self) -> int:
+        """Количество открытых сейчас стримов"""
+        return self._active
+
+    def add(self, account_id: Hashable, refresh_token: str | AsyncITDClient) -> None:
+        """Добавить аккаунт.
+
+        Args:
+            account_id: любой ключ, которым будут помечены события аккаунта
+            refresh_token: refresh токен аккаунта или готовый `AsyncITDClient`
+
+        Raises:
+            ValueError: аккаунт уже добавлен или добавлено уже `max_streams` аккаунтов
+        """
+        if account_id in self._accounts:
+            raise ValueError(f"Аккаунт {account_id!r} уже добавлен")
+        if len(self._accounts) >= self.max_streams:
+            raise ValueError(f"Нельзя добавить больше {self.max_streams} аккаунтов")
+        if isinstance(refresh_token, str):
+            account = AsyncITDClient(refresh_token, client=self.client, domain=self.domain)
+        else:
+            account = refresh_token
+        self._accounts[account_id] = account
+        if self._started:
+            self._start(account_id)
+
+    async def remove(self, account_id: Hashable) -> None:
+        """Закрыть стрим аккаунта и удалить его."""
+        del self._accounts[account_id]
+        task = self._tasks.pop(account_id, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, account_id: Hashable, account: AsyncITDClient) -> None:
+        self._active += 1
+        try:
+            async with account.connect_notifications(
+                    reconnect=True, connect_gate=self._gate, **self._kwargs
+            ) as events:
+                async for event in events:
+                    await self._queue.put((account_id, event))
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            await self._queue.put((account_id, ex))
+        finally:
+            self._active -= 1
+            # аккаунт могли удалить и добавить заново, тогда в _tasks уже другая задача
+            if self._tasks.get(account_id) is asyncio.current_task():
+                del self._tasks[account_id]
+
+    def _start(self, account_id: Hashable) -> None:
+        self._tasks[account_id] = asyncio.create_task(self._run(account_id, self._accounts[account_id]))
+
+    async def start(self) -> None:
+        """Запустить стримы всех добавленных аккаунтов."""
+        self._started = True
+        self._closed = False
+        for account_id in self._accounts:
+            if account_id not in self._tasks:
+                self._start(account_id)
+
+    async def close(self) -> None:
+        """Закрыть все стримы. После закрытия итерация по мультиплексору завершается."""
+        self._started = False
+        self._closed = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._queue.empty():
+            # разбудить потребителей, ждущих следующего события
+            self._queue.put_nowait(_CLOSED)
+        if self.__close_client:
+            await self.client.aclose()
+
+    def __aiter__(self) -> NotificationMultiplexer:
+        return self
+
+    async def __anext__(self) -> tuple[Hashable, Any]:
+        while True:
+            if self._closed and self._queue.empty():
+                raise StopAsyncIteration
+            item = await self._queue.get()
+            if item is not _CLOSED:
+                return item
+            if self._closed:
+                self._queue.put_nowait(_CLOSED)
+                raise StopAsyncIteration
+
+    async def __aenter__(self) -> NotificationMultiplexer:
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+
+__all__ = ['NotificationMultiplexer']
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from typing import AsyncGenerator
+import asyncio
+import time
+
+import httpx
+
+from aioitd.client import AsyncITDClient
+from aioitd.exceptions import RateLimitError, ServerError, GatewayTimeOutError
+from aioitd.models.stream import ConnectedEvent, NotificationEvent
+
+
+async def poll_notifications(
+        client: AsyncITDClient,
+        min_interval: float = 2,
+        max_interval: float = 60,
+        backoff: float = 1.5,
+        limit: int = 30,
+        max_pages: int = 10,
+) -> AsyncGenerator[ConnectedEvent | NotificationEvent, None]:
+    """Уведомления опросом, если SSE недоступен. Отдаёт те же события, что и `connect_notifications`.
+
+    Каждый тик запрашивается только `get_notifications_count`. Страницы уведомлений
+    (`get_notifications_since`) запрашиваются, лишь когда количество непрочитанных изменилось.
+    Интервал опроса подстраивается под поток уведомлений: если пришли новые уведомления, он уменьшается вдвое
+    (но не меньше `min_interval`), если нет — растёт в `backoff` раз (но не больше `max_interval`).
+    При `RateLimitError` интервал удваивается и не становится меньше `retry_after` (даже если он больше
+    `max_interval`), при временных ошибках сервера и сети тоже удваивается.
+
+    Сначала отдаётся `ConnectedEvent`, затем `NotificationEvent`, пришедшие после начала опроса,
+    от старых к новым.
+
+    Args:
+        client: клиент
+        min_interval: минимальный интервал опроса в секундах
+        max_interval: максимальный интервал опроса в секундах
+        backoff: во сколько раз растёт интервал, если новых уведомлений нет
+        limit: размер страницы `get_notifications`
+        max_pages: максимальное количество страниц за один тик
+
+    Examples:
+        ```python
+        async with AsyncITDClient(refresh_token) as client:
+            async for event in poll_notifications(client):
+                if isinstance(event, NotificationEvent):
+                    print(event.actor.username)
+        ```
+    """
+    user_id = await client.get_me_uuid()
+    sound = (await client.get_notification_settings()).sound
+    _, latest = await client.get_notifications(limit=1)
+    if latest:
+        since_id, since = latest[0].id, latest[0].created_at
+    else:
+        since_id, since = None, datetime.now(timezone.utc)
+    last_count = await client.get_notifications_count()
+    yield ConnectedEvent(userId=user_id, timestamp=int(time.time() * 1000))
+
+    interval = min_interval
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await client.get_notifications_count()
+            if count == last_count:
+                interval = min(max_interval, interval * backoff)
+                continue
+            notifications = await client.get_notifications_since(since_id, since, limit, max_pages)
+            last_count = count
+        except RateLimitError as ex:
+            # retry_after важнее max_interval: опрос раньше него снова получит 429
+            interval = max(min(max_interval, interval * 2), ex.retry_after)
+            continue
+        except (ServerError, GatewayTimeOutError, httpx.TransportError):
+            interval = min(max_interval, interval * 2)
+            continue
+
+        if notifications:
+            since_id, since = notifications[-1].id, notifications[-1].created_at
+            interval = max(min_interval, interval / 2)
+        else:
+            interval = min(max_interval, interval * backoff)
+        for notification in notifications:
+            yield NotificationEvent(**notification.model_dump(by_alias=True), userId=user_id, sound=sound)
+
+
+__all__ = ['poll_notifications']
@@ -114,6 +114,10 @@ class UploadError(ITDError):
     code = "UPLOAD_ERROR"
 
 
+class DownloadError(ITDError):
+    code = "DOWNLOAD_ERROR"
+
+
 class ParamsValidationError(ITDError):
     def __init__(self, type: str, on: str, found: dict[str, str]):
         self.type = type
@@ -1,14 +1,16 @@
+import asyncio
 import base64
 import json
 import time
 from json import JSONDecodeError
-from typing import Callable, Coroutine, Any
+from typing import Awaitable, Callable, Coroutine, Any, TypeVar
 
 import httpx
 
 from aioitd import ITDError, itd_codes, RateLimitError, ParamsValidationError, GatewayTimeOutError, \
     NotAllowedError, TooLargeError, NotFoundError, UnauthorizedError
 
+T = TypeVar("T")
 
 def decode_jwt_payload(jwt_token: str) -> dict[str, Any]:
     """Декодирует pyload jwt.
@@ -90,6 +92,18 @@ async def request(
     return result
 
 
+async def retry_rate_limited(call: Callable[[], Awaitable[T]], retries: int) -> T:
+    """Вызвать `call`, повторяя его при `RateLimitError` после `retry_after` (или с экспоненциальной задержкой,
+    если сервер её не прислал). После `retries` повторов `RateLimitError` пробрасывается."""
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except RateLimitError as ex:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(ex.retry_after if ex.retry_after > 0 else 2 ** attempt)
+
+
 async def get(
         client: httpx.AsyncClient,
         url: str,
@@ -148,4 +162,7 @@ async def patch(
     return await request(client.patch, url, json=json, params=params, headers=headers, **kwargs)
 
 
-__all__ = ['delete', 'put', 'patch', 'post', 'get', 'request', 'add_bearer', 'is_token_expired', 'decode_jwt_payload']
+__all__ = [
+    'delete', 'put', 'patch', 'post', 'get', 'request', 'add_bearer', 'is_token_expired', 'decode_jwt_payload',
+    'retry_rate_limited'
+]
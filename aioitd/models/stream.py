@@ -1,10 +1,13 @@
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Any
 from uuid import UUID
+import json
+import re
 
 from pydantic import Field
 
-from aioitd.models.base import ITDBaseModel
-from aioitd.models.notifications import Notification
+from aioitd.models.base import ITDBaseModel, ITDDatetime, datetime_from_itd_format
+from aioitd.models.notifications import Notification, NotificationType, Actor
 
 
 class SSEEvent(ITDBaseModel):
@@ -22,4 +25,133 @@ class NotificationEvent(Notification):
     sound: bool
 
 
-__all__ = ['SSEEvent', 'ConnectedEvent', 'NotificationEvent']
+class ReconnectEvent(ITDBaseModel):
+    """Переподключение к стриму. Создаётся клиентом, а не сервером."""
+    attempt: int
+    """номер попытки подряд, сбрасывается после первого полученного события"""
+    delay: float
+    """сколько секунд клиент ждёт перед переподключением"""
+    reason: str
+    """причина разрыва"""
+
+
+class NotificationBatch(ITDBaseModel):
+    """Уведомления одного типа об одной цели, собранные `aioitd.events.coalesce`. Создаётся клиентом."""
+    type: NotificationType
+    target_id: UUID | None
+    count: int
+    """количество уведомлений"""
+    actors: list[Actor]
+    """уникальные авторы в порядке прихода"""
+    notifications: list[Notification]
+    first_at: ITDDatetime
+    """время первого уведомления"""
+    last_at: ITDDatetime
+    """время последнего уведомления"""
+
+
+_TYPE_RE = re.compile(r'"type"\s*:\s*"([a-z_]+)"')
+_TARGET_ID_RE = re.compile(r'"targetId"\s*:\s*(?:"([0-9a-fA-F-]{36})"|null)')
+_ID_RE = re.compile(r'"id"\s*:\s*"([0-9a-fA-F-]{36})"')
+_ACTOR_RE = re.compile(r'"actor"\s*:\s*\{')
+_CREATED_AT_RE = re.compile(r'"createdAt"\s*:\s*"([^"]+)"')
+_NOTIFICATION_TYPES = {t.value: t for t in NotificationType}
+
+
+class RawSSEEvent:
+    """Событие стрима без валидации.
+
+    Не pydantic модель: `type` и `target_id` достаются из сырого JSON регулярным выражением, без `json.loads`
+    и без построения `NotificationEvent`. Полная модель строится только при вызове `parse`.
+    """
+    __slots__ = ('event', 'data', 'id', '_type', '_target_id', '_peeked', '_key', '_json', '_parsed')
+
+    def __init__(self, event: str, data: str, id: str | None = None):
+        self.event = event
+        """имя события (`connected`, `notification`, ...)"""
+        self.data = data
+        """сырые данные события"""
+        self.id = id
+        """id события, если сервер его прислал"""
+        self._type = None
+        self._target_id = None
+        self._peeked = False
+        self._key = None
+        self._json = None
+        self._parsed = None
+
+    def _peek(self) -> None:
+        self._peeked = True
+        if self.event != "notification":
+            return
+        type_match = _TYPE_RE.search(self.data)
+        target_match = _TARGET_ID_RE.search(self.data)
+        if type_match is None or target_match is None:
+            data = self.json()
+            self._type = _NOTIFICATION_TYPES.get(data.get("type"))
+            self._target_id = None if data.get("targetId") is None else UUID(data["targetId"])
+            return
+        self._type = _NOTIFICATION_TYPES.get(type_match.group(1))
+        self._target_id = None if target_match.group(1) is None else UUID(target_match.group(1))
+
+    @property
+    def type(self) -> NotificationType | None:
+        """Тип уведомления, None для остальных событий"""
+        if not self._peeked:
+            self._peek()
+        return self._type
+
+    @property
+    def target_id(self) -> UUID | None:
+        """UUID цели уведомления"""
+        if not self._peeked:
+            self._peek()
+        return self._target_id
+
+    def _peek_key(self) -> tuple[UUID, datetime]:
+        # у уведомления два поля "id": своё и автора, id автора — первое после начала "actor"
+        ids = list(_ID_RE.finditer(self.data))
+        actor = _ACTOR_RE.search(self.data)
+        created_at = _CREATED_AT_RE.search(self.data)
+        if len(ids) != 2 or actor is None or created_at is None:
+            data = self.json()
+            return UUID(data["id"]), datetime_from_itd_format(data["createdAt"])
+        notification_id = ids[1] if ids[0].start() > actor.start() else ids[0]
+        return UUID(notification_id.group(1)), datetime_from_itd_format(created_at.group(1))
+
+    @property
+    def notification_id(self) -> UUID:
+        """UUID уведомления, только для события `notification`"""
+        if self._key is None:
+            self._key = self._peek_key()
+        return self._key[0]
+
+    @property
+    def created_at(self) -> datetime:
+        """Время создания уведомления, только для события `notification`"""
+        if self._key is None:
+            self._key = self._peek_key()
+        return self._key[1]
+
+    def json(self) -> Any:
+        """Данные события, разобранные `json.loads` (результат кешируется)."""
+        if self._json is None:
+            self._json = json.loads(self.data)
+        return self._json
+
+    def parse(self) -> ConnectedEvent | NotificationEvent | SSEEvent:
+        """Полная модель события (результат кешируется)."""
+        if self._parsed is None:
+            if self.event == "connected":
+                self._parsed = ConnectedEvent(**self.json())
+            elif self.event == "notification":
+                self._parsed = NotificationEvent(**self.json())
+            else:
+                self._parsed = SSEEvent(event=self.event, data=self.data)
+        return self._parsed
+
+    def __repr__(self) -> str:
+        return f"RawSSEEvent(event={self.event!r}, type={self.type!r}, target_id={self.target_id!r})"
+
+
+__all__ = ['SSEEvent', 'ConnectedEvent', 'NotificationEvent', 'ReconnectEvent', 'RawSSEEvent', 'NotificationBatch']
@@ -1,8 +1,10 @@
 import re
 from html.parser import HTMLParser
 from html import escape
-from aioitd import Monospace, Bold, Spoiler, Strike, Italic, Link, Underline
-from typing import TypedDict
+from aioitd import Monospace, Bold, Spoiler, Strike, Italic, Link, Underline, BaseSpan
+from typing import TypedDict, Iterable, TypeVar
+
+S = TypeVar("S", bound=BaseSpan)
 
 TAGS = {
     "pre": Monospace,
@@ -299,4 +301,45 @@ def parse(content: str) -> ParseResult:
     return parse_html(md_to_html(content))
 
 
-__all__ = ["ParseResult", "parse", "parse_md", "parse_html"]
+def _span_key(span: BaseSpan) -> tuple:
+    return span.type, getattr(span, "url", None), getattr(span, "username", None), getattr(span, "tag", None)
+
+
+def normalize_spans(spans: Iterable[S]) -> list[S]:
+    """Нормализует форматирование.
+
+    Сливает соприкасающиеся и пересекающиеся spans одного типа (у `Link` должен совпадать ещё и url),
+    удаляет spans нулевой длины и сортирует результат по offset. Работает за O(k log k).
+
+    `<b>a</b><b>b</b>` даёт один `Bold(offset=0, length=2)` вместо двух.
+
+    Args:
+        spans: форматирование итд.com
+
+    Returns:
+        Отсортированный список spans без пересечений внутри одного типа
+    """
+    groups: dict[tuple, list[S]] = {}
+    for span in spans:
+        if span.length > 0:
+            groups.setdefault(_span_key(span), []).append(span)
+
+    result = []
+    for group in groups.values():
+        group.sort(key=lambda x: x.offset)
+        current = group[0]
+        end = current.offset + current.length
+        for span in group[1:]:
+            if span.offset <= end:
+                end = max(end, span.offset + span.length)
+                continue
+            result.append(current.model_copy(update={"length": end - current.offset}))
+            current = span
+            end = span.offset + span.length
+        result.append(current.model_copy(update={"length": end - current.offset}))
+
+    result.sort(key=lambda x: (x.offset, x.length))
+    return result
+
+
+__all__ = ["ParseResult", "parse", "parse_md", "parse_html", "normalize_spans"]
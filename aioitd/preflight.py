@@ -0,0 +1,208 @@
+from typing import Any, Mapping, Sequence
+
+from aioitd.exceptions import ParamsValidationError, ValidationError, TooLargeError, VideoRequiresVerificationError
+from aioitd.models.files import AttachmentType
+
+MAX_CONTENT_LENGTH = 1000
+MAX_SPANS = 100
+MAX_POST_ATTACHMENTS = 10
+MAX_COMMENT_ATTACHMENTS = 4
+MIN_QUESTION_LENGTH, MAX_QUESTION_LENGTH = 1, 128
+MIN_OPTIONS, MAX_OPTIONS = 2, 10
+MIN_OPTION_LENGTH, MAX_OPTION_LENGTH = 1, 32
+SNIFF_SIZE = 64
+"""Сколько первых байт файла нужно `sniff_mime`"""
+
+
+def js_len(s: str) -> int:
+    """Длина строки так, как её считает сервер (в UTF-16 code units, как `String.length` в JS).
+
+    Эмодзи и другие символы вне BMP занимают 2 единицы.
+    """
+    return len(s.encode('utf-16-le')) // 2
+
+
+def _params_error(found: dict[str, Any]) -> ParamsValidationError:
+    return ParamsValidationError(type="validation", on="body", found=found)
+
+
+def _validation_error(message: str) -> ValidationError:
+    return ValidationError(ValidationError.code, message)
+
+
+def _check_content(content: str, min_length: int = 0) -> None:
+    if not (min_length <= js_len(content) <= MAX_CONTENT_LENGTH):
+        raise _params_error({"content": content})
+
+
+_FTYP_BRANDS = {
+    b"qt  ": "video/quicktime",
+    b"M4A ": "audio/mp4",
+    b"M4B ": "audio/mp4",
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heif",
+}
+
+
+def sniff_mime(head: bytes) -> str | None:
+    """Определить MIME тип по первым байтам файла (сигнатурам форматов).
+
+    Args:
+        head: первые `SNIFF_SIZE` байт файла
+
+    Returns:
+        MIME тип или None, если формат не распознан
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12], "video/mp4")
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"ID3") or (len(head) >= 2 and head[0] == 0xff and head[1] & 0xe0 == 0xe0):
+        return "audio/mpeg"
+    return None
+
+
+def validate_upload(
+        head: bytes,
+        size: int | None = None,
+        limits: Mapping[AttachmentType, int] | None = None,
+        verified: bool | None = None,
+) -> AttachmentType | None:
+    """Проверить файл до загрузки на сервер.
+
+    Файл, формат которого `sniff_mime` не распознал, не проверяется: список форматов неполный, и решать,
+    допустим ли файл, остаётся серверу. Ограничения размера сервер не сообщает, поэтому они проверяются,
+    только если переданы в `limits`.
+
+    Args:
+        head: первые `SNIFF_SIZE` байт файла
+        size: размер файла в байтах, None — не проверять
+        limits: ограничения размера по типу вложения, None — не проверять
+        verified: верифицирован ли пользователь, None — не проверять
+
+    Returns:
+        Тип вложения, None — если формат не распознан
+
+    Raises:
+        TooLargeError: размер запроса слишком большой
+        VideoRequiresVerificationError: загрузка видео доступна только верифицированным пользователям
+    """
+    mime = sniff_mime(head)
+    if mime is None:
+        return None
+    attachment_type = AttachmentType(mime.split('/')[0])
+    limit = None if limits is None else limits.get(attachment_type)
+    if size is not None and limit is not None and size > limit:
+        raise TooLargeError(TooLargeError.code, "Размер запроса слишком большой")
+    if attachment_type == AttachmentType.VIDEO and verified is False:
+        raise VideoRequiresVerificationError(
+            VideoRequiresVerificationError.code, "Загрузка видео доступна только верифицированным пользователям"
+        )
+    return attachment_type
+
+
+def validate_post(
+        content: str = '',
+        attachment_ids: Sequence | None = None,
+        question: str | None = None,
+        options: Sequence[str] | None = None,
+        spans: Sequence | None = None,
+) -> None:
+    """Проверить пост до отправки на сервер.
+
+    Args:
+        content: текст поста
+        attachment_ids: прикреплённые файлы
+        question: заголовок опроса
+        options: варианты ответов
+        spans: форматирование текста
+
+    Raises:
+        ValidationError: Нельзя создать пост content="", attachment_ids=[], question=None
+        ParamsValidationError: len(content) <= 1_000
+        ValidationError: len(attachments_ids) <= 10
+        ParamsValidationError: len(spans) <= 100
+        ValidationError: 1 <= len(question) <= 128
+        ValidationError: 2 <= len(options) <= 10
+        ValidationError: 1 <= len(options[i]) <= 32
+    """
+    attachment_ids = attachment_ids or []
+    options = options or []
+    if content == '' and len(attachment_ids) == 0 and question is None:
+        raise _validation_error('Content, attachments or poll required')
+    _check_content(content)
+    if len(attachment_ids) > MAX_POST_ATTACHMENTS:
+        raise _validation_error('Maximum 10 attachments allowed per post')
+    if spans is not None and len(spans) > MAX_SPANS:
+        raise _params_error({"spans": len(spans)})
+    if question is not None:
+        if not (MIN_QUESTION_LENGTH <= js_len(question) <= MAX_QUESTION_LENGTH):
+            raise _validation_error(
+                f"Длина вопроса опроса от {MIN_QUESTION_LENGTH} до {MAX_QUESTION_LENGTH} символов"
+            )
+        if not (MIN_OPTIONS <= len(options) <= MAX_OPTIONS):
+            raise _validation_error(f"В опросе должно быть от {MIN_OPTIONS} до {MAX_OPTIONS} вариантов")
+        for option in options:
+            if not (MIN_OPTION_LENGTH <= js_len(option) <= MAX_OPTION_LENGTH):
+                raise _validation_error(
+                    f"Длина варианта ответа от {MIN_OPTION_LENGTH} до {MAX_OPTION_LENGTH} символов"
+                )
+
+
+def validate_post_update(content: str, spans: Sequence | None = None) -> None:
+    """Проверить изменение поста до отправки на сервер.
+
+    Args:
+        content: новый текст поста
+        spans: форматирование текста
+
+    Raises:
+        ValidationError: 1 <= len(content) <= 1_000
+        ParamsValidationError: len(spans) <= 100
+    """
+    if not (1 <= js_len(content) <= MAX_CONTENT_LENGTH):
+        raise _validation_error(f"Длина поста от 1 до {MAX_CONTENT_LENGTH} символов")
+    if spans is not None and len(spans) > MAX_SPANS:
+        raise _params_error({"spans": len(spans)})
+
+
+def validate_comment(content: str = '', attachment_ids: Sequence | None = None) -> None:
+    """Проверить комментарий или ответ до отправки на сервер.
+
+    Args:
+        content: текст комментария
+        attachment_ids: прикреплённые файлы
+
+    Raises:
+        ValidationError: нельзя создать пустой комментарий (без текста и вложений)
+        ParamsValidationError: len(attachment_ids) <= 4
+        ParamsValidationError: len(content) <= 1_000
+    """
+    attachment_ids = attachment_ids or []
+    if content == '' and len(attachment_ids) == 0:
+        raise _validation_error('Content or attachments required')
+    if len(attachment_ids) > MAX_COMMENT_ATTACHMENTS:
+        raise _params_error({"attachmentIds": [str(aid) for aid in attachment_ids]})
+    _check_content(content)
+
+
+__all__ = [
+    'js_len', 'sniff_mime', 'validate_post', 'validate_post_update', 'validate_comment', 'validate_upload'
+]
@@ -0,0 +1,399 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from os import PathLike
+from typing import Any, Literal, Mapping
+from uuid import UUID
+import asyncio
+import json
+import sqlite3
+import time
+
+import httpx
+from pydantic import TypeAdapter
+
+from aioitd.client import AsyncITDClient, validate_uuid
+from aioitd.exceptions import RateLimitError, ServerError, GatewayTimeOutError
+from aioitd.models.posts import Post, Span
+from aioitd.api.posts import PostSort
+from aioitd.parser import normalize_spans
+from aioitd.preflight import validate_post
+
+type JobState = Literal["pending", "sending", "done", "failed", "cancelled"]
+
+_spans_adapter = TypeAdapter(list[Span])
+
+_COLUMNS = "id, account, key, payload, scheduled_at, state, attempts, post_id, error"
+
+_AMBIGUOUS_ERRORS = (httpx.TransportError, ServerError, GatewayTimeOutError)
+"""ошибки, после которых неизвестно, создан ли пост"""
+
+
+@dataclass
+class PublishJob:
+    """Пост в очереди публикации."""
+    id: int
+    account: str
+    """аккаунт, от имени которого публикуется пост"""
+    content: str
+    scheduled_at: datetime
+    """время, раньше которого пост не публикуется"""
+    state: JobState
+    """pending — ждёт публикации, sending — отправлен, но результат неизвестен (таймаут или падение процесса),
+    done — опубликован, failed — публикация невозможна, cancelled — отменён"""
+    attempts: int
+    """сколько раз пост отправлялся"""
+    post_id: UUID | None
+    """UUID опубликованного поста"""
+    error: str | None
+    """последняя ошибка"""
+    key: str | None
+    """ключ идемпотентности постановки в очередь"""
+
+
+class _Pacer:
+    """Интервал между публикациями одного аккаунта, подстраивающийся под 429."""
+
+    def __init__(self, min_interval: float, max_interval: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.next_at = 0.0
+
+    async def wait(self) -> None:
+        delay = self.next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def sent(self) -> None:
+        self.next_at = time.monotonic() + self.interval
+
+    def success(self) -> None:
+        self.interval = max(self.min_interval, self.interval * 0.9)
+
+    def limited(self, retry_after: float) -> float:
+        self.interval = min(self.max_interval, max(self.interval * 2, retry_after))
+        self.next_at = time.monotonic() + max(self.interval, retry_after)
+        return max(self.interval, retry_after)
+
+
+class PublishQueue:
+    def __init__(
+            self,
+            path: str | PathLike,
+            clients: Mapping[str, AsyncITDClient],
+            min_interval: float = 5,
+            max_interval: float = 600,
+            max_attempts: int = 5,
+            retry_delay: float = 10,
+            match_window: timedelta = timedelta(minutes=10),
+            poll_interval: float = 5
+    ):
+        """Постоянная очередь отложенной публикации постов, хранится в SQLite.
+
+        Посты каждого аккаунта публикуются по одному в порядке `scheduled_at`, не чаще раза в `min_interval`
+        секунд. На `RateLimitError` интервал аккаунта удваивается (но не больше `max_interval`) и не меньше
+        `retry_after`, а после успешных публикаций постепенно возвращается к `min_interval`.
+
+        Перед отправкой пост помечается как `sending`. Если `create_post` упал по таймауту, сетевой ошибке или
+        5xx, или процесс упал во время отправки, пост остаётся в `sending`, и перед повторной отправкой на стене
+        ищется свой пост с тем же текстом, вложениями и опросом, созданный не раньше, чем за `match_window`
+        до первой отправки и ещё не записанный за другой задачей. Если он найден, задача считается выполненной,
+        поэтому пост не дублируется. Если стену проверить нельзя (например, `NotFoundError` или
+        `ForbiddenError`), задача помечается `failed`.
+
+        Файлы в очередь не передаются: загрузите их заранее и передайте `attachment_ids`.
+
+        Args:
+            path: путь к базе SQLite
+            clients: клиенты по именам аккаунтов
+            min_interval: минимальный интервал между публикациями одного аккаунта в секундах
+            max_interval: максимальный интервал между публикациями одного аккаунта в секундах
+            max_attempts: сколько раз отправлять пост, прежде чем пометить его `failed`
+            retry_delay: задержка перед первой повторной отправкой после ошибки, дальше удваивается
+            match_window: допустимое расхождение часов клиента и сервера при поиске уже опубликованного поста
+            poll_interval: как часто проверять очередь на новые посты в секундах
+
+        Examples:
+            ```python
+            async with AsyncITDClient(token1) as main, AsyncITDClient(token2) as news:
+                queue = PublishQueue("queue.sqlite", {"main": main, "news": news})
+                await queue.enqueue("news", "Доброе утро", at=datetime(2026, 1, 1, 9, tzinfo=timezone.utc),
+                                    key="morning-2026-01-01")
+                await queue.run()
+            ```
+        """
+        self.path = path
+        self.clients = clients
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.match_window = match_window
+        self.poll_interval = poll_interval
+        self._pacers = {account: _Pacer(min_interval, max_interval) for account in clients}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, account TEXT NOT NULL, key TEXT UNIQUE, payload TEXT NOT NULL, "
+            "scheduled_at REAL NOT NULL, next_attempt_at REAL NOT NULL, state TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, sent_at REAL, post_id TEXT, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (account, state, next_attempt_at)")
+        self._db.commit()
+        self._lock = asyncio.Lock()
+
+    async def _execute(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        def execute() -> list[tuple]:
+            with self._db:
+                return self._db.execute(sql, parameters).fetchall()
+
+        async with self._lock:
+            return await asyncio.to_thread(execute)
+
+    @staticmethod
+    def _job(row: tuple) -> PublishJob:
+        job_id, account, key, payload, scheduled_at, state, attempts, post_id, error = row
+        return PublishJob(
+            id=job_id,
+            account=account,
+            content=json.loads(payload)["content"],
+            scheduled_at=datetime.fromtimestamp(scheduled_at, timezone.utc),
+            state=state,
+            attempts=attempts,
+            post_id=None if post_id is None else UUID(post_id),
+            error=error,
+            key=key,
+        )
+
+    async def enqueue(
+            self,
+            account: str,
+            content: str = '',
+            at: datetime | None = None,
+            key: str | None = None,
+            attachment_ids: list[UUID | str] | None = None,
+            wall_recipient_id: UUID | str | None = None,
+            multiple_choice: bool = False,
+            question: str | None = None,
+            options: list[str] | None = None,
+            spans: list[Span] | None = None
+    ) -> int:
+        """Поставить пост в очередь. Параметры поста те же, что у `AsyncITDClient.create_post`.
+
+        Args:
+            account: имя аккаунта из `clients`
+            content: текст поста
+            at: когда опубликовать, по умолчанию сразу
+            key: ключ идемпотентности: если пост с таким ключом уже в очереди, новый не добавляется
+            attachment_ids: UUID загруженных файлов
+            wall_recipient_id: на чью стену публиковать
+            multiple_choice: возможен ли множественный выбор в опросе
+            question: заголовок опроса
+            options: варианты ответов
+            spans: форматирование текста
+
+        Returns:
+            id задачи (при повторе `key` — id существующей задачи)
+
+        Raises:
+            ValueError: неизвестный аккаунт
+            ValidationError: пост не пройдёт проверку сервера (если у клиента включён `preflight`)
+        """
+        if account not in self.clients:
+            raise ValueError(f"Неизвестный аккаунт: {account!r}")
+        attachment_ids = [validate_uuid(aid) for aid in attachment_ids] if attachment_ids is not None else None
+        if spans is not None:
+            spans = normalize_spans(spans)
+        if self.clients[account].preflight:
+            validate_post(content, attachment_ids or [], question, options, spans)
+        payload = json.dumps({
+            "content": content,
+            "attachment_ids": None if attachment_ids is None else [str(aid) for aid in attachment_ids],
+            "wall_recipient_id": None if wall_recipient_id is None else str(validate_uuid(wall_recipient_id)),
+            "multiple_choice": multiple_choice,
+            "question": question,
+            "options": options,
+            "spans": None if spans is None else _spans_adapter.dump_python(spans, mode="json", by_alias=True),
+        }, ensure_ascii=False)
+        scheduled_at = time.time() if at is None else at.timestamp()
+        rows = await self._execute(
+            "INSERT INTO jobs (account, key, payload, scheduled_at, next_attempt_at, state) "
+            "VALUES (?, ?, ?, ?, ?, 'pending') ON CONFLICT (key) DO NOTHING RETURNING id",
+            (account, key, payload, scheduled_at, scheduled_at)
+        )
+        if not rows:
+            rows = await self._execute("SELECT id FROM jobs WHERE key = ?", (key,))
+        return rows[0][0]
+
+    async def get(self, job_id: int) -> PublishJob | None:
+        """Задача по id."""
+        rows = await self._execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+        return self._job(rows[0]) if rows else None
+
+    async def jobs(self, account: str | None = None, state: JobState | None = None) -> list[PublishJob]:
+        """Задачи в порядке публикации.
+
+        Args:
+            account: только задачи этого аккаунта
+            state: только задачи в этом состоянии
+        """
+        rows = await self._execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE (?1 IS NULL OR account = ?1) AND (?2 IS NULL OR state = ?2) "
+            "ORDER BY scheduled_at, id",
+            (account, state)
+        )
+        return [self._job(row) for row in rows]
+
+    async def cancel(self, job_id: int) -> bool:
+        """Отменить ещё не отправленный пост.
+
+        Returns:
+            False, если пост уже отправлялся или задачи нет
+        """
+        rows = await self._execute(
+            "UPDATE jobs SET state = 'cancelled' WHERE id = ? AND state = 'pending' AND sent_at IS NULL RETURNING id",
+            (job_id,)
+        )
+        return bool(rows)
+
+    async def _finish(self, job_id: int, state: JobState, post_id: UUID | None = None, error: str | None = None):
+        await self._execute(
+            "UPDATE jobs SET state = ?, post_id = ?, error = ? WHERE id = ?",
+            (state, None if post_id is None else str(post_id), error, job_id)
+        )
+
+    async def _retry_later(self, job_id: int, delay: float, error: str, state: JobState = "sending") -> None:
+        await self._execute(
+            "UPDATE jobs SET state = ?, next_attempt_at = ?, error = ? WHERE id = ?",
+            (state, time.time() + delay, error, job_id)
+        )
+
+    @staticmethod
+    def _matches(post: Post, payload: dict[str, Any]) -> bool:
+        if post.content != payload["content"]:
+            return False
+        if sorted(str(attachment.id) for attachment in post.attachments) != sorted(payload["attachment_ids"] or []):
+            return False
+        if post.poll is None or payload["question"] is None:
+            return post.poll is None and payload["question"] is None
+        options = [option.text for option in sorted(post.poll.options, key=lambda option: option.position)]
+        return (
+                post.poll.question == payload["question"]
+                and options == payload["options"]
+                and post.poll.multiple_choice == payload["multiple_choice"]
+        )
+
+    async def _find_published(
+            self,
+            client: AsyncITDClient,
+            job_id: int,
+            payload: dict[str, Any],
+            sent_at: float
+    ) -> Post | None:
+        taken = {
+            UUID(post_id) for post_id, in await self._execute(
+                "SELECT post_id FROM jobs WHERE post_id IS NOT NULL AND id != ?", (job_id,)
+            )
+        }
+        if payload["wall_recipient_id"] is not None:
+            # пост на чужой стене есть только среди постов других пользователей на ней
+            _, posts = await client.get_wall_posts(payload["wall_recipient_id"], None, 20, PostSort.NEW)
+        else:
+            await client._fresh_access_token()
+            _, posts = await client.get_posts_by_user(await client.get_me_uuid(), None, 20, PostSort.NEW)
+        since = datetime.fromtimestamp(sent_at, timezone.utc) - self.match_window
+        for post in posts:
+            if post.is_owner and post.created_at >= since and post.id not in taken and self._matches(post, payload):
+                return post
+        return None
+
+    async def _publish(self, account: str, job_id: int) -> None:
+        client, pacer = self.clients[account], self._pacers[account]
+        rows = await self._execute(
+            "SELECT payload, state, attempts, sent_at FROM jobs WHERE id = ?", (job_id,)
+        )
+        payload, state, attempts, sent_at = rows[0]
+        payload = json.loads(payload)
+
+        if state == "sending":
+            try:
+                post = await self._find_published(client, job_id, payload, sent_at)
+            except RateLimitError as ex:
+                await self._retry_later(job_id, pacer.limited(ex.retry_after), f"{type(ex).__name__}: {ex}")
+                return
+            except _AMBIGUOUS_ERRORS as ex:
+                await self._retry_later(job_id, self.retry_delay, f"{type(ex).__name__}: {ex}")
+                return
+            except Exception as ex:
+                # без проверки стены повторная отправка может создать дубль
+                await self._finish(
+                    job_id, "failed", error=f"Не удалось проверить, опубликован ли пост: {type(ex).__name__}: {ex}"
+                )
+                return
+            if post is not None:
+                await self._finish(job_id, "done", post.id)
+                return
+        if attempts >= self.max_attempts:
+            await self._finish(job_id, "failed", error=f"Пост не удалось опубликовать за {attempts} попыток")
+            return
+
+        await pacer.wait()
+        await self._execute(
+            "UPDATE jobs SET state = 'sending', attempts = attempts + 1, sent_at = COALESCE(sent_at, ?) WHERE id = ?",
+            (time.time(), job_id)
+        )
+        pacer.sent()
+        spans = payload["spans"]
+        try:
+            post = await client.create_post(
+                payload["content"], payload["attachment_ids"], payload["wall_recipient_id"],
+                payload["multiple_choice"], payload["question"], payload["options"],
+                None if spans is None else _spans_adapter.validate_python(spans)
+            )
+        except RateLimitError as ex:
+            # 429 — пост точно не создан, попытка не считается
+            await self._execute("UPDATE jobs SET attempts = attempts - 1 WHERE id = ?", (job_id,))
+            await self._retry_later(job_id, pacer.limited(ex.retry_after), f"{type(ex).__name__}: {ex}", "pending")
+        except _AMBIGUOUS_ERRORS as ex:
+            await self._retry_later(job_id, self.retry_delay * 2 ** attempts, f"{type(ex).__name__}: {ex}")
+        except Exception as ex:
+            await self._finish(job_id, "failed", error=f"{type(ex).__name__}: {ex}")
+        else:
+            pacer.success()
+            await self._finish(job_id, "done", post.id)
+
+    async def _run_account(self, account: str, until_idle: bool) -> None:
+        while True:
+            rows = await self._execute(
+                "SELECT id, next_attempt_at FROM jobs WHERE account = ? AND state IN ('pending', 'sending') "
+                "ORDER BY next_attempt_at, id LIMIT 1",
+                (account,)
+            )
+            if not rows:
+                if until_idle:
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            job_id, next_attempt_at = rows[0]
+            delay = next_attempt_at - time.time()
+            if delay > 0:
+                # перепроверяем очередь не реже poll_interval: могли добавить пост с более ранним временем
+                await asyncio.sleep(min(delay, self.poll_interval))
+                continue
+            await self._publish(account, job_id)
+
+    async def run(self, until_idle: bool = False) -> None:
+        """Публиковать посты из очереди. Аккаунты обрабатываются параллельно, посты одного аккаунта — по одному.
+
+        Задачи, оставшиеся в `sending` после падения процесса, при следующем запуске сначала сверяются со стеной.
+
+        Args:
+            until_idle: завершиться, когда у всех аккаунтов не останется неопубликованных постов
+                (включая запланированные на будущее). По умолчанию работает, пока задачу не отменят
+        """
+        await asyncio.gather(*(self._run_account(account, until_idle) for account in self.clients))
+
+    def close(self) -> None:
+        """Закрыть базу."""
+        self._db.close()
+
+
+__all__ = ['JobState', 'PublishJob', 'PublishQueue']
@@ -0,0 +1,197 @@
+from collections import deque
+from itertools import count
+from os import PathLike
+from typing import Any, AsyncIterator
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+
+
+def _encode(data: bytes) -> dict[str, str]:
+    try:
+        return {"text": data.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(data).decode('ascii')}
+
+
+def _decode(record: dict[str, Any]) -> bytes:
+    if "b64" in record:
+        return base64.b64decode(record["b64"])
+    return record.get("text", "").encode('utf-8')
+
+
+def _is_stream(response: httpx.Response) -> bool:
+    return response.headers.get("content-type", "").startswith("text/event-stream")
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(self, recorder: RecordingTransport, exchange: int, stream: httpx.AsyncByteStream):
+        self._recorder = recorder
+        self._exchange = exchange
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            await self._recorder._write({"id": self._exchange, "t": self._recorder._now(), **_encode(chunk)})
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._recorder._write({"id": self._exchange, "t": self._recorder._now(), "end": True})
+        await self._stream.aclose()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, path: str | PathLike, transport: httpx.AsyncBaseTransport | None = None):
+        """Транспорт httpx, записывающий весь трафик в JSONL файл для `ReplayTransport`.
+
+        Обычные ответы записываются одной строкой вместе с задержкой ответа. SSE стримы
+        (`connect_notifications`) записываются по кускам с временем прихода каждого куска, поэтому при
+        воспроизведении события приходят с теми же интервалами.
+
+        Заголовки и тела запросов не записываются (в них токены и пароли), но тела ответов записываются
+        как есть, включая access токены из `/api/v1/auth/refresh`. Не публикуйте записи.
+
+        Args:
+            path: файл записи, перезаписывается при первом запросе
+            transport: транспорт, через который реально отправляются запросы, по умолчанию
+                `httpx.AsyncHTTPTransport()`
+
+        Examples:
+            ```python
+            client = httpx.AsyncClient(transport=RecordingTransport("traffic.jsonl"))
+            async with AsyncITDClient(refresh_token, client=client) as itd:
+                async with itd.connect_notifications() as events:
+                    async for event in events:
+                        ...
+            ```
+        """
+        self.path = path
+        self.transport = transport if transport is not None else httpx.AsyncHTTPTransport()
+        self._file = None
+        self._closed = False
+        self._lock = asyncio.Lock()
+        self._ids = count()
+        self._start = time.monotonic()
+
+    def _now(self) -> float:
+        return round(time.monotonic() - self._start, 6)
+
+    async def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+        def write() -> None:
+            if self._file is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(line)
+
+        # запись в файл не блокирует цикл событий, lock сохраняет порядок строк
+        async with self._lock:
+            if not self._closed:
+                await asyncio.to_thread(write)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        exchange = next(self._ids)
+        started = self._now()
+        response = await self.transport.handle_async_request(request)
+        record = {
+            "id": exchange,
+            "t": started,
+            "method": request.method,
+            "url": str(request.url),
+            "status": response.status_code,
+            "headers": response.headers.multi_items(),
+        }
+        if _is_stream(response):
+            await self._write(record | {"stream": True})
+            stream = _RecordingStream(self, exchange, response.stream)
+        else:
+            try:
+                content = b"".join([chunk async for chunk in response.stream])
+            finally:
+                await response.aclose()
+            await self._write(record | {"latency": round(self._now() - started, 6)} | _encode(content))
+            stream = httpx.ByteStream(content)
+        return httpx.Response(
+            response.status_code, headers=response.headers, stream=stream, extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        async with self._lock:
+            self._closed = True
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+        await self.transport.aclose()
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[tuple[float, bytes]], speed: float | None):
+        self._chunks = chunks
+        self._speed = speed
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for delay, chunk in self._chunks:
+            if self._speed:
+                await asyncio.sleep(delay / self._speed)
+            yield chunk
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, path: str | PathLike, speed: float | None = 1.0):
+        """Транспорт httpx, отвечающий на запросы записью `RecordingTransport` без обращения к сети.
+
+        Ответ ищется по методу и url: на повторяющиеся запросы ответы отдаются в том порядке, в котором они
+        были записаны. Если ответа в записи нет (или они закончились), выбрасывается `LookupError`.
+
+        Args:
+            path: файл записи
+            speed: скорость воспроизведения. 1 — в реальном времени, 10 — в 10 раз быстрее,
+                None или 0 — без задержек
+
+        Examples:
+            ```python
+            client = httpx.AsyncClient(transport=ReplayTransport("traffic.jsonl", speed=None))
+            async with AsyncITDClient(refresh_token, client=client) as itd:
+                async with itd.connect_notifications() as events:
+                    await dispatcher.dispatch(events)
+            ```
+        """
+        if speed is not None and speed < 0:
+            raise ValueError(f"speed должен быть >= 0, передано {speed}")
+        self.path = path
+        self.speed = speed
+        self._responses: dict[tuple[str, str], deque[dict[str, Any]]] = {}
+        exchanges: dict[int, dict[str, Any]] = {}
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "method" in record:
+                    record["chunks"] = []
+                    record["last"] = record["t"]
+                    exchanges[record["id"]] = record
+                    self._responses.setdefault((record["method"], record["url"]), deque()).append(record)
+                elif "end" not in record:
+                    exchange = exchanges[record["id"]]
+                    exchange["chunks"].append((record["t"] - exchange["last"], _decode(record)))
+                    exchange["last"] = record["t"]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.method, str(request.url))
+        responses = self._responses.get(key)
+        if not responses:
+            raise LookupError(f"В записи {self.path} нет ответа на {request.method} {request.url}")
+        record = responses.popleft()
+        if record.get("stream"):
+            stream = _ReplayStream(record["chunks"], self.speed)
+        else:
+            if self.speed:
+                await asyncio.sleep(record["latency"] / self.speed)
+            stream = httpx.ByteStream(_decode(record))
+        return httpx.Response(record["status"], headers=record["headers"], stream=stream)
+
+
+__all__ = ['RecordingTransport', 'ReplayTransport']
@@ -0,0 +1,233 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from os import PathLike
+from typing import Iterable, Protocol
+from uuid import UUID
+import asyncio
+import json
+import sqlite3
+
+from aioitd.client import AsyncITDClient
+from aioitd.models.posts import Post
+from aioitd.api.posts import PostSort
+
+
+@dataclass
+class SyncState:
+    """Отметка синхронизации одного пользователя."""
+    post_id: UUID | None = None
+    """самый новый увиденный пост"""
+    created_at: datetime | None = None
+    """время создания самого нового увиденного поста"""
+    recent: dict[UUID, tuple[datetime, datetime | None]] = field(default_factory=dict)
+    """посты в окне редактирования: id -> (created_at, edited_at)"""
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "post_id": None if self.post_id is None else str(self.post_id),
+            "created_at": None if self.created_at is None else self.created_at.isoformat(),
+            "recent": {
+                str(post_id): [created_at.isoformat(), None if edited_at is None else edited_at.isoformat()]
+                for post_id, (created_at, edited_at) in self.recent.items()
+            },
+        })
+
+    @classmethod
+    def from_json(cls, data: str) -> SyncState:
+        raw = json.loads(data)
+        return cls(
+            post_id=None if raw["post_id"] is None else UUID(raw["post_id"]),
+            created_at=None if raw["created_at"] is None else datetime.fromisoformat(raw["created_at"]),
+            recent={
+                UUID(post_id): (
+                    datetime.fromisoformat(created_at), None if edited_at is None else datetime.fromisoformat(edited_at)
+                )
+                for post_id, (created_at, edited_at) in raw["recent"].items()
+            },
+        )
+
+
+class SyncStore(Protocol):
+    """Хранилище отметок синхронизации. Достаточно реализовать `load` и `save`."""
+
+    async def load(self, key: str) -> SyncState | None: ...
+
+    async def save(self, key: str, state: SyncState) -> None: ...
+
+
+class MemorySyncStore:
+    """Отметки синхронизации в памяти процесса."""
+
+    def __init__(self):
+        self.states: dict[str, SyncState] = {}
+
+    async def load(self, key: str) -> SyncState | None:
+        return self.states.get(key)
+
+    async def save(self, key: str, state: SyncState) -> None:
+        self.states[key] = state
+
+
+class SQLiteSyncStore:
+    def __init__(self, path: str | PathLike):
+        """Отметки синхронизации в SQLite.
+
+        Args:
+            path: путь к базе
+        """
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, state TEXT NOT NULL)")
+        self._db.commit()
+        self._lock = asyncio.Lock()
+
+    async def _execute(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        def execute() -> list[tuple]:
+            with self._db:
+                return self._db.execute(sql, parameters).fetchall()
+
+        async with self._lock:
+            return await asyncio.to_thread(execute)
+
+    async def load(self, key: str) -> SyncState | None:
+        rows = await self._execute("SELECT state FROM sync_state WHERE key = ?", (key,))
+        return SyncState.from_json(rows[0][0]) if rows else None
+
+    async def save(self, key: str, state: SyncState) -> None:
+        await self._execute("INSERT OR REPLACE INTO sync_state (key, state) VALUES (?, ?)", (key, state.to_json()))
+
+    def close(self) -> None:
+        """Закрыть базу."""
+        self._db.close()
+
+
+@dataclass
+class SyncResult:
+    """Результат синхронизации одного пользователя."""
+    new: list[Post] = field(default_factory=list)
+    """новые посты от старых к новым"""
+    edited: list[Post] = field(default_factory=list)
+    """посты, изменённые с прошлой синхронизации"""
+    pages: int = 0
+    """сколько страниц запрошено"""
+
+
+class TimelineSync:
+    def __init__(
+            self,
+            client: AsyncITDClient,
+            store: SyncStore | None = None,
+            edit_window: timedelta = timedelta(days=2),
+            limit: int = 50,
+            initial_pages: int | None = None
+    ):
+        """Инкрементальная синхронизация постов пользователей.
+
+        Для каждого пользователя в `store` хранится самый новый увиденный пост. `sync` листает
+        `get_posts_by_user(sort="new")` только до этой отметки и до начала окна редактирования `edit_window`,
+        поэтому регулярная синхронизация обычно стоит одну страницу на пользователя. Посты в окне редактирования
+        запоминаются вместе с `edited_at`, и изменённые с прошлого раза попадают в `SyncResult.edited`.
+
+        Args:
+            client: клиент
+            store: хранилище отметок, по умолчанию `MemorySyncStore`
+            edit_window: сколько после создания пост ещё могут изменить
+            limit: размер страницы (1 <= limit <= 50)
+            initial_pages: сколько страниц листать при первой синхронизации пользователя, None — всю историю
+
+        Examples:
+            ```python
+            store = SQLiteSyncStore("sync.sqlite")
+            async with AsyncITDClient(refresh_token) as client:
+                sync = TimelineSync(client, store)
+                for username, result in await sync.sync_many(["user1", "user2"]):
+                    archive(result.new)
+                    update(result.edited)
+            ```
+        """
+        self.client = client
+        self.store = store if store is not None else MemorySyncStore()
+        self.edit_window = edit_window
+        self.limit = limit
+        self.initial_pages = initial_pages
+
+    @staticmethod
+    def _is_new(post: Post, state: SyncState) -> bool:
+        if state.created_at is None:
+            return True
+        return post.created_at > state.created_at or (
+            post.created_at == state.created_at and post.id != state.post_id and post.id not in state.recent
+        )
+
+    async def sync(self, username_or_id: str | UUID) -> SyncResult:
+        """Синхронизировать одного пользователя и сохранить новую отметку.
+
+        Args:
+            username_or_id: имя пользователя или его UUID
+
+        Returns:
+            Новые и изменённые посты
+        """
+        key = str(username_or_id)
+        state = await self.store.load(key) or SyncState()
+        window_start = datetime.now(timezone.utc) - self.edit_window
+        boundary = None if state.created_at is None else min(state.created_at, window_start)
+        max_pages = self.initial_pages if state.created_at is None else None
+
+        result = SyncResult()
+        recent: dict[UUID, tuple[datetime, datetime | None]] = {}
+        newest = None
+        cursor = None
+        while max_pages is None or result.pages < max_pages:
+            pagination, posts = await self.client.get_posts_by_user(
+                username_or_id, cursor, self.limit, PostSort.NEW
+            )
+            result.pages += 1
+            for post in posts:
+                if newest is None or post.created_at > newest.created_at:
+                    newest = post
+                if post.created_at >= window_start:
+                    recent[post.id] = (post.created_at, post.edited_at)
+                if self._is_new(post, state):
+                    result.new.append(post)
+                elif post.id in state.recent and state.recent[post.id][1] != post.edited_at:
+                    result.edited.append(post)
+            if not pagination.has_more or not posts or (boundary is not None and posts[-1].created_at <= boundary):
+                break
+            cursor = pagination.next_cursor
+
+        result.new.sort(key=lambda post: post.created_at)
+        if newest is not None and (state.created_at is None or newest.created_at >= state.created_at):
+            state.post_id, state.created_at = newest.id, newest.created_at
+        state.recent = recent
+        await self.store.save(key, state)
+        return result
+
+    async def sync_many(
+            self,
+            users: Iterable[str | UUID],
+            concurrency: int = 4
+    ) -> list[tuple[str | UUID, SyncResult | Exception]]:
+        """Синхронизировать нескольких пользователей параллельно.
+
+        Args:
+            users: имена пользователей или их UUID
+            concurrency: сколько пользователей синхронизировать одновременно
+
+        Returns:
+            Пары (пользователь, результат). Если синхронизация пользователя упала, вместо результата — исключение,
+            а его отметка не меняется
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def sync(user: str | UUID) -> tuple[str | UUID, SyncResult | Exception]:
+            async with semaphore:
+                try:
+                    return user, await self.sync(user)
+                except Exception as ex:
+                    return user, ex
+
+        return list(await asyncio.gather(*(sync(user) for user in users)))
+
+
+__all__ = ['SyncState', 'SyncStore', 'MemorySyncStore', 'SQLiteSyncStore', 'SyncResult', 'TimelineSync']
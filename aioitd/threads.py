@@ -0,0 +1,363 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, Literal
+from uuid import UUID
+import asyncio
+
+from aioitd.client import AsyncITDClient, validate_uuid
+from aioitd.exceptions import ITDError, NotFoundError
+from aioitd.models.base import TotalPagination
+from aioitd.models.comments import Comment, Reply
+from aioitd.models.users import UserStab
+from aioitd.api.posts import CommentSort
+
+
+async def iter_comments(
+        client: AsyncITDClient,
+        post_id: UUID | str,
+        sort: CommentSort | Literal["popular", "newest", "oldest"] = CommentSort.OLDEST,
+        limit: int = 100,
+        prefetch: bool = True,
+        flat: bool = False,
+        max_pages: int | None = None
+) -> AsyncIterator[Comment | Reply]:
+    """Все комментарии поста с автоматическим листанием страниц `get_post_comments`.
+
+    Пока обрабатывается одна страница, следующая уже запрашивается. Комментарии, повторившиеся на соседних
+    страницах (например, при сортировке "popular" порядок меняется между запросами), отдаются один раз.
+
+    Args:
+        client: клиент
+        post_id: UUID поста (можно передавать строку)
+        sort: сортировка ("popular", "newest", "oldest")
+        limit: размер страницы (1 <= limit <= 500)
+        prefetch: запрашивать следующую страницу заранее
+        flat: отдавать ответы сразу после их комментария, а не только внутри `Comment.replies`
+        max_pages: максимальное количество страниц, None — все
+
+    Examples:
+        ```python
+        async for comment in iter_comments(client, post_id, flat=True):
+            if is_spam(comment.content):
+                await client.delete_comment(comment.id)
+        ```
+    """
+    post_id = validate_uuid(post_id)
+    seen: set[UUID] = set()
+    pages = 0
+
+    def fetch(cursor: str | None) -> asyncio.Task[tuple[TotalPagination, list[Comment]]]:
+        return asyncio.ensure_future(client.get_post_comments(post_id, cursor, limit, sort))
+
+    task = fetch(None)
+    try:
+        while task is not None:
+            pagination, comments = await task
+            pages += 1
+            more = pagination.has_more and pagination.next_cursor and comments and (
+                max_pages is None or pages < max_pages
+            )
+            task = fetch(pagination.next_cursor) if more and prefetch else None
+            for comment in comments:
+                if comment.id in seen:
+                    continue
+                seen.add(comment.id)
+                yield comment
+                if flat:
+                    for reply in _walk(comment.replies):
+                        if reply.id not in seen:
+                            seen.add(reply.id)
+                            yield reply
+            if more and not prefetch:
+                task = fetch(pagination.next_cursor)
+    finally:
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+def _walk(replies: Iterable[Reply]) -> Iterator[Reply]:
+    for reply in replies:
+        yield reply
+        yield from _walk(reply.replies)
+
+
+class CommentThread:
+    def __init__(self, comments: Iterable[Comment] = ()):
+        """Индекс дерева комментариев поста по id.
+
+        Хранит для каждого комментария родителя, детей и адресата ответа (`Reply.reply_to`), поэтому поддерево
+        или все ответы пользователю находятся без перебора всего списка. Комментарии, добавленные повторно,
+        заменяют старую версию (например, с обновлённым `likes_count`).
+
+        Args:
+            comments: комментарии верхнего уровня вместе с `replies`
+
+        Examples:
+            ```python
+            thread = await CommentThread.from_post(client, post_id)
+            for reply in thread.subtree(comment_id):
+                print(reply.author.username, reply.content)
+            ```
+        """
+        self._comments: dict[UUID, Comment | Reply] = {}
+        self._parents: dict[UUID, UUID | None] = {}
+        self._children: dict[UUID, list[UUID]] = {}
+        self._roots: list[UUID] = []
+        self._reply_to: dict[UUID, list[UUID]] = {}
+        for comment in comments:
+            self.add(comment)
+
+    @classmethod
+    async def from_post(
+            cls,
+            client: AsyncITDClient,
+            post_id: UUID | str,
+            sort: CommentSort | Literal["popular", "newest", "oldest"] = CommentSort.OLDEST,
+            limit: int = 100
+    ) -> CommentThread:
+        """Загрузить все комментарии поста через `iter_comments`."""
+        thread = cls()
+        async for comment in iter_comments(client, post_id, sort, limit):
+            thread.add(comment)
+        return thread
+
+    def add(self, comment: Comment | Reply, parent: UUID | None = None) -> bool:
+        """Добавить комментарий вместе с его ответами.
+
+        Args:
+            comment: комментарий или ответ
+            parent: id родительского комментария для ответа, None — комментарий верхнего уровня
+
+        Returns:
+            False, если комментарий уже был в индексе (он заменяется новой версией)
+        """
+        known = comment.id in self._comments
+        if not known:
+            self._parents[comment.id] = parent
+            self._children[comment.id] = []
+            if parent is None:
+                self._roots.append(comment.id)
+            else:
+                self._children.setdefault(parent, []).append(comment.id)
+            reply_to = getattr(comment, "reply_to", None)
+            if reply_to is not None:
+                self._reply_to.setdefault(reply_to.id, []).append(comment.id)
+        self._comments[comment.id] = comment
+        for reply in comment.replies:
+            self.add(reply, comment.id)
+        return not known
+
+    def __len__(self) -> int:
+        return len(self._comments)
+
+    def __contains__(self, comment_id: UUID) -> bool:
+        return comment_id in self._comments
+
+    def __getitem__(self, comment_id: UUID) -> Comment | Reply:
+        return self._comments[comment_id]
+
+    def __iter__(self) -> Iterator[Comment | Reply]:
+        """Все комментарии в порядке дерева: каждый комментарий, затем его ответы."""
+        for root in self._roots:
+            yield from self.subtree(root)
+
+    @property
+    def roots(self) -> list[Comment]:
+        """Комментарии верхнего уровня в порядке добавления."""
+        return [self._comments[comment_id] for comment_id in self._roots]
+
+    def parent(self, comment_id: UUID) -> Comment | None:
+        """Родительский комментарий, None — для комментария верхнего уровня."""
+        parent = self._parents[comment_id]
+        return None if parent is None else self._comments[parent]
+
+    def children(self, comment_id: UUID) -> list[Reply]:
+        """Прямые ответы на комментарий."""
+        return [self._comments[child] for child in self._children[comment_id]]
+
+    def subtree(self, comment_id: UUID) -> Iterator[Comment | Reply]:
+        """Комментарий и все ответы под ним в глубину."""
+        stack = [comment_id]
+        while stack:
+            current = stack.pop()
+            yield self._comments[current]
+            stack.extend(reversed(self._children[current]))
+
+    def reply_to(self, comment_id: UUID) -> UserStab | None:
+        """Пользователь, которому адресован ответ."""
+        return getattr(self._comments[comment_id], "reply_to", None)
+
+    def replies_to(self, user_id: UUID) -> list[Reply]:
+        """Все ответы, адресованные пользователю."""
+        return [self._comments[reply] for reply in self._reply_to.get(user_id, ())]
+
+    def missing_replies(self, comment_id: UUID) -> int:
+        """Сколько ответов на комментарий сервер не вернул (`replies_count` минус известные ответы)."""
+        return max(0, self._comments[comment_id].replies_count - len(self._children[comment_id]))
+
+
+_MAX_REPLIES = 10_000
+
+
+@dataclass
+class _WatchedPost:
+    comments_count: int | None = None
+    newest_at: datetime | None = None
+    """время создания самого нового увиденного комментария"""
+    newest_ids: set[UUID] = field(default_factory=set)
+    """увиденные комментарии, созданные ровно в `newest_at`"""
+    replies: dict[UUID, None] = field(default_factory=dict)
+    """увиденные ответы в порядке появления, не больше `_MAX_REPLIES`"""
+
+
+class CommentWatcher:
+    def __init__(
+            self,
+            client: AsyncITDClient,
+            posts: Iterable[UUID | str] = (),
+            interval: float = 30,
+            limit: int = 20,
+            max_pages: int = 10,
+            concurrency: int = 4
+    ):
+        """Отслеживание новых комментариев и ответов под постами.
+
+        Каждая проверка обновляет все посты одним `get_posts_by_ids` и пропускает посты, у которых не изменился
+        `comments_count`. Под изменившимися постами комментарии листаются с сортировкой "newest" только до
+        самого нового уже увиденного комментария. Новые ответы ищутся среди ответов на просмотренные
+        комментарии, поэтому ответ на старый комментарий, не попавший на просмотренные страницы, не найдётся.
+
+        Первая проверка поста только запоминает его текущее состояние, уже существующие комментарии не отдаются.
+        Удалённые посты (`NotFoundError`) перестают отслеживаться.
+
+        Args:
+            client: клиент
+            posts: UUID постов (можно передавать строки)
+            interval: интервал между проверками в секундах
+            limit: размер страницы комментариев (1 <= limit <= 500)
+            max_pages: максимальное количество страниц комментариев за одну проверку поста
+            concurrency: сколько постов проверять одновременно
+
+        Examples:
+            ```python
+            watcher = CommentWatcher(client, post_ids)
+            async for post_id, comment in watcher.stream():
+                if is_spam(comment.content):
+                    await client.delete_comment(comment.id)
+            ```
+        """
+        self.client = client
+        self.interval = interval
+        self.limit = limit
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self._posts: dict[UUID, _WatchedPost] = {}
+        self.errors: dict[UUID, Exception] = {}
+        """ошибки последней проверки по постам"""
+        for post_id in posts:
+            self.watch(post_id)
+
+    def watch(self, post_id: UUID | str) -> None:
+        """Начать отслеживать пост."""
+        self._posts.setdefault(validate_uuid(post_id), _WatchedPost())
+
+    def unwatch(self, post_id: UUID | str) -> None:
+        """Перестать отслеживать пост."""
+        self._posts.pop(validate_uuid(post_id), None)
+
+    @property
+    def posts(self) -> list[UUID]:
+        """Отслеживаемые посты."""
+        return list(self._posts)
+
+    async def _scan(self, post_id: UUID, state: _WatchedPost) -> list[Comment | Reply]:
+        groups: list[list[Comment | Reply]] = []
+        replies: list[UUID] = []
+        first = state.newest_at is None
+        newest_at, newest_ids = state.newest_at, set(state.newest_ids)
+        cursor = None
+        for _ in range(self.max_pages):
+            pagination, comments = await self.client.get_post_comments(post_id, cursor, self.limit, CommentSort.NEWEST)
+            reached = False
+            for comment in comments:
+                if newest_at is None or comment.created_at > newest_at:
+                    newest_at, newest_ids = comment.created_at, {comment.id}
+                elif comment.created_at == newest_at:
+                    newest_ids.add(comment.id)
+                group = []
+                # комментарий с тем же временем, что и самый новый увиденный, может быть новым
+                if state.newest_at is not None and (
+                        comment.created_at < state.newest_at
+                        or comment.created_at == state.newest_at and comment.id in state.newest_ids
+                ):
+                    reached = True
+                elif not first:
+                    group.append(comment)
+                for reply in _walk(comment.replies):
+                    replies.append(reply.id)
+                    if not first and reply.id not in state.replies:
+                        group.append(reply)
+                groups.append(group)
+            if first or reached or not pagination.has_more or not pagination.next_cursor:
+                break
+            cursor = pagination.next_cursor
+        state.newest_at, state.newest_ids = newest_at, newest_ids
+        # ответы на комментарии, не попавшие на просмотренные страницы, не забываются: иначе они отдадутся
+        # повторно, когда комментарий снова окажется на первой странице (например, после удаления новых)
+        for reply_id in replies:
+            state.replies[reply_id] = None
+        while len(state.replies) > _MAX_REPLIES:
+            del state.replies[next(iter(state.replies))]
+        return [comment for group in reversed(groups) for comment in group]
+
+    async def poll(self) -> list[tuple[UUID, Comment | Reply]]:
+        """Проверить все посты один раз.
+
+        Ошибки отдельных постов не прерывают проверку: они сохраняются в `errors`, а пост проверяется снова
+        в следующий раз.
+
+        Returns:
+            Пары (UUID поста, новый комментарий или ответ) от старых к новым
+        """
+        posts = await self.client.get_posts_by_ids(list(self._posts), concurrency=self.concurrency, use_cache=False)
+        self.errors = {}
+        changed = []
+        for post_id, post in posts.items():
+            state = self._posts.get(post_id)
+            if state is None:
+                continue
+            if isinstance(post, NotFoundError):
+                self.unwatch(post_id)
+            elif isinstance(post, Exception):
+                self.errors[post_id] = post
+            elif post.comments_count != state.comments_count:
+                changed.append((post_id, state, post.comments_count))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def scan(post_id: UUID, state: _WatchedPost, comments_count: int) -> list[tuple[UUID, Comment | Reply]]:
+            async with semaphore:
+                try:
+                    new = await self._scan(post_id, state)
+                except ITDError as ex:
+                    self.errors[post_id] = ex
+                    return []
+            state.comments_count = comments_count
+            return [(post_id, comment) for comment in new]
+
+        results = await asyncio.gather(*(scan(*args) for args in changed))
+        return [item for result in results for item in result]
+
+    async def stream(self) -> AsyncIterator[tuple[UUID, Comment | Reply]]:
+        """Проверять посты каждые `interval` секунд и отдавать новые комментарии и ответы."""
+        while True:
+            for item in await self.poll():
+                yield item
+            await asyncio.sleep(self.interval)
+
+
+__all__ = ['iter_comments', 'CommentThread', 'CommentWatcher']
@@ -0,0 +1,116 @@
+from os import PathLike
+from uuid import UUID
+import asyncio
+import sqlite3
+import time
+
+import httpx
+
+from aioitd.models.files import File
+
+
+class UploadCache:
+    def __init__(self, path: str | PathLike = ":memory:", verify: bool = True, verify_interval: float = 600):
+        """Кэш загруженных файлов по владельцу и SHA-256 содержимого, хранится в SQLite.
+
+        Если передать кэш в `AsyncITDClient(upload_cache=...)` (или `upload_file(..., cache=...)`), то файл
+        с уже загруженным содержимым не отправляется повторно: возвращается `File` из кэша. Перед повторным
+        использованием запись проверяется HEAD запросом на `File.url` (не чаще раза в `verify_interval` секунд),
+        и если файла больше нет (404), запись удаляется, а файл загружается заново. `AsyncITDClient.delete_file`
+        удаляет запись сразу.
+
+        Записи разделены по пользователю, загрузившему файл: один кэш можно передать клиентам разных
+        аккаунтов, и аккаунт не получит чужой файл (прикрепить его к посту сервер бы не дал).
+
+        Файлы из асинхронных итераторов байт не кэшируются: чтобы посчитать хэш, их пришлось бы прочитать дважды.
+
+        Args:
+            path: путь к базе SQLite, по умолчанию кэш хранится в памяти
+            verify: проверять, что файл из кэша ещё существует
+            verify_interval: сколько секунд считать проверенную запись действительной
+
+        Examples:
+            ```python
+            cache = UploadCache("uploads.sqlite")
+            async with AsyncITDClient(refresh_token, upload_cache=cache) as client:
+                for text in texts:
+                    await client.create_post(text, files=["logo.png"])  # logo.png загрузится один раз
+            cache.close()
+            ```
+        """
+        self.path = path
+        self.verify = verify
+        self.verify_interval = verify_interval
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads (owner TEXT NOT NULL, sha256 TEXT NOT NULL, file TEXT NOT NULL, "
+            "checked_at REAL NOT NULL, PRIMARY KEY (owner, sha256))"
+        )
+        self._db.commit()
+        self._lock = asyncio.Lock()
+
+    async def _execute(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        def execute() -> list[tuple]:
+            with self._db:
+                return self._db.execute(sql, parameters).fetchall()
+
+        async with self._lock:
+            return await asyncio.to_thread(execute)
+
+    async def get(self, owner: UUID, sha256: str) -> File | None:
+        """Файл из кэша без проверки."""
+        rows = await self._execute("SELECT file FROM uploads WHERE owner = ? AND sha256 = ?", (str(owner), sha256))
+        return File.model_validate_json(rows[0][0]) if rows else None
+
+    async def put(self, owner: UUID, sha256: str, file: File) -> None:
+        """Запомнить загруженный файл."""
+        await self._execute(
+            "INSERT OR REPLACE INTO uploads (owner, sha256, file, checked_at) VALUES (?, ?, ?, ?)",
+            (str(owner), sha256, file.model_dump_json(by_alias=True), time.time())
+        )
+
+    async def discard(self, owner: UUID, sha256: str) -> None:
+        """Удалить запись."""
+        await self._execute("DELETE FROM uploads WHERE owner = ? AND sha256 = ?", (str(owner), sha256))
+
+    async def forget(self, file_id: UUID) -> None:
+        """Удалить записи удалённого с сервера файла у всех владельцев."""
+        await self._execute("DELETE FROM uploads WHERE json_extract(file, '$.id') = ?", (str(file_id),))
+
+    async def lookup(self, client: httpx.AsyncClient, owner: UUID, sha256: str, **kwargs) -> File | None:
+        """Файл из кэша, если он есть и ещё существует на сервере.
+
+        Args:
+            client: httpx.AsyncClient для проверки
+            owner: UUID пользователя, загрузившего файл
+            sha256: hex SHA-256 содержимого
+
+        Returns:
+            Файл или None, если его нужно загрузить
+        """
+        rows = await self._execute(
+            "SELECT file, checked_at FROM uploads WHERE owner = ? AND sha256 = ?", (str(owner), sha256)
+        )
+        if not rows:
+            return None
+        file = File.model_validate_json(rows[0][0])
+        if not self.verify or time.time() - rows[0][1] < self.verify_interval:
+            return file
+        response = await client.head(file.url, **kwargs)
+        if response.status_code in (404, 410):
+            await self.discard(owner, sha256)
+            return None
+        await self._execute(
+            "UPDATE uploads SET checked_at = ? WHERE owner = ? AND sha256 = ?", (time.time(), str(owner), sha256)
+        )
+        return file
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+
+    def close(self) -> None:
+        """Закрыть базу."""
+        self._db.close()
+
+
+__all__ = ['UploadCache']
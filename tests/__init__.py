@@ -0,0 +1,15 @@
+import base64
+import json
+import time
+from uuid import uuid4
+
+from aioitd import Post
+
+
+def make_access_token() -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": str(uuid4()), "exp": time.time() + 3600}).encode())
+    return "header." + payload.decode().rstrip("=") + ".signature"
+
+
+def make_post(**kwargs) -> Post:
+    return Post.model_construct(**{"id": uuid4(), "is_liked": False, "is_viewed": False, "likes_count": 0} | kwargs)
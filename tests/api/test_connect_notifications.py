@@ -2,8 +2,8 @@ import pytest
 
 from tests.api import client, access_token
 
-from aioitd import SSEError
-from aioitd.api.stream import connect_notifications
+from aioitd import SSEError, ConnectedEvent
+from aioitd.api.stream import connect_notifications, connect_notifications_resilient
 
 
 @pytest.mark.asyncio
@@ -16,3 +16,14 @@ async def test_connect_notifications(client, access_token):
     async with connect_notifications(client, access_token) as events:
         async for event in events:
             break
+
+
+@pytest.mark.asyncio
+async def test_connect_notifications_resilient(client, access_token):
+    async def get_access_token():
+        return access_token
+
+    async with connect_notifications_resilient(client, get_access_token) as events:
+        async for event in events:
+            assert isinstance(event, ConnectedEvent)
+            break
@@ -6,7 +6,8 @@ from tests.api import client, access_token
 
 from aioitd import UnauthorizedError, ParamsValidationError, ITDError
 from aioitd.api.notifications import get_notifications, get_notifications_count, read_all_notifications, \
-    read_notification, read_batch_notifications, get_notification_settings, update_notification_settings
+    read_notification, read_batch_notifications, get_notification_settings, update_notification_settings, \
+    get_notifications_since
 
 
 @pytest.mark.asyncio
@@ -79,4 +80,11 @@ async def test_update_notifications_settings(client, access_token):
         await update_notification_settings(client, '123')
     await update_notification_settings(client, access_token)
     await update_notification_settings(client, access_token, enabled=False)
-    await update_notification_settings(client, access_token, True, True, True, True, True, True, True)
\ No newline at end of file
+    await update_notification_settings(client, access_token, True, True, True, True, True, True, True)
+
+
+@pytest.mark.asyncio
+async def test_get_notifications_since(client, access_token):
+    _, notifications = await get_notifications(client, access_token, limit=3)
+    newer = await get_notifications_since(client, access_token, since_id=notifications[-1].id, limit=1)
+    assert newer == notifications[-2::-1]
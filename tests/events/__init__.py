@@ -0,0 +1,51 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from aioitd import NotificationEvent, ConnectedEvent
+
+user_id = UUID('330dea20-bb7c-4c96-ad09-97150f1ad5f6')
+
+
+def make_event(type: str = 'like', target_id: UUID | None = None) -> NotificationEvent:
+    return NotificationEvent(
+        id=uuid4(),
+        createdAt=datetime.now(timezone.utc),
+        preview=None,
+        read=False,
+        actor={
+            "id": uuid4(), "username": "user", "displayName": "user", "avatar": "",
+            "isFollowedBy": False, "isFollowing": False
+        },
+        readAt=None,
+        targetId=target_id,
+        targetType=None if target_id is None else 'post',
+        type=type,
+        userId=user_id,
+        sound=False,
+    )
+
+
+def make_connected() -> ConnectedEvent:
+    return ConnectedEvent(userId=user_id, timestamp=0)
+
+
+class FakeClient:
+    """Клиент, стрим которого отдаёт заранее заданные события."""
+
+    def __init__(self, events: list, error: Exception | None = None):
+        self.events = events
+        self.error = error
+        self.connections = 0
+
+    @asynccontextmanager
+    async def connect_notifications(self, **kwargs):
+        self.connections += 1
+
+        async def events():
+            for event in self.events:
+                yield event
+            if self.error is not None:
+                raise self.error
+
+        yield events()
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from aioitd import NotificationType, ConnectedEvent
+from aioitd.events import NotificationBroadcaster, Overflow
+
+from tests.events import FakeClient, make_event, make_connected
+
+
+async def collect(subscription) -> list:
+    return [event async for event in subscription]
+
+
+@pytest.mark.asyncio
+async def test_broadcast():
+    events = [make_connected(), make_event('like'), make_event('reply'), make_event('like')]
+    client = FakeClient(events)
+    broadcaster = NotificationBroadcaster(client)
+    everything = broadcaster.subscribe()
+    likes = broadcaster.subscribe([NotificationType.LIKE])
+    async with broadcaster:
+        assert await collect(everything) == events
+        assert await collect(likes) == [events[1], events[3]]
+    assert client.connections == 1
+    assert likes.stats.received == 2
+    assert likes.stats.delivered == 2
+
+
+@pytest.mark.asyncio
+async def test_overflow():
+    events = [make_event() for _ in range(5)]
+    broadcaster = NotificationBroadcaster(FakeClient(events))
+    oldest = broadcaster.subscribe(maxsize=2, overflow=Overflow.DROP_OLDEST)
+    newest = broadcaster.subscribe(maxsize=2, overflow='drop_newest')
+    async with broadcaster:
+        await asyncio.sleep(0.01)
+        assert oldest.stats.max_lag == 2
+        assert await collect(oldest) == events[3:]
+        assert await collect(newest) == events[:2]
+    assert oldest.stats.dropped == 3
+    assert newest.stats.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_block():
+    events = [make_event() for _ in range(5)]
+    broadcaster = NotificationBroadcaster(FakeClient(events))
+    blocking = broadcaster.subscribe(maxsize=1, overflow=Overflow.BLOCK)
+    async with broadcaster:
+        assert await collect(blocking) == events
+    assert blocking.stats.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_error():
+    broadcaster = NotificationBroadcaster(FakeClient([make_connected()], error=RuntimeError("boom")))
+    subscription = broadcaster.subscribe()
+    async with broadcaster:
+        assert isinstance(await anext(subscription), ConnectedEvent)
+        with pytest.raises(RuntimeError):
+            await anext(subscription)
+
+
+@pytest.mark.asyncio
+async def test_subscribe_after_finish():
+    broadcaster = NotificationBroadcaster(FakeClient([make_connected()], error=RuntimeError("boom")))
+    async with broadcaster:
+        await asyncio.sleep(0.01)
+        late = broadcaster.subscribe()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(anext(late), 1)
+    assert broadcaster.subscriptions == []
+
+
+@pytest.mark.asyncio
+async def test_restart():
+    events = [make_connected(), make_event()]
+    client = FakeClient(events)
+    broadcaster = NotificationBroadcaster(client)
+    async with broadcaster:
+        await asyncio.sleep(0.01)
+        assert await asyncio.wait_for(collect(broadcaster.subscribe()), 1) == []
+        await broadcaster.start()
+        subscription = broadcaster.subscribe()
+        assert await asyncio.wait_for(collect(subscription), 1) == events
+    assert client.connections == 2
@@ -0,0 +1,66 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from aioitd import NotificationBatch, NotificationEvent, ConnectedEvent
+from aioitd.events import coalesce
+
+from tests.events import make_event, make_connected
+
+
+async def aiter(events, delay: float = 0):
+    for event in events:
+        if delay:
+            await asyncio.sleep(delay)
+        yield event
+
+
+async def collect(events) -> list:
+    return [event async for event in events]
+
+
+@pytest.mark.asyncio
+async def test_coalesce():
+    post_a, post_b = uuid4(), uuid4()
+    events = [
+        make_connected(),
+        make_event('like', post_a),
+        make_event('like', post_b),
+        make_event('reply', post_a),
+        make_event('like', post_a),
+    ]
+    result = await collect(coalesce(aiter(events), window=10))
+    assert isinstance(result[0], ConnectedEvent)
+    assert result[1] is events[3]
+    batches = {batch.target_id: batch for batch in result[2:]}
+    assert batches[post_a].count == 2
+    assert batches[post_a].notifications == [events[1], events[4]]
+    assert len(batches[post_a].actors) == 2
+    assert batches[post_b].count == 1
+
+
+@pytest.mark.asyncio
+async def test_max_size():
+    post = uuid4()
+    events = [make_event('like', post) for _ in range(5)]
+    result = await collect(coalesce(aiter(events), window=None, max_size=2))
+    assert [batch.count for batch in result] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_window():
+    post = uuid4()
+    events = [make_event('like', post) for _ in range(4)]
+    result = await collect(coalesce(aiter(events, delay=0.03), window=0.05))
+    assert all(isinstance(batch, NotificationBatch) for batch in result)
+    assert len(result) >= 2
+    assert sum(batch.count for batch in result) == 4
+
+
+@pytest.mark.asyncio
+async def test_individual():
+    post = uuid4()
+    events = [make_event('like', post), make_event('like', post)]
+    result = await collect(coalesce(aiter(events), individual=['like']))
+    assert all(isinstance(event, NotificationEvent) for event in result)
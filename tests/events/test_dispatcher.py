@@ -0,0 +1,106 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from aioitd import NotificationType, ConnectedEvent, Notification
+from aioitd.events import NotificationDispatcher
+
+from tests.events import make_event, make_connected
+
+
+async def aiter(events):
+    for event in events:
+        yield event
+
+
+@pytest.mark.asyncio
+async def test_dispatch():
+    dispatcher = NotificationDispatcher(workers=4)
+    likes, connected, all_notifications = [], [], []
+
+    @dispatcher.on(NotificationType.LIKE, 'repost')
+    async def on_like(event):
+        likes.append(event)
+
+    @dispatcher.on(ConnectedEvent)
+    def on_connected(event):
+        connected.append(event)
+
+    @dispatcher.on(Notification)
+    async def on_notification(event):
+        all_notifications.append(event)
+
+    events = [make_connected(), make_event('like'), make_event('reply'), make_event('repost')]
+    await dispatcher.dispatch(aiter(events))
+
+    assert sorted(map(id, likes)) == sorted(map(id, [events[1], events[3]]))
+    assert connected == [events[0]]
+    assert len(all_notifications) == 3
+
+
+@pytest.mark.asyncio
+async def test_target_order():
+    dispatcher = NotificationDispatcher(workers=8)
+    target_id = uuid4()
+    handled = []
+
+    @dispatcher.on(NotificationType.LIKE)
+    async def on_like(event):
+        await asyncio.sleep(0.01 if len(handled) % 2 == 0 else 0)
+        handled.append(event)
+
+    events = [make_event('like', target_id) for _ in range(10)]
+    await dispatcher.dispatch(aiter(events))
+    assert handled == events
+
+
+@pytest.mark.asyncio
+async def test_errors():
+    dispatcher = NotificationDispatcher()
+
+    @dispatcher.on(NotificationType.LIKE)
+    async def on_like(event):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await dispatcher.dispatch(aiter([make_event('like')]))
+
+    errors = []
+    dispatcher.on_error = lambda event, ex: errors.append(ex)
+    await dispatcher.dispatch(aiter([make_event('like'), make_event('like')]))
+    assert len(errors) == 2
+
+
+@pytest.mark.asyncio
+async def test_error_stops_idle_stream():
+    dispatcher = NotificationDispatcher()
+    closed = asyncio.Event()
+
+    @dispatcher.on(NotificationType.LIKE)
+    async def on_like(event):
+        raise RuntimeError("boom")
+
+    async def events():
+        try:
+            yield make_event('like')
+            await asyncio.Event().wait()
+        finally:
+            closed.set()
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(dispatcher.dispatch(events()), 1)
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_handler_deduplicated():
+    dispatcher = NotificationDispatcher()
+    handled = []
+
+    @dispatcher.on(NotificationType.LIKE, Notification)
+    async def on_like(event):
+        handled.append(event)
+
+    await dispatcher.dispatch(aiter([make_event('like'), make_event('reply')]))
+    assert len(handled) == 2
@@ -0,0 +1,108 @@
+from contextlib import asynccontextmanager
+import asyncio
+
+import pytest
+
+from aioitd.events import NotificationMultiplexer
+
+from tests.events import FakeClient, make_event, make_connected
+
+
+class OpenClient(FakeClient):
+    """Клиент, стрим которого проходит через `connect_gate` и после событий остаётся открытым."""
+
+    def __init__(self, events: list, error: Exception | None = None):
+        super().__init__(events, error)
+        self.connected_at: list[float] = []
+        self.closed = 0
+
+    @asynccontextmanager
+    async def connect_notifications(self, connect_gate=None, **kwargs):
+        if connect_gate is not None:
+            await connect_gate()
+        self.connections += 1
+        self.connected_at.append(asyncio.get_running_loop().time())
+
+        async def events():
+            for event in self.events:
+                yield event
+            if self.error is not None:
+                raise self.error
+            await asyncio.Event().wait()
+
+        try:
+            yield events()
+        finally:
+            self.closed += 1
+
+
+@pytest.mark.asyncio
+async def test_max_streams():
+    async with NotificationMultiplexer(max_streams=2) as multiplexer:
+        multiplexer.add("a", OpenClient([]))
+        multiplexer.add("b", OpenClient([]))
+        with pytest.raises(ValueError):
+            multiplexer.add("c", OpenClient([]))
+        with pytest.raises(ValueError):
+            multiplexer.add("a", OpenClient([]))
+        await asyncio.sleep(0.01)
+        assert multiplexer.active_streams == 2
+        await multiplexer.remove("a")
+        multiplexer.add("c", OpenClient([]))
+        assert sorted(multiplexer.accounts) == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_stagger():
+    clients = [OpenClient([make_connected()]) for _ in range(3)]
+    async with NotificationMultiplexer(stagger=0.05) as multiplexer:
+        for account_id, client in enumerate(clients):
+            multiplexer.add(account_id, client)
+        events = [await asyncio.wait_for(anext(multiplexer), 1) for _ in clients]
+    assert sorted(account_id for account_id, _ in events) == [0, 1, 2]
+    times = sorted(time for client in clients for time in client.connected_at)
+    assert all(later - earlier >= 0.045 for earlier, later in zip(times, times[1:]))
+
+
+@pytest.mark.asyncio
+async def test_add_remove():
+    first, second = make_event(), make_event()
+    a, b = OpenClient([first]), OpenClient([second])
+    multiplexer = NotificationMultiplexer(stagger=0)
+    multiplexer.add("a", a)
+    async with multiplexer:
+        assert await asyncio.wait_for(anext(multiplexer), 1) == ("a", first)
+        multiplexer.add("b", b)
+        assert await asyncio.wait_for(anext(multiplexer), 1) == ("b", second)
+
+        await multiplexer.remove("a")
+        assert a.closed == 1
+        multiplexer.add("a", a)
+        assert await asyncio.wait_for(anext(multiplexer), 1) == ("a", first)
+        assert "a" in multiplexer._tasks
+    assert a.closed == 2 and b.closed == 1
+    assert multiplexer._tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_error():
+    error = RuntimeError("revoked")
+    async with NotificationMultiplexer(stagger=0) as multiplexer:
+        multiplexer.add("a", OpenClient([], error=error))
+        assert await asyncio.wait_for(anext(multiplexer), 1) == ("a", error)
+        await asyncio.sleep(0)
+        assert multiplexer.active_streams == 0
+        assert multiplexer._tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_close():
+    multiplexer = NotificationMultiplexer(stagger=0)
+    multiplexer.add("a", OpenClient([]))
+    await multiplexer.start()
+    waiting = asyncio.create_task(anext(multiplexer))
+    await asyncio.sleep(0.01)
+    await multiplexer.close()
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(waiting, 1)
+    assert [item async for item in multiplexer] == []
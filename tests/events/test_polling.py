@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aioitd import NotificationEvent, ConnectedEvent, Notification, RateLimitError
+from aioitd.events import poll_notifications
+
+from tests.events import make_event, user_id
+
+
+class PollingClient:
+    """Клиент, у которого на каждом опросе заранее задано количество непрочитанных и новые уведомления."""
+
+    def __init__(self, ticks: list[tuple[int | Exception, list[Notification]]]):
+        self.ticks = ticks
+        self.count = 0
+        self.since_calls = []
+
+    async def get_me_uuid(self):
+        return user_id
+
+    async def get_notification_settings(self):
+        return SimpleNamespace(sound=True)
+
+    async def get_notifications(self, offset=0, limit=30):
+        return False, []
+
+    async def get_notifications_count(self):
+        if self.count == 0:
+            self.count += 1
+            return 0
+        count, self.pending = self.ticks.pop(0)
+        if isinstance(count, Exception):
+            raise count
+        return count
+
+    async def get_notifications_since(self, since_id, since, limit, max_pages):
+        self.since_calls.append(since_id)
+        return self.pending
+
+
+def make_notification(type: str) -> Notification:
+    return Notification.model_validate(make_event(type).model_dump(by_alias=True, exclude={"user_id", "sound"}))
+
+
+@pytest.mark.asyncio
+async def test_poll_notifications():
+    first, second = make_notification('like'), make_notification('follow')
+    client = PollingClient([
+        (0, []),
+        (1, [first]),
+        (RateLimitError("RATE_LIMIT", "", 0), []),
+        (1, []),
+        (2, [second]),
+    ])
+    events = []
+    async for event in poll_notifications(client, min_interval=0, max_interval=0):
+        events.append(event)
+        if len(events) == 3:
+            break
+
+    assert isinstance(events[0], ConnectedEvent)
+    assert all(isinstance(event, NotificationEvent) for event in events[1:])
+    assert [event.id for event in events[1:]] == [first.id, second.id]
+    assert events[1].user_id == user_id and events[1].sound
+    assert client.since_calls == [None, first.id]
+
+
+@pytest.mark.asyncio
+async def test_poll_notifications_retry_after(monkeypatch):
+    sleeps, sleep = [], asyncio.sleep
+
+    async def record(delay):
+        sleeps.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", record)
+    notification = make_notification('like')
+    client = PollingClient([(RateLimitError("RATE_LIMIT", "", 5), []), (1, [notification])])
+    events = []
+    async for event in poll_notifications(client, min_interval=0.1, max_interval=1):
+        events.append(event)
+        if len(events) == 2:
+            break
+
+    # retry_after больше max_interval, и следующий опрос не раньше него
+    assert sleeps == [0.1, 5]
+    assert events[1].id == notification.id
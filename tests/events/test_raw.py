@@ -0,0 +1,44 @@
+import json
+
+from aioitd import RawSSEEvent, NotificationType, NotificationEvent, ConnectedEvent
+
+from tests.events import make_event, make_connected
+
+
+def to_raw(event) -> RawSSEEvent:
+    if isinstance(event, ConnectedEvent):
+        return RawSSEEvent("connected", event.model_dump_json(by_alias=True))
+    return RawSSEEvent("notification", event.model_dump_json(by_alias=True))
+
+
+def test_raw_event():
+    event = make_event('reply')
+    raw = to_raw(event)
+    assert raw.type == NotificationType.REPLY
+    assert raw.target_id is None
+    assert raw.parse().id == event.id
+    assert raw.parse() is raw.parse()
+
+    event = make_event('like', make_event().id)
+    raw = to_raw(event)
+    assert raw.type == NotificationType.LIKE
+    assert raw.target_id == event.target_id
+    assert isinstance(raw.parse(), NotificationEvent)
+
+
+def test_raw_connected():
+    raw = to_raw(make_connected())
+    assert raw.type is None
+    assert raw.target_id is None
+    assert isinstance(raw.parse(), ConnectedEvent)
+
+
+def test_raw_key_without_json():
+    event = make_event('like', make_event().id)
+    data = event.model_dump(mode='json', by_alias=True)
+    actor_first = json.dumps({"actor": data.pop("actor"), **data})
+    for raw in (to_raw(event), RawSSEEvent("notification", actor_first)):
+        assert raw.notification_id == event.id
+        created_at = raw.created_at
+        assert raw._json is None
+        assert created_at == raw.parse().created_at
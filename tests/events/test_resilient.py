@@ -0,0 +1,164 @@
+import json
+
+import httpx
+
+from aioitd import ReconnectEvent, ConnectedEvent, NotificationEvent, Notification
+from aioitd.api import connect_notifications_resilient
+import aioitd.api.stream as stream
+
+from tests.events import make_event, make_connected
+
+
+def sse(event: str, data: str, id: str | None = None) -> str:
+    return (f"id: {id}\n" if id is not None else "") + f"event: {event}\ndata: {data}\n\n"
+
+
+class SilentStream(httpx.AsyncByteStream):
+    """Стрим, который отдаёт данные и затем молчит дольше таймаута чтения."""
+
+    def __init__(self, data: str):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data.encode()
+        raise httpx.ReadTimeout("сервер молчит")
+
+
+def event_stream(content: str | httpx.AsyncByteStream) -> httpx.Response:
+    headers = {"content-type": "text/event-stream"}
+    if isinstance(content, str):
+        return httpx.Response(200, headers=headers, content=content)
+    return httpx.Response(200, headers=headers, stream=content)
+
+
+class StreamServer:
+    """Отдаёт заранее заданные ответы на подключения к стриму и запоминает запросы."""
+
+    def __init__(self, responses: list):
+        self.responses = responses
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0)()
+
+
+async def get_access_token() -> str:
+    return "token"
+
+
+async def collect(server: StreamServer, count: int, **kwargs) -> list:
+    events = []
+    http = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    kwargs = {"base_delay": 0, "backfill": False} | kwargs
+    async with connect_notifications_resilient(http, get_access_token, **kwargs) as source:
+        async for event in source:
+            events.append(event)
+            if len(events) == count:
+                break
+    await http.aclose()
+    return events
+
+
+async def test_reconnect_with_last_event_id():
+    connected, first, second = make_connected(), make_event(), make_event()
+    server = StreamServer([
+        lambda: event_stream(sse("connected", connected.model_dump_json(by_alias=True), "1")
+                             + sse("notification", first.model_dump_json(by_alias=True), "2")),
+        lambda: event_stream(sse("notification", second.model_dump_json(by_alias=True), "3")),
+    ])
+    events = await collect(server, 4)
+
+    assert isinstance(events[0], ConnectedEvent)
+    assert [type(event) for event in events[1:]] == [NotificationEvent, ReconnectEvent, NotificationEvent]
+    assert events[2].reason == "стрим закрыт сервером" and events[2].attempt == 1
+    assert events[3].id == second.id
+    assert "last-event-id" not in server.requests[0].headers
+    assert server.requests[1].headers["last-event-id"] == "2"
+    assert server.requests[1].headers["authorization"] == "Bearer token"
+
+
+async def test_reconnect_on_429_and_5xx(monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0
+
+    monkeypatch.setattr(stream.random, "uniform", uniform)
+    event = make_event()
+    server = StreamServer([
+        lambda: httpx.Response(429, json={"error": "Too Many Requests", "retry_after": 0}),
+        lambda: httpx.Response(503, text="Service Unavailable"),
+        lambda: httpx.Response(502, text="Bad Gateway"),
+        lambda: event_stream(sse("notification", event.model_dump_json(by_alias=True))),
+    ])
+    events = await collect(server, 4, base_delay=1, max_delay=3)
+
+    assert [(e.attempt, e.reason) for e in events[:3]] == [(1, "HTTP 429"), (2, "HTTP 503"), (3, "HTTP 502")]
+    # full jitter: задержка от 0 до base_delay * 2 ** (attempt - 1), не больше max_delay
+    assert bounds == [(0, 1), (0, 2), (0, 3)]
+    assert events[3].id == event.id
+
+
+async def test_silence_reconnect():
+    event = make_event()
+    server = StreamServer([
+        lambda: event_stream(SilentStream(sse("notification", event.model_dump_json(by_alias=True)))),
+        lambda: event_stream(sse("connected", json.dumps({"userId": str(event.user_id), "timestamp": 0}))),
+    ])
+    events = await collect(server, 3, missed_pings=3)
+
+    assert events[0].id == event.id
+    assert isinstance(events[1], ReconnectEvent) and events[1].reason.startswith("ReadTimeout")
+    # попытки считаются заново после полученного события
+    assert events[1].attempt == 1
+    assert isinstance(events[2], ConnectedEvent)
+    assert server.requests[0].extensions["timeout"]["read"] == stream.ITD_SSE_PING * 3 + 1
+
+
+def test_watermark():
+    watermark = stream._Watermark(size=2)
+    first, second, third = make_event(), make_event(), make_event()
+    assert watermark.deliver(first.id, first.created_at)
+    assert not watermark.deliver(first.id, first.created_at)
+    assert watermark.deliver_event(second) and watermark.deliver_event(third)
+    assert watermark.id == third.id
+    # окно дедупликации ограничено: самое старое уведомление забыто
+    assert watermark.deliver(first.id, first.created_at)
+    assert not watermark.deliver_event(third)
+
+
+async def test_backfill_delivered_once():
+    connected, seen, missed, live = make_connected(), make_event(), make_event(), make_event()
+    server = StreamServer([
+        lambda: event_stream(sse("connected", connected.model_dump_json(by_alias=True))
+                             + sse("notification", seen.model_dump_json(by_alias=True))),
+        lambda: event_stream(sse("notification", missed.model_dump_json(by_alias=True))
+                             + sse("notification", live.model_dump_json(by_alias=True))),
+    ])
+    backfill_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/notifications/":
+            backfill_requests.append(request)
+            notifications = [
+                event.model_dump(mode="json", by_alias=True, exclude={"user_id", "sound"}) for event in (missed, seen)
+            ]
+            return httpx.Response(200, json={"hasMore": True, "notifications": notifications})
+        return server(request)
+
+    events = []
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with connect_notifications_resilient(http, get_access_token, base_delay=0) as source:
+        async for event in source:
+            events.append(event)
+            if len(events) == 5:
+                break
+    await http.aclose()
+
+    assert isinstance(events[2], ReconnectEvent)
+    # пропущенное уведомление догружено, а его повтор в стриме отброшен
+    assert isinstance(events[3], Notification) and not isinstance(events[3], NotificationEvent)
+    assert [event.id for event in events[3:]] == [missed.id, live.id]
+    assert len(backfill_requests) == 1
@@ -0,0 +1,142 @@
+import asyncio
+from uuid import uuid4
+
+import httpx
+
+from aioitd import AsyncITDClient, RateLimitError, NotFoundError
+
+from tests import make_access_token, make_post
+
+
+async def test_like_posts():
+    calls = []
+    limited = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        post_id = request.url.path.split("/")[3]
+        calls.append(post_id)
+        if post_id == str(rate_limited.id) and not limited:
+            limited.append(post_id)
+            return httpx.Response(429, json={"error": "Too Many Requests", "retry_after": 0})
+        if post_id == str(missing):
+            return httpx.Response(404, text="NOT_FOUND")
+        return httpx.Response(200, json={"liked": True, "likesCount": 5})
+
+    liked, fresh, rate_limited, missing = make_post(is_liked=True), make_post(), make_post(), uuid4()
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http) as client:
+        client._access_token = make_access_token()
+        results = await client.like_posts([liked, fresh, fresh, str(fresh.id), rate_limited, missing])
+    await http.aclose()
+
+    assert list(results) == [liked.id, fresh.id, rate_limited.id, missing]
+    assert results[liked.id] is None and results[fresh.id] == 5 and results[rate_limited.id] == 5
+    assert isinstance(results[missing], Exception) and not isinstance(results[missing], RateLimitError)
+    assert sorted(calls) == sorted([str(fresh.id), str(rate_limited.id), str(rate_limited.id), str(missing)])
+    assert fresh.is_liked and fresh.likes_count == 5
+
+
+async def test_like_posts_transport_error():
+    def handler(request: httpx.Request) -> httpx.Response:
+        post_id = request.url.path.split("/")[3]
+        if post_id == str(offline.id):
+            raise httpx.ConnectError("offline", request=request)
+        if post_id == str(missing.id):
+            return httpx.Response(404, text="NOT_FOUND")
+        return httpx.Response(200, json={"liked": True, "likesCount": 1})
+
+    liked, offline, missing = make_post(), make_post(), make_post()
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http) as client:
+        client._access_token = make_access_token()
+        results = await client.like_posts([liked, offline, missing])
+    await http.aclose()
+
+    # сетевая ошибка одного поста не отменяет остальные запросы
+    assert results[liked.id] == 1 and liked.is_liked
+    assert isinstance(results[offline.id], httpx.ConnectError) and not offline.is_liked
+    assert isinstance(results[missing.id], NotFoundError)
+
+
+async def test_view_posts():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"success": True})
+
+    viewed, fresh = make_post(is_viewed=True), make_post()
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http) as client:
+        client._access_token = make_access_token()
+        results = await client.view_posts([viewed, fresh, fresh])
+    await http.aclose()
+
+    assert results == {viewed.id: False, fresh.id: True}
+    assert len(calls) == 1 and fresh.is_viewed
+
+
+async def test_get_posts_by_ids():
+    calls = []
+    posts = {post.id: post for post in (make_post(), make_post(), make_post())}
+    first, second, limited = posts
+    missing = uuid4()
+
+    async def get_post(post_id):
+        calls.append(post_id)
+        await asyncio.sleep(0)
+        if post_id == missing:
+            raise NotFoundError("NOT_FOUND", "Post not found")
+        if post_id == limited and calls.count(limited) == 1:
+            raise RateLimitError("RATE_LIMIT_EXCEEDED", "Too Many Requests", 0)
+        return ["comment"], posts[post_id]
+
+    async with AsyncITDClient() as client:
+        client.get_post = get_post
+        results, coalesced = await asyncio.gather(
+            client.get_posts_by_ids([first, str(first), limited, missing]),
+            client.get_posts_by_ids([first])
+        )
+        assert list(results) == [first, limited, missing]
+        assert results[first] is posts[first] and results[limited] is posts[limited]
+        assert isinstance(results[missing], NotFoundError)
+        assert coalesced == {first: posts[first]}
+        assert calls.count(first) == 1 and calls.count(limited) == 2
+
+        calls.clear()
+        assert await client.get_posts_by_ids([first, second]) == {first: posts[first], second: posts[second]}
+        assert calls == [second]
+
+        calls.clear()
+        assert await client.get_posts_by_ids([first], comments=True) == {first: (["comment"], posts[first])}
+        assert await client.get_posts_by_ids([first], comments=True) == {first: (["comment"], posts[first])}
+        assert calls == [first]
+
+
+async def test_post_cache_eviction(monkeypatch):
+    post = make_post()
+
+    async def get_post(post_id):
+        return [], post
+
+    async def changed(*args, **kwargs):
+        return 1
+
+    for name in ("like_post", "unlike_post", "view_post", "update_post", "vote", "repost"):
+        monkeypatch.setattr(f"aioitd.client.{name}", changed)
+
+    async with AsyncITDClient() as client:
+        client._access_token = make_access_token()
+        client.get_post = get_post
+        for method, args in [
+            (client.like_post, ()), (client.unlike_post, ()), (client.view_post, ()),
+            (client.update_post, ("text",)), (client.vote_poll, ([uuid4()],)), (client.repost, ())
+        ]:
+            await client.get_posts_by_ids([post.id])
+            assert post.id in client._post_cache
+            await method(post.id, *args)
+            assert post.id not in client._post_cache, method.__name__
+
+        await client.get_posts_by_ids([post.id])
+        await client.like_posts([post.id])
+        assert post.id not in client._post_cache
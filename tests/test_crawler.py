@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+import asyncio
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from aioitd import AsyncITDClient, NotFoundError, RateLimitError
+from aioitd.crawler import GraphCrawler
+
+from tests import make_access_token
+
+
+class GraphClient:
+    """Клиент с графом подписок из пар (подписчик, на кого подписан)."""
+
+    def __init__(self, edges, broken=(), limited=(), delays=None):
+        self.edges = edges
+        self.broken = set(broken)
+        self.limited = set(limited)
+        self.delays = delays or {}
+        self.requests = 0
+
+    async def _page(self, users, page, limit):
+        self.requests += 1
+        start = (page - 1) * limit
+        return SimpleNamespace(has_more=start + limit < len(users)), [
+            SimpleNamespace(id=user) for user in users[start:start + limit]
+        ]
+
+    async def get_followers(self, user_id, page=1, limit=30):
+        if user_id in self.broken:
+            raise NotFoundError("NOT_FOUND", "User not found")
+        if user_id in self.limited:
+            self.requests += 1
+            raise RateLimitError("RATE_LIMIT_EXCEEDED", "Too Many Requests", 0)
+        return await self._page([a for a, b in self.edges if b == user_id], page, limit)
+
+    async def get_following(self, user_id, page=1, limit=30):
+        await asyncio.sleep(self.delays.get(user_id, 0))
+        return await self._page([b for a, b in self.edges if a == user_id], page, limit)
+
+
+class ListSink:
+    def __init__(self, fail_after=None):
+        self.edges = []
+        self.fail_after = fail_after
+
+    async def write(self, edges):
+        if self.fail_after is not None and len(self.edges) >= self.fail_after:
+            raise RuntimeError("sink упал")
+        self.edges += edges
+
+
+def make_graph():
+    seed, a, b, c, d, far = (uuid4() for _ in range(6))
+    edges = [(a, seed), (b, seed), (seed, c), (a, b), (c, d), (d, far), (b, a)]
+    return seed, (a, b, c, d, far), edges
+
+
+async def test_crawler():
+    seed, (a, b, c, d, far), edges = make_graph()
+    client = GraphClient(edges, broken=[c])
+    sink = ListSink()
+    crawler = GraphCrawler(client, sink, max_depth=2, limit=1, concurrency=3)
+    stats = await crawler.run([seed])
+
+    # far на глубине 3 не найден, подписчики c недоступны
+    assert set(sink.edges) == set(edges) - {(d, far)}
+    assert crawler.visited() == 5 and crawler.pending() == 0
+    assert stats.expanded == 4 and stats.discovered == 4 and stats.errors == 1
+    crawler.close()
+
+
+async def test_crawler_shorter_path_found_later():
+    fast, slow, a, c, d = (uuid4() for _ in range(5))
+    edges = [(fast, a), (a, c), (slow, c), (c, d)]
+    client = GraphClient(edges, delays={slow: 0.05})
+    sink = ListSink()
+    crawler = GraphCrawler(client, sink, max_depth=2, directions=["following"], concurrency=2)
+    # c сначала найден на глубине 2 через fast -> a, и только потом на глубине 1 через медленный slow
+    stats = await crawler.run([fast, slow])
+    assert (c, d) in sink.edges
+    assert crawler._db.execute("SELECT depth FROM nodes WHERE id = ?", (c.bytes,)).fetchone()[0] == 1
+    assert stats.discovered == 3 and crawler.visited() == 5 and crawler.pending() == 0
+    crawler.close()
+
+
+async def test_crawler_resume(tmp_path):
+    seed, _, edges = make_graph()
+    path = tmp_path / "crawl.sqlite"
+    sink = ListSink(fail_after=3)
+    crawler = GraphCrawler(GraphClient(edges), sink, path, max_depth=3, limit=1, concurrency=1)
+    with pytest.raises(RuntimeError):
+        await crawler.run([seed])
+    crawler.close()
+
+    client = GraphClient(edges)
+    sink.fail_after = None
+    crawler = GraphCrawler(client, sink, path, max_depth=3, limit=1, concurrency=2)
+    await crawler.run()
+    assert set(sink.edges) == set(edges)
+    assert crawler.pending() == 0 and crawler.visited() == 6
+    crawler.close()
+
+
+async def test_crawler_rate_limited():
+    seed, _, edges = make_graph()
+    client = GraphClient(edges, limited=[seed])
+    sink = ListSink()
+    crawler = GraphCrawler(client, sink, max_depth=1, directions=["followers"], retries=1)
+    stats = await crawler.run([seed])
+    # после retries повторов пользователь отложен, его прогресс не изменился
+    assert stats.deferred == 1 and stats.expanded == 0 and stats.errors == 0
+    assert client.requests == 2 and crawler.pending() == 1 and sink.edges == []
+
+    client.limited.clear()
+    stats = await crawler.run()
+    assert stats.expanded == 1 and crawler.pending() == 0
+    assert set(sink.edges) == {(a, b) for a, b in edges if b == seed}
+    crawler.close()
+
+
+async def test_first_page_allowed():
+    pages = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        pages.append(request.url.params["page"])
+        pagination = {"total": 0, "hasMore": False, "limit": 30, "page": 1}
+        return httpx.Response(200, json={"data": {"pagination": pagination, "users": []}})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http) as client:
+        client._access_token = make_access_token()
+        await client.get_followers(uuid4())
+        await client.get_following(uuid4(), page=1)
+        await client.get_blocked()
+        with pytest.raises(ValueError):
+            await client.get_followers(uuid4(), page=0)
+    await http.aclose()
+    assert pages == ["1", "1", "1"]
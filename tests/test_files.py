@@ -0,0 +1,248 @@
+import asyncio
+import io
+
+import httpx
+import pytest
+
+from aioitd import AsyncITDClient, ITDError, DownloadError
+from aioitd.api.files import FileSource, BandwidthLimiter, upload_file, upload_files, download_file
+from aioitd.upload_cache import UploadCache
+
+from tests import make_access_token
+
+FILE = {
+    "id": "330dea20-bb7c-4c96-ad09-97150f1ad5f6", "filename": "image.jpg", "mimeType": "image/jpeg",
+    "size": 0, "url": "https://example.com/image.jpg"
+}
+
+
+class Upload:
+    """Сервер, который разбирает multipart тело так же, как httpx, и запоминает загруженные файлы."""
+
+    def __init__(self):
+        self.files = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        assert int(request.headers["content-length"]) == len(body)
+        boundary = request.headers["content-type"].split("boundary=")[1].encode()
+        part = body.split(b"--" + boundary)[1]
+        headers, content = part.split(b"\r\n\r\n", 1)
+        self.files.append((headers.decode(), content[:-2]))
+        return httpx.Response(200, json=FILE)
+
+
+async def test_upload_sources(tmp_path):
+    data = bytes(range(256)) * 100
+    path = tmp_path / "image.jpg"
+    path.write_bytes(data)
+    server = Upload()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server.handler)) as client:
+        await upload_file(client, "token", data, domain="example.com")
+        await upload_file(client, "token", str(path), domain="example.com")
+        with open(path, "rb") as file:
+            file.read(10)
+            await upload_file(client, "token", FileSource(file, chunk_size=1000), domain="example.com")
+
+    assert [content for _, content in server.files] == [data, data, data[10:]]
+    assert 'filename="image.jpg"' in server.files[1][0]
+    assert "Content-Type: image/jpeg" in server.files[1][0]
+
+
+async def test_file_source_replay():
+    source = FileSource(io.BytesIO(b"abc" * 10), chunk_size=4)
+    assert await source.size() == 30
+    assert b"".join([chunk async for chunk in source]) == b"abc" * 10
+    assert b"".join([chunk async for chunk in source]) == b"abc" * 10
+
+
+async def test_upload_files_cleanup():
+    deleted = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "DELETE":
+            deleted.append(request.url.path.rsplit("/", 1)[1])
+            return httpx.Response(204)
+        body = await request.aread()
+        if b"broken" in body:
+            return httpx.Response(400, json={"error": {"code": "UPLOAD_ERROR", "message": "error"}})
+        return httpx.Response(200, json=FILE)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        files = await upload_files(client, "token", [b"1", b"2", b"3"], concurrency=2, domain="example.com")
+        assert len(files) == 3 and not deleted
+        with pytest.raises(ITDError):
+            await upload_files(client, "token", [b"1", b"broken"], concurrency=1, domain="example.com")
+    assert deleted == [FILE["id"]]
+
+
+async def test_bandwidth_limiter():
+    limiter = BandwidthLimiter(1000, burst=100)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(3):
+        await limiter.acquire(100)
+    assert loop.time() - start >= 0.19
+
+
+async def test_upload_cache():
+    uploads, exists = [], True
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "HEAD":
+            return httpx.Response(200 if exists else 404)
+        uploads.append(await request.aread())
+        return httpx.Response(200, json=FILE)
+
+    cache = UploadCache(verify_interval=0)
+    token = make_access_token()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        first = await upload_file(client, token, b"logo", domain="example.com", cache=cache)
+        second = await upload_file(client, token, io.BytesIO(b"logo"), domain="example.com", cache=cache)
+        assert first == second and len(uploads) == 1 and len(cache) == 1
+        exists = False
+        await upload_file(client, token, b"logo", domain="example.com", cache=cache)
+        assert len(uploads) == 2
+    cache.close()
+
+
+async def test_upload_cache_accounts():
+    uploads = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        uploads.append(request.headers["authorization"])
+        await request.aread()
+        return httpx.Response(200, json=FILE)
+
+    cache = UploadCache(verify=False)
+    first, second = make_access_token(), make_access_token()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for token in (first, second, first, second):
+            await upload_file(client, token, b"logo", domain="example.com", cache=cache)
+    # файл одного аккаунта не отдаётся другому
+    assert uploads == [f"Bearer {first}", f"Bearer {second}"]
+    assert len(cache) == 2
+    cache.close()
+
+
+async def test_delete_file_forgets_upload():
+    uploads = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        uploads.append(await request.aread())
+        return httpx.Response(200, json=FILE)
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http, preflight=False, upload_cache=UploadCache(verify=False)) as client:
+        client._access_token = make_access_token()
+        file = await client.upload_file(b"logo")
+        await client.delete_file(file.id)
+        # удалённый файл не отдаётся из кэша, а загружается заново
+        assert len(client.upload_cache) == 0
+        await client.upload_file(b"logo")
+        assert len(uploads) == 2
+        client.upload_cache.close()
+    await http.aclose()
+
+
+def ranged(data: bytes, requests: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("range"))
+        if "range" in request.headers:
+            start = int(request.headers["range"].removeprefix("bytes=").removesuffix("-"))
+            return httpx.Response(
+                206, headers={"content-range": f"bytes {start}-{len(data) - 1}/{len(data)}"}, content=data[start:]
+            )
+        return httpx.Response(200, content=data)
+
+    return handler
+
+
+async def test_download_resume(tmp_path):
+    data = bytes(range(256)) * 10
+    path = tmp_path / "media" / "video.mp4"
+    path.parent.mkdir()
+    (tmp_path / "media" / "video.mp4.part").write_bytes(data[:1000])
+    requests = []
+    async with httpx.AsyncClient(transport=httpx.MockTransport(ranged(data, requests))) as client:
+        assert await download_file(client, "https://example.com/video.mp4", path, len(data)) == path
+        assert path.read_bytes() == data
+        await download_file(client, "https://example.com/video.mp4", path, len(data))
+        with pytest.raises(DownloadError):
+            await download_file(client, "https://example.com/video.mp4", tmp_path / "other.mp4", 1)
+    assert requests == ["bytes=1000-", None]
+
+
+async def test_client_download_cache(tmp_path):
+    requests = []
+    client = httpx.AsyncClient(transport=httpx.MockTransport(ranged(b"image", requests)))
+    async with AsyncITDClient(client=client) as itd:
+        paths = await itd.download_files(["https://example.com/a.jpg"] * 3, tmp_path)
+        assert len(set(paths)) == 1 and paths[0].suffix == ".jpg" and paths[0].read_bytes() == b"image"
+        await itd.download_file("https://example.com/a.jpg", tmp_path)
+    assert requests == [None]
+    await client.aclose()
+
+
+async def test_file_source_head():
+    async def chunks():
+        yield b"\x89PN"
+        yield b"G\r\n\x1a\n"
+        yield b"rest"
+
+    source = FileSource(chunks())
+    assert await source.head(8) == b"\x89PNG\r\n\x1a\n"
+    assert b"".join([chunk async for chunk in source]) == b"\x89PNG\r\n\x1a\nrest"
+
+
+async def test_transfer_stats(tmp_path):
+    server = Upload()
+    progress, stats = [], []
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server.handler)) as client:
+        await upload_file(
+            client, "token", FileSource(b"x" * 100, "image.jpg", chunk_size=30), domain="example.com",
+            on_progress=lambda s: progress.append(s.transferred), on_stats=stats.append
+        )
+    assert progress == [30, 60, 90, 100]
+    upload = stats[0]
+    assert upload.direction == "upload" and upload.name == "image.jpg" and upload.size == 100
+    assert upload.bytes_sent > 100 and upload.bytes_received > 0 and upload.error is None
+    assert upload.request_sent <= upload.first_byte <= upload.total
+
+    requests = []
+    http = httpx.AsyncClient(transport=httpx.MockTransport(ranged(b"image", requests)))
+    async with AsyncITDClient(client=http) as itd:
+        await itd.download_file("https://example.com/a.jpg", tmp_path, on_stats=stats.append)
+        assert itd.transfer_stats.downloads == 1 and itd.transfer_stats.bytes_received == 5
+    assert stats[1].direction == "download" and stats[1].transferred == 5
+    await http.aclose()
+
+
+async def test_create_post_rollback():
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        if request.url.path == "/api/files/upload":
+            await request.aread()
+            return httpx.Response(200, json=FILE)
+        return httpx.Response(400, json={"error": {"code": "VALIDATION_ERROR", "message": "error"}})
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http, preflight=False) as client:
+        client._access_token = make_access_token()
+        with pytest.raises(ITDError):
+            await client.create_post("text", files=[b"1"])
+        assert requests[-1] == ("DELETE", f"/api/files/{FILE['id']}")
+
+        requests.clear()
+        client.upload_cache = UploadCache()
+        with pytest.raises(ITDError):
+            await client.create_post("text", files=[b"1"])
+        assert [method for method, _ in requests] == ["POST", "POST"]
+        client.upload_cache.close()
+    await http.aclose()
@@ -0,0 +1,38 @@
+from aioitd import Bold, Italic, Link
+from aioitd.parser import normalize_spans, parse
+
+
+def test_normalize_spans():
+    assert normalize_spans([]) == []
+
+    spans = normalize_spans([
+        Bold(offset=4, length=2),
+        Bold(offset=0, length=2),
+        Bold(offset=2, length=2),
+        Italic(offset=1, length=3),
+        Italic(offset=3, length=0),
+        Bold(offset=10, length=5),
+        Bold(offset=12, length=1),
+    ])
+    assert spans == [
+        Bold(offset=0, length=6),
+        Italic(offset=1, length=3),
+        Bold(offset=10, length=5),
+    ]
+
+
+def test_normalize_links():
+    spans = normalize_spans([
+        Link(offset=0, length=2, url="https://a.com"),
+        Link(offset=2, length=2, url="https://b.com"),
+        Link(offset=4, length=2, url="https://b.com"),
+    ])
+    assert spans == [
+        Link(offset=0, length=2, url="https://a.com"),
+        Link(offset=2, length=4, url="https://b.com"),
+    ]
+
+
+def test_normalize_parsed():
+    result = parse("**a****b** c")
+    assert normalize_spans(result["spans"]) == [Bold(offset=0, length=2)]
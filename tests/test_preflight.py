@@ -0,0 +1,130 @@
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from aioitd import ValidationError, ParamsValidationError, Bold, TooLargeError, VideoRequiresVerificationError, \
+    AttachmentType, AsyncITDClient
+from aioitd.preflight import js_len, validate_post, validate_post_update, validate_comment, sniff_mime, \
+    validate_upload
+
+from tests import make_access_token
+
+FILE = {
+    "id": "330dea20-bb7c-4c96-ad09-97150f1ad5f6", "filename": "image.jpg", "mimeType": "image/jpeg",
+    "size": 0, "url": "https://example.com/image.jpg"
+}
+
+
+def test_js_len():
+    assert js_len('abc') == 3
+    assert js_len('привет') == 6
+    assert js_len('😀') == 2
+
+
+def test_validate_post():
+    validate_post('text')
+    validate_post(attachment_ids=[uuid4()])
+    validate_post(question='?', options=['a', 'b'])
+    validate_post('a' * 1000)
+
+    with pytest.raises(ValidationError):
+        validate_post()
+    with pytest.raises(ParamsValidationError):
+        validate_post('a' * 1001)
+    with pytest.raises(ParamsValidationError):
+        validate_post('😀' * 501)
+    with pytest.raises(ValidationError):
+        validate_post(attachment_ids=[uuid4() for _ in range(11)])
+    with pytest.raises(ParamsValidationError):
+        validate_post('a' * 200, spans=[Bold(offset=i, length=1) for i in range(101)])
+    with pytest.raises(ValidationError):
+        validate_post(question='', options=['a', 'b'])
+    with pytest.raises(ValidationError):
+        validate_post(question='q' * 129, options=['a', 'b'])
+    with pytest.raises(ValidationError):
+        validate_post(question='?', options=['a'])
+    with pytest.raises(ValidationError):
+        validate_post(question='?', options=[str(i) for i in range(11)])
+    with pytest.raises(ValidationError):
+        validate_post(question='?', options=['a', ''])
+    with pytest.raises(ValidationError):
+        validate_post(question='?', options=['a', 'b' * 33])
+
+
+def test_validate_post_update():
+    validate_post_update('text')
+    with pytest.raises(ValidationError):
+        validate_post_update('')
+    with pytest.raises(ValidationError):
+        validate_post_update('a' * 1001)
+
+
+def test_validate_comment():
+    validate_comment('text')
+    validate_comment(attachment_ids=[uuid4()])
+    with pytest.raises(ValidationError):
+        validate_comment()
+    with pytest.raises(ParamsValidationError):
+        validate_comment('a' * 1001)
+    with pytest.raises(ParamsValidationError):
+        validate_comment('text', [uuid4() for _ in range(5)])
+
+
+def test_sniff_mime():
+    with open('tests/image.jpg', 'rb') as file:
+        assert sniff_mime(file.read(64)) == 'image/jpeg'
+    with open('tests/audio.mp3', 'rb') as file:
+        assert sniff_mime(file.read(64)) == 'audio/mpeg'
+    with open('tests/abc.txt', 'rb') as file:
+        assert sniff_mime(file.read(64)) is None
+    assert sniff_mime(b'\x00\x00\x00\x14ftypqt  ') == 'video/quicktime'
+    assert sniff_mime(b'\x00\x00\x00\x18ftypisom') == 'video/mp4'
+    assert sniff_mime(b'hello') is None
+
+
+def test_validate_upload():
+    video = b'\x00\x00\x00\x18ftypisom'
+    assert validate_upload(b'\x89PNG\r\n\x1a\n', 100) == AttachmentType.IMAGE
+    assert validate_upload(video, verified=True) == AttachmentType.VIDEO
+    assert validate_upload(b'hello', 10 ** 9, {AttachmentType.IMAGE: 1}, verified=False) is None
+    validate_upload(video, 10 ** 9)
+    with pytest.raises(TooLargeError):
+        validate_upload(video, 2, {AttachmentType.VIDEO: 1})
+    with pytest.raises(VideoRequiresVerificationError):
+        validate_upload(video, verified=False)
+
+
+async def test_client_upload_preflight():
+    requests = []
+    me = {
+        "id": str(uuid4()), "username": "user", "displayName": "user", "avatar": "", "verified": False, "pin": None,
+        "wallAccess": "everyone", "banner": None, "postsCount": 0, "followingCount": 0, "followersCount": 0,
+        "bio": None, "createdAt": "2026-01-01T00:00:00.000Z", "likesVisibility": "everyone", "isPrivate": False,
+        "isPhoneVerified": True
+    }
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.url.path == "/api/users/me":
+            return httpx.Response(200, json=me)
+        await request.aread()
+        return httpx.Response(200, json=FILE)
+
+    video = b'\x00\x00\x00\x18ftypisom' + b'\x00' * 100
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http, upload_limits={AttachmentType.IMAGE: 10}) as client:
+        client._access_token = make_access_token()
+        with pytest.raises(VideoRequiresVerificationError):
+            await client.upload_file(video)
+        with pytest.raises(VideoRequiresVerificationError):
+            await client.create_post('text', files=[video])
+        with pytest.raises(TooLargeError):
+            await client.create_post('text', files=[b'\x89PNG\r\n\x1a\n' + b'\x00' * 100])
+        assert requests == [("GET", "/api/users/me")]
+
+        # неизвестный формат и файлы без ограничения размера отправляются на сервер
+        await client.upload_file(b'hello')
+        await client.upload_file('tests/audio.mp3')
+    await http.aclose()
+    assert requests[1:] == [("POST", "/api/files/upload")] * 2
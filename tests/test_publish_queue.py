@@ -0,0 +1,170 @@
+from datetime import datetime, timezone
+import time
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from aioitd import RateLimitError, ValidationError, ServerError, NotFoundError
+from aioitd.publish_queue import PublishQueue
+
+
+class WallClient:
+    """Клиент, публикующий посты на стену в памяти. `failures` — что выбросить на очередные `create_post`,
+    `created` — создаётся ли пост перед исключением. `wall_failures` — что выбросить на очередные чтения стены.
+    Посты на чужих стенах хранятся в `walls` и видны только через `get_wall_posts`."""
+
+    preflight = False
+
+    def __init__(self, failures=(), wall_failures=()):
+        self.me = uuid4()
+        self.wall = []
+        self.walls = {}
+        self.calls = 0
+        self.failures = list(failures)
+        self.wall_failures = list(wall_failures)
+
+    async def _fresh_access_token(self):
+        return "token"
+
+    async def get_me_uuid(self):
+        return self.me
+
+    async def get_posts_by_user(self, username_or_id, cursor=None, limit=20, sort='new'):
+        if self.wall_failures:
+            raise self.wall_failures.pop(0)
+        posts = self.wall if username_or_id == self.me else []
+        return SimpleNamespace(has_more=False, next_cursor=None), posts[::-1][:limit]
+
+    async def get_wall_posts(self, username_or_id, cursor=None, limit=20, sort='new'):
+        if self.wall_failures:
+            raise self.wall_failures.pop(0)
+        posts = self.walls.get(str(username_or_id), [])
+        return SimpleNamespace(has_more=False, next_cursor=None), posts[::-1][:limit]
+
+    async def create_post(self, content='', attachment_ids=None, wall_recipient_id=None, multiple_choice=False,
+                          question=None, options=None, spans=None):
+        self.calls += 1
+        poll = None if question is None else SimpleNamespace(
+            question=question, multiple_choice=multiple_choice,
+            options=[SimpleNamespace(text=text, position=position) for position, text in enumerate(options)]
+        )
+        post = SimpleNamespace(
+            id=uuid4(), content=content, is_owner=True, created_at=datetime.now(timezone.utc), poll=poll,
+            attachments=[SimpleNamespace(id=attachment_id) for attachment_id in attachment_ids or ()]
+        )
+        wall = self.wall if wall_recipient_id is None else self.walls.setdefault(str(wall_recipient_id), [])
+        if self.failures:
+            error, created = self.failures.pop(0)
+            if created:
+                wall.append(post)
+            raise error
+        wall.append(post)
+        return post
+
+
+async def test_publish_queue(tmp_path):
+    timeout = (httpx.ReadTimeout("timeout"), True)
+    limited = (RateLimitError("RATE_LIMIT_EXCEEDED", "Too Many Requests", 0), False)
+    invalid = (ValidationError("VALIDATION_ERROR", "invalid"), False)
+    main, news = WallClient([timeout, limited]), WallClient([invalid])
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": main, "news": news}, min_interval=0, retry_delay=0)
+
+    first = await queue.enqueue("main", "first", key="first")
+    assert await queue.enqueue("main", "first again", key="first") == first
+    second = await queue.enqueue("main", "second", at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+    broken = await queue.enqueue("news", "broken")
+    later = await queue.enqueue("news", "later", at=datetime(2100, 1, 1, tzinfo=timezone.utc))
+    assert await queue.cancel(later)
+
+    await queue.run(until_idle=True)
+
+    # second запланирован раньше, first отправлен по таймауту, но создан, и найден на стене без повтора
+    assert [post.content for post in main.wall] == ["second", "first"]
+    assert main.calls == 3
+    jobs = {job.id: job for job in await queue.jobs()}
+    assert jobs[first].state == "done" and jobs[first].post_id == main.wall[1].id
+    assert jobs[second].state == "done" and jobs[second].attempts == 1
+    assert jobs[broken].state == "failed" and "invalid" in jobs[broken].error
+    assert jobs[later].state == "cancelled"
+    queue.close()
+
+
+async def test_publish_queue_crash_recovery(tmp_path):
+    client = WallClient()
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": client}, min_interval=0)
+    published = await queue.enqueue("main", "published")
+    lost = await queue.enqueue("main", "lost")
+    # процесс упал после отправки обоих постов, но до записи результата; до сервера дошёл только первый
+    await queue._execute("UPDATE jobs SET state = 'sending', attempts = 1, sent_at = ?", (datetime.now().timestamp(),))
+    await client.create_post("published")
+    queue.close()
+
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": client}, min_interval=0)
+    await queue.run(until_idle=True)
+    assert [post.content for post in client.wall] == ["published", "lost"]
+    assert (await queue.get(published)).post_id == client.wall[0].id
+    assert (await queue.get(lost)).state == "done" and (await queue.get(lost)).attempts == 2
+    queue.close()
+
+
+async def test_publish_queue_rate_limit(tmp_path):
+    client = WallClient([(RateLimitError("RATE_LIMIT_EXCEEDED", "Too Many Requests", 0.2), False)])
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": client}, min_interval=0.01, max_interval=1)
+    job = await queue.enqueue("main", "text")
+    start = time.monotonic()
+    await queue.run(until_idle=True)
+
+    # повтор не раньше retry_after, 429 не считается попыткой, интервал аккаунта вырос до retry_after
+    assert time.monotonic() - start >= 0.2
+    assert client.calls == 2
+    assert (await queue.get(job)).state == "done" and (await queue.get(job)).attempts == 1
+    assert queue._pacers["main"].interval == pytest.approx(0.2 * 0.9)
+    queue.close()
+
+
+async def test_publish_queue_ambiguous(tmp_path):
+    client = WallClient()
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": client}, min_interval=0, retry_delay=0)
+    # на стене уже есть пост другой задачи и посты с тем же текстом, но с вложением или опросом
+    done = await queue.enqueue("main", "same")
+    await queue._finish(done, "done", (await client.create_post("same")).id)
+    await client.create_post("same", [uuid4()])
+    await client.create_post("same", question="?", options=["a", "b"])
+    job = await queue.enqueue("main", "same")
+    client.failures = [(ServerError("SERVER_ERROR", "error"), False)]
+    client.wall_failures = [httpx.ConnectError("offline")]
+
+    await queue.run(until_idle=True)
+
+    # 5xx: пост не найден на стене (после сетевой ошибки при её чтении) и отправлен повторно
+    assert client.calls == 5
+    assert (await queue.get(job)).state == "done" and (await queue.get(job)).attempts == 2
+    assert (await queue.get(job)).post_id == client.wall[-1].id
+    queue.close()
+
+
+async def test_publish_queue_other_wall(tmp_path):
+    client, recipient = WallClient([(httpx.ReadTimeout("timeout"), True)]), uuid4()
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": client}, min_interval=0, retry_delay=0)
+    job = await queue.enqueue("main", "hello", wall_recipient_id=recipient)
+    await queue.run(until_idle=True)
+
+    # пост создан на чужой стене до таймаута и найден среди постов других пользователей на ней
+    assert client.calls == 1 and client.wall == []
+    assert (await queue.get(job)).post_id == client.walls[str(recipient)][0].id
+    queue.close()
+
+
+async def test_publish_queue_wall_check_failed(tmp_path):
+    client = WallClient(
+        [(ServerError("SERVER_ERROR", "error"), False)], wall_failures=[NotFoundError("NOT_FOUND", "not found")]
+    )
+    queue = PublishQueue(tmp_path / "queue.sqlite", {"main": client}, min_interval=0, retry_delay=0)
+    job = await queue.enqueue("main", "text")
+    await queue.run(until_idle=True)
+
+    assert client.calls == 1
+    assert (await queue.get(job)).state == "failed" and "NotFoundError" in (await queue.get(job)).error
+    queue.close()
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+
+from aioitd.api import connect_notifications
+from aioitd.recording import RecordingTransport, ReplayTransport
+
+CONNECTED = b'event: connected\ndata: {"userId":"330dea20-bb7c-4c96-ad09-97150f1ad5f6","timestamp":%d}\n\n'
+SSE = CONNECTED % 0 + CONNECTED % 1
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/api/notifications/stream":
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=SSE)
+    return httpx.Response(200, json={"ok": True, "path": request.url.path})
+
+
+async def read_stream(client: httpx.AsyncClient) -> list:
+    async with connect_notifications(client, "token", "example.com") as events:
+        return [event async for event in events]
+
+
+async def test_record_and_replay(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorder = RecordingTransport(path, httpx.MockTransport(handler))
+    assert not path.exists()
+    async with httpx.AsyncClient(transport=recorder) as client:
+        recorded = (await client.get("https://example.com/api/a")).json()
+        recorded_events = await read_stream(client)
+        assert (await client.get("https://example.com/api/a")).json() == recorded
+
+    async with httpx.AsyncClient(transport=ReplayTransport(path, speed=None)) as client:
+        assert (await client.get("https://example.com/api/a")).json() == recorded
+        assert (await client.get("https://example.com/api/a")).json() == recorded
+        events = await read_stream(client)
+        with pytest.raises(LookupError):
+            await client.get("https://example.com/api/a")
+
+    assert [event.timestamp for event in events] == [0, 1]
+    assert events == recorded_events
@@ -0,0 +1,109 @@
+from uuid import uuid4
+
+import httpx
+
+from aioitd import AsyncITDClient, Bold, Visibility
+
+from tests import make_access_token, make_post
+
+
+async def test_skip_unchanged():
+    requests = []
+    post_id, comment_id = uuid4(), uuid4()
+    privacy = {"isPrivate": False, "likesVisibility": "everyone", "wallAccess": "followers", "showLastSeen": True}
+    post = {
+        "id": str(post_id), "content": "привет @user", "updatedAt": "2026-01-01T00:00:00.000Z",
+        "spans": [{"type": "mention", "offset": 7, "length": 5, "username": "user"},
+                  {"type": "bold", "offset": 0, "length": 6}],
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.url.path.endswith("/privacy"):
+            return httpx.Response(200, json=privacy)
+        if request.url.path.startswith("/api/comments/"):
+            return httpx.Response(200, json={"id": str(comment_id), "content": "текст", "editedAt": None})
+        return httpx.Response(200, json=post)
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http, skip_unchanged=True) as client:
+        client._access_token = make_access_token()
+
+        # до первого чтения состояние неизвестно, запрос отправляется
+        await client.update_privacy(show_last_seen=True)
+        assert await client.update_privacy(likes_visibility=Visibility.EVERYONE, show_last_seen=True) is not None
+        await client.update_privacy(is_private=True)
+
+        await client.update_post(post_id, "привет @user", [Bold(offset=0, length=3), Bold(offset=3, length=3)])
+        await client.update_post(post_id, "привет @user", [Bold(offset=0, length=6)])
+        await client.edit_comment(comment_id, "текст")
+        await client.edit_comment(comment_id, "текст")
+        await client.edit_comment(comment_id, "другой текст")
+    await http.aclose()
+
+    assert [path for _, path in requests].count("/api/users/me/privacy") == 2
+    assert [path for _, path in requests].count(f"/api/posts/{post_id}") == 1
+    assert [path for _, path in requests].count(f"/api/comments/{comment_id}") == 2
+    assert [(skipped.method, skipped.target) for skipped in client.skipped] == [
+        ("update_privacy", None), ("update_post", post_id), ("edit_comment", comment_id)
+    ]
+
+
+async def test_skip_unchanged_disabled():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200, json={"isPrivate": False, "likesVisibility": "everyone", "wallAccess": "everyone", "showLastSeen": True}
+        )
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http) as client:
+        client._access_token = make_access_token()
+        await client.get_privacy()
+        await client.update_privacy(is_private=False)
+    await http.aclose()
+    assert len(requests) == 2 and not client.skipped
+
+
+async def test_skip_unchanged_profile():
+    requests = []
+    user = {
+        "id": str(uuid4()), "username": "user", "displayName": "Имя", "avatar": "", "verified": False,
+        "isPhoneVerified": True, "roles": ["user"], "bio": "о себе"
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.url.path == "/api/profile":
+            return httpx.Response(200, json={"authenticated": True, "banned": False, "user": user})
+        return httpx.Response(200, json={
+            "id": user["id"], "username": "user", "displayName": "Имя", "bio": "новое",
+            "updatedAt": "2026-01-01T00:00:00.000Z"
+        })
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with AsyncITDClient(client=http, skip_unchanged=True) as client:
+        client._access_token = make_access_token()
+        await client.get_profile()
+        await client.update_profile(bio="о себе", display_name="Имя")
+        await client.update_profile(bio="новое")
+    await http.aclose()
+
+    assert requests == [("GET", "/api/profile"), ("PUT", "/api/users/me")]
+    assert [skipped.method for skipped in client.skipped] == ["update_profile"]
+
+
+async def test_get_post_not_remembered(monkeypatch):
+    post_id = uuid4()
+    post = make_post(id=post_id, content="", spans=[], edited_at=None)
+
+    async def get_post(*args, **kwargs):
+        return [], post
+
+    monkeypatch.setattr("aioitd.client.get_post", get_post)
+    async with AsyncITDClient() as client:
+        client._access_token = make_access_token()
+        await client.get_post(post_id)
+    assert not client._known
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+from aioitd.sync import TimelineSync, SQLiteSyncStore
+
+
+def make_post(hours_ago: float, edited_at=None):
+    return SimpleNamespace(
+        id=uuid4(), created_at=datetime.now(timezone.utc) - timedelta(hours=hours_ago), edited_at=edited_at
+    )
+
+
+class TimelineClient:
+    """Клиент со стеной из заранее заданных постов, отсортированных от новых к старым."""
+
+    def __init__(self, posts: list):
+        self.posts = posts
+        self.requests = 0
+
+    async def get_posts_by_user(self, username_or_id, cursor=None, limit=20, sort='new'):
+        self.requests += 1
+        start = int(cursor or 0)
+        page = self.posts[start:start + limit]
+        has_more = start + limit < len(self.posts)
+        return SimpleNamespace(has_more=has_more, next_cursor=str(start + limit)), page
+
+
+async def test_timeline_sync(tmp_path):
+    posts = [make_post(hours) for hours in range(0, 500, 5)]
+    client = TimelineClient(posts)
+    store = SQLiteSyncStore(tmp_path / "sync.sqlite")
+    sync = TimelineSync(client, store, edit_window=timedelta(hours=24), limit=10)
+
+    result = await sync.sync("user")
+    assert result.pages == 10 and len(result.new) == 100
+    assert result.new[-1] is posts[0]
+
+    new = make_post(0)
+    edited = posts[2].__dict__ | {"edited_at": datetime.now(timezone.utc)}
+    client.posts = [new] + [SimpleNamespace(**edited) if post is posts[2] else post for post in posts]
+    client.requests = 0
+    result = await sync.sync("user")
+    assert client.requests == 1
+    assert [post.id for post in result.new] == [new.id]
+    assert [post.id for post in result.edited] == [posts[2].id]
+
+    result = await sync.sync("user")
+    assert not result.new and not result.edited and result.pages == 1
+    store.close()
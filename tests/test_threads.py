@@ -0,0 +1,188 @@
+from datetime import datetime, timezone
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+from aioitd import NotFoundError
+from aioitd.threads import iter_comments, CommentThread, CommentWatcher
+
+
+def make_comment(replies=(), reply_to=None, replies_count=None):
+    replies = list(replies)
+    return SimpleNamespace(
+        id=uuid4(), replies=replies, reply_to=reply_to,
+        replies_count=len(replies) if replies_count is None else replies_count
+    )
+
+
+class CommentsClient:
+    """Клиент с комментариями, разбитыми на заранее заданные страницы."""
+
+    def __init__(self, pages: list[list]):
+        self.pages = pages
+        self.cursors = []
+
+    async def get_post_comments(self, post_id, cursor=None, limit=20, sort='popular'):
+        self.cursors.append(cursor)
+        page = int(cursor or 0)
+        has_more = page + 1 < len(self.pages)
+        pagination = SimpleNamespace(has_more=has_more, next_cursor=str(page + 1) if has_more else None, total=0)
+        return pagination, self.pages[page]
+
+
+async def test_iter_comments():
+    user = SimpleNamespace(id=uuid4())
+    reply = make_comment(reply_to=user)
+    first, second, third = make_comment([reply]), make_comment(), make_comment()
+    client = CommentsClient([[first, second], [second, third]])
+
+    comments = [comment async for comment in iter_comments(client, uuid4())]
+    assert comments == [first, second, third]
+    assert client.cursors == [None, "1"]
+
+    comments = [comment async for comment in iter_comments(client, uuid4(), flat=True, prefetch=False)]
+    assert comments == [first, reply, second, third]
+
+    client.cursors.clear()
+    comments = [comment async for comment in iter_comments(client, uuid4(), max_pages=1)]
+    assert comments == [first, second] and client.cursors == [None]
+
+
+async def test_iter_comments_prefetch_cancelled():
+    finished = []
+
+    class SlowClient(CommentsClient):
+        async def get_post_comments(self, post_id, cursor=None, limit=20, sort='popular'):
+            try:
+                if cursor is not None:
+                    await asyncio.sleep(10)
+                return await super().get_post_comments(post_id, cursor, limit, sort)
+            finally:
+                finished.append(cursor)
+
+    comments = iter_comments(SlowClient([[make_comment()], [make_comment()]]), uuid4())
+    await anext(comments)
+    await asyncio.sleep(0)
+    await comments.aclose()
+    # следующая страница уже запрашивалась, после закрытия её запрос отменён и завершён
+    assert finished == [None, "1"]
+
+
+async def test_comment_thread():
+    user = SimpleNamespace(id=uuid4())
+    nested = make_comment(reply_to=user)
+    reply = make_comment([nested], reply_to=user)
+    other = make_comment()
+    first, second = make_comment([reply, other], replies_count=5), make_comment()
+    thread = await CommentThread.from_post(CommentsClient([[first], [second]]), uuid4())
+
+    assert len(thread) == 5 and nested.id in thread
+    assert thread.roots == [first, second]
+    assert list(thread) == [first, reply, nested, other, second]
+    assert list(thread.subtree(reply.id)) == [reply, nested]
+    assert thread.parent(nested.id) is reply and thread.parent(first.id) is None
+    assert thread.children(first.id) == [reply, other]
+    assert thread.replies_to(user.id) == [reply, nested] and thread.reply_to(reply.id) is user
+    assert thread.missing_replies(first.id) == 3
+
+    updated = SimpleNamespace(**vars(first) | {"replies": []})
+    assert not thread.add(updated)
+    assert thread[first.id] is updated and len(thread) == 5
+
+
+class WatchedClient:
+    """Клиент с комментариями под постами, отдающий их от новых к старым страницами по 2."""
+
+    def __init__(self, posts: dict):
+        self.comments = posts
+        self.scans = []
+
+    async def get_posts_by_ids(self, post_ids, concurrency=4, use_cache=True):
+        return {
+            post_id: SimpleNamespace(comments_count=sum(1 + len(c.replies) for c in self.comments[post_id]))
+            if post_id in self.comments else NotFoundError("NOT_FOUND", "Post not found")
+            for post_id in post_ids
+        }
+
+    async def get_post_comments(self, post_id, cursor=None, limit=20, sort='newest'):
+        self.scans.append((post_id, cursor))
+        comments = sorted(self.comments[post_id], key=lambda comment: comment.created_at, reverse=True)
+        start = int(cursor or 0)
+        has_more = start + 2 < len(comments)
+        return SimpleNamespace(has_more=has_more, next_cursor=str(start + 2)), comments[start:start + 2]
+
+
+async def test_comment_watcher():
+    clock = iter(range(100))
+
+    def timed(replies=()):
+        comment = make_comment(replies)
+        comment.created_at = datetime.fromtimestamp(next(clock), timezone.utc)
+        return comment
+
+    active, quiet, deleted = uuid4(), uuid4(), uuid4()
+    old, recent = timed(), timed()
+    client = WatchedClient({active: [old, recent], quiet: [timed()], deleted: [timed()]})
+    watcher = CommentWatcher(client, [active, quiet, deleted], limit=2)
+
+    assert await watcher.poll() == []
+
+    reply, missed = make_comment(), make_comment()
+    recent.replies.append(reply)
+    old.replies.append(missed)  # старый комментарий не попадает на просмотренные страницы
+    new = [timed(), timed(), timed()]
+    client.comments[active] += new
+    del client.comments[deleted]
+    client.scans.clear()
+
+    assert await watcher.poll() == [(active, reply)] + [(active, comment) for comment in new]
+    assert watcher.posts == [active, quiet]
+    assert [post_id for post_id, _ in client.scans] == [active, active]
+
+    client.scans.clear()
+    assert await watcher.poll() == [] and client.scans == []
+
+
+async def test_comment_watcher_same_time():
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def timed():
+        comment = make_comment()
+        comment.created_at = created_at
+        return comment
+
+    post_id, seen = uuid4(), timed()
+    client = WatchedClient({post_id: [seen]})
+    watcher = CommentWatcher(client, [post_id])
+    assert await watcher.poll() == []
+
+    same = timed()
+    client.comments[post_id].append(same)
+    assert await watcher.poll() == [(post_id, same)]
+
+
+async def test_comment_watcher_rescan_after_delete():
+    clock = iter(range(100))
+
+    def timed():
+        comment = make_comment()
+        comment.created_at = datetime.fromtimestamp(next(clock), timezone.utc)
+        return comment
+
+    post_id, parent = uuid4(), timed()
+    parent.replies.append(make_comment())
+    client = WatchedClient({post_id: [parent]})
+    watcher = CommentWatcher(client, [post_id])
+    assert await watcher.poll() == []
+
+    new = [timed(), timed()]
+    client.comments[post_id] += new
+    assert await watcher.poll() == [(post_id, comment) for comment in new]
+
+    newest = timed()
+    client.comments[post_id].append(newest)
+    assert await watcher.poll() == [(post_id, newest)]  # parent не попадает на просмотренные страницы
+
+    # после удаления новых комментариев parent снова на первой странице, его ответ уже был отдан
+    client.comments[post_id] = [parent]
+    assert await watcher.poll() == []